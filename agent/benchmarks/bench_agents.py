@@ -0,0 +1,209 @@
+"""Agent benchmarks against a local JSON-RPC stand-in, at increasing agent counts.
+
+Deploys AgentToken with EthereumDeployer to `benchmarks.rpc_stub.ERC20ChainStub`, then
+measures message dispatch latency, transfer throughput, RPC calls per transfer and
+memory per agent. Nothing leaves the machine. Run from the agent folder:
+
+    python -m benchmarks.bench_agents --agents 1,10,100 --latency 5 --output bench.json
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from threading import Thread
+from eth_account import Account
+from eth_utils import keccak
+from web3 import Web3
+from src.agents.autonomous_agent import AutonomousAgent
+from src.agents.inbox import Inbox
+from src.agents.outbox import Outbox
+from src.erc20.erc20_handler import ERC20Handler
+from src.erc20.gas_oracle import GasEstimateCache, GasPriceOracle
+from src.erc20.nonce_manager import NonceManager
+from src.erc20.tx_pipeline import TransactionPipeline
+from src.utils.rpc_provider import PooledHTTPProvider
+from .rpc_stub import ERC20ChainStub
+
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN_CONTRACT_DIR = os.path.join(AGENT_DIR, "token_contract")
+ARTIFACTS_DIR = os.path.join(TOKEN_CONTRACT_DIR, "contracts", "artifacts")
+DEPLOYER_KEY = "0x4c0883a69102937d6231471b5dbb6204fe5129617082792ae468d01a3f362318"
+INITIAL_SUPPLY = 1000000
+FUNDING = 10 ** 18
+
+class NullLogger:
+    """Logger stand-in so log formatting does not dominate the dispatch numbers."""
+    def info(self, *args, **kwargs):
+        pass
+
+    error = warning = debug = info
+
+def deploy_token(stub):
+    """Deploy AgentToken from the committed artifacts through EthereumDeployer."""
+    # token_contract/src merges into the `src` namespace package
+    sys.path.insert(0, TOKEN_CONTRACT_DIR)
+    from src.deployer import EthereumDeployer
+
+    deployer = EthereumDeployer(stub.uri, DEPLOYER_KEY)
+    with open(os.path.join(ARTIFACTS_DIR, "AgentToken_abi.json")) as file:
+        deployer.contract_abi = json.load(file)
+    with open(os.path.join(ARTIFACTS_DIR, "AgentToken_bytecode.json")) as file:
+        deployer.contract_bytecode = json.load(file)["bytecode"]
+    start = time.perf_counter()
+    deployer.connect_to_network()
+    deployer.prepare_account()
+    deployer.deploy_contract(INITIAL_SUPPLY)
+    return deployer.get_contract_address(), time.perf_counter() - start
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda fraction: samples[min(len(samples) - 1, int(fraction * len(samples)))]
+    return {
+        "p50_us": round(pick(0.50) * 1e6, 1),
+        "p90_us": round(pick(0.90) * 1e6, 1),
+        "p99_us": round(pick(0.99) * 1e6, 1),
+        "max_us": round(samples[-1] * 1e6, 1),
+    }
+
+def bench_dispatch(agent_count, messages_per_agent, interval):
+    """Latency from `send_message` to the handler, with one sender thread per agent."""
+    latencies = []
+    agents = []
+    for index in range(agent_count):
+        agent = AutonomousAgent(f"Agent{index + 1}", Inbox(), None, None, NullLogger())
+        agent.register_message_handler("hello", lambda message: latencies.append(time.perf_counter() - float(message[6:])))
+        agents.append(agent)
+
+    def send(outbox):
+        for _ in range(messages_per_agent):
+            outbox.send_message(f"hello {time.perf_counter()!r}")
+            time.sleep(interval)
+
+    for agent in agents:
+        agent.start()
+    senders = [Thread(target=send, args=(Outbox(agent.inbox),)) for agent in agents]
+    start = time.perf_counter()
+    for sender in senders:
+        sender.start()
+    for sender in senders:
+        sender.join()
+    expected = agent_count * messages_per_agent
+    while len(latencies) < expected and time.perf_counter() - start < 60:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    for agent in agents:
+        agent.stop()
+    for agent in agents:
+        agent.join()
+    return dict(percentiles(latencies), messages=len(latencies), messages_per_s=round(len(latencies) / elapsed, 1))
+
+def bench_transfers(stub, web3_instance, token, agent_count, transfers_per_agent):
+    """Fund one key per agent, then push every agent's transfers through one pipeline."""
+    chain_id = stub.chain_id
+    gas_oracle = GasPriceOracle(web3_instance)
+    gas_cache = GasEstimateCache()
+    pipeline = TransactionPipeline(web3_instance, poll_interval=0.05)
+    pipeline.start()
+    try:
+        keys = ["0x" + keccak(text=f"bench-agent-{index}").hex() for index in range(agent_count)]
+        addresses = [Account.from_key(key).address for key in keys]
+        deployer = Account.from_key(DEPLOYER_KEY).address
+        deployer_nonces = NonceManager(deployer, web3_instance)
+        funding = [
+            pipeline.submit_transfer(
+                ERC20Handler(token, DEPLOYER_KEY, deployer, address, deployer_nonces, web3_instance, chain_id, gas_oracle=gas_oracle, gas_cache=gas_cache),
+                FUNDING,
+            )
+            for address in addresses
+        ]
+        for future in funding:
+            future.result()
+
+        handlers = [
+            ERC20Handler(token, key, address, deployer, NonceManager(address, web3_instance), web3_instance, chain_id, gas_oracle=gas_oracle, gas_cache=gas_cache)
+            for key, address in zip(keys, addresses)
+        ]
+        stub.reset_counts()
+        start = time.perf_counter()
+        futures = [pipeline.submit_transfer(handler, 1) for _ in range(transfers_per_agent) for handler in handlers]
+        failed = sum(1 for future in futures if future.result().status != 1)
+        elapsed = time.perf_counter() - start
+        rpc_calls = sum(stub.counts.values())
+        return {
+            "transfers": len(futures),
+            "failed": failed,
+            "transfers_per_s": round(len(futures) / elapsed, 1),
+            "rpc_calls_per_transfer": round(rpc_calls / len(futures), 3),
+            "rpc_calls": dict(stub.counts),
+        }
+    finally:
+        pipeline.stop()
+
+def bench_memory(web3_instance, token, agent_count):
+    """Traced allocations per agent, including its inbox, outbox and ERC20 handler."""
+    key = DEPLOYER_KEY
+    address = Account.from_key(key).address
+    nonce_manager = NonceManager(address, web3_instance)
+    agents = []
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    peer = Inbox()
+    for index in range(agent_count):
+        handler = ERC20Handler(token, key, address, address, nonce_manager, web3_instance, 1337)
+        agent = AutonomousAgent(f"Agent{index + 1}", Inbox(), Outbox(peer), handler, NullLogger())
+        agent.register_message_handler("hello", print)
+        agent.register_message_handler("crypto", print)
+        agents.append(agent)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return round(used / agent_count)
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=AGENT_DIR, text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", default="1,10,100", help="Comma-separated agent counts")
+    parser.add_argument("--messages", type=int, default=200, help="Messages sent to each agent")
+    parser.add_argument("--message-interval", type=float, default=0.001, help="Seconds between messages of one sender")
+    parser.add_argument("--transfers", type=int, default=10, help="Transfers sent by each agent")
+    parser.add_argument("--latency", type=float, default=0.0, help="Added latency of every RPC request in milliseconds")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    stub = ERC20ChainStub(latency=args.latency / 1000)
+    try:
+        token, deploy_seconds = deploy_token(stub)
+        web3_instance = Web3(PooledHTTPProvider([stub.uri]))
+        results = {
+            "commit": git_commit(),
+            "config": {"messages": args.messages, "message_interval": args.message_interval, "transfers": args.transfers, "rpc_latency_ms": args.latency},
+            "deploy_seconds": round(deploy_seconds, 3),
+            "runs": [],
+        }
+        for agent_count in [int(count) for count in args.agents.split(",")]:
+            results["runs"].append({
+                "agents": agent_count,
+                "dispatch": bench_dispatch(agent_count, args.messages, args.message_interval),
+                "transfers": bench_transfers(stub, web3_instance, token, agent_count, args.transfers),
+                "memory_per_agent_bytes": bench_memory(web3_instance, token, agent_count),
+            })
+    finally:
+        stub.close()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+if __name__ == "__main__":
+    main()
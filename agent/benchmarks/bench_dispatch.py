@@ -0,0 +1,65 @@
+"""Dispatch matching cost per message, with and without the per-payload match cache.
+
+Agents mostly send a few distinct payloads again and again, which the cache answers
+without scanning; a replayed trace or other unique payloads never hit it, and the
+dispatcher then bypasses the cache. Run from the agent folder:
+
+    python -m benchmarks.bench_dispatch --messages 100000
+"""
+import argparse
+import json
+import random
+import time
+from src.agents.supervisor import WORDS
+from src.agents.dispatcher import MessageDispatcher
+
+HANDLED = ["hello", "crypto", "moon", "sky"]
+
+def per_message_ns(match, payloads):
+    start = time.perf_counter()
+    for payload in payloads:
+        match(payload)
+    return round((time.perf_counter() - start) / len(payloads) * 1e9, 1)
+
+def uncached(dispatcher):
+    """Match function that always scans, as the dispatcher would without its cache."""
+    entries, matcher, _ = dispatcher._compile()
+
+    def match(payload):
+        positions = matcher(payload)
+        return [entries[position] for position in sorted(positions)] if positions else []
+    return match
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    words = WORDS
+    workloads = {
+        "repeated": [f"{random.choice(words)} {random.choice(words)}" for _ in range(args.messages)],
+        "unique": [f"{random.choice(words)} {index} {random.choice(words)}" for index in range(args.messages)],
+    }
+    results = {}
+    for mode in (MessageDispatcher.SUBSTRING, MessageDispatcher.TOKEN):
+        for workload, payloads in workloads.items():
+            dispatcher = MessageDispatcher(mode)
+            for message_type in HANDLED:
+                dispatcher.register(message_type, print)
+            scan = uncached(dispatcher)
+            if any(dispatcher.match(payload) != scan(payload) for payload in payloads[:1000]):
+                raise SystemExit("Cached and uncached matching disagree")
+            results[f"{mode}_{workload}"] = {
+                "cached_ns": per_message_ns(dispatcher.match, payloads),
+                "uncached_ns": per_message_ns(scan, payloads),
+            }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+if __name__ == "__main__":
+    main()
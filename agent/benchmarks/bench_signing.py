@@ -0,0 +1,76 @@
+"""Signing throughput: in-thread signing vs. ProcessPoolSigner at increasing worker counts.
+
+Run from the agent folder:
+
+    python -m benchmarks.bench_signing --transactions 2000
+"""
+import argparse
+import json
+import os
+import time
+from eth_account import Account
+from src.erc20.signer import ProcessPoolSigner
+
+PRIVATE_KEY = "0x4c0883a69102937d6231471b5dbb6204fe5129617082792ae468d01a3f362318"
+TOKEN = "0x2222222222222222222222222222222222222222"
+TARGET = "1111111111111111111111111111111111111111"
+
+def make_transactions(count):
+    """Build `count` transfer transactions with consecutive nonces."""
+    return [
+        {
+            "to": TOKEN,
+            "value": 0,
+            "gas": 60000,
+            "gasPrice": 10 ** 9,
+            "nonce": nonce,
+            "chainId": 123456,
+            "data": "0xa9059cbb" + TARGET.rjust(64, "0") + hex(nonce + 1)[2:].rjust(64, "0"),
+        }
+        for nonce in range(count)
+    ]
+
+def bench_in_thread(transactions):
+    account = Account.from_key(PRIVATE_KEY)
+    start = time.perf_counter()
+    for tx in transactions:
+        account.sign_transaction(tx)
+    return len(transactions) / (time.perf_counter() - start)
+
+def bench_process_pool(transactions, workers):
+    signer = ProcessPoolSigner([PRIVATE_KEY], max_workers=workers)
+    address = Account.from_key(PRIVATE_KEY).address
+    try:
+        # Warm up so worker start-up and key loading are not measured
+        [future.result() for future in [signer.submit(address, tx) for tx in transactions[:workers * 4]]]
+        start = time.perf_counter()
+        futures = [signer.submit(address, tx) for tx in transactions]
+        for future in futures:
+            future.result()
+        return len(transactions) / (time.perf_counter() - start)
+    finally:
+        signer.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=2000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    transactions = make_transactions(args.transactions)
+    results = {"transactions": args.transactions, "in_thread_tx_per_s": round(bench_in_thread(transactions), 1), "process_pool": []}
+
+    workers = 1
+    while workers <= args.max_workers:
+        rate = bench_process_pool(transactions, workers)
+        results["process_pool"].append({"workers": workers, "tx_per_s": round(rate, 1)})
+        workers *= 2
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Per-transfer CPU cost: web3 `build_transaction` vs. `ERC20Handler.build_transfer`, with signing for scale.
+
+Gas comes from a warm estimate cache and gas price oracle, so no RPC is made while
+timing. Run from the agent folder:
+
+    python -m benchmarks.bench_transfer_build --transfers 5000
+"""
+import argparse
+import json
+import time
+from web3 import Web3
+from web3.providers import BaseProvider
+from src.erc20.erc20_handler import ERC20Handler
+from src.erc20.gas_oracle import GasEstimateCache, GasPriceOracle
+from src.erc20.nonce_manager import NonceManager
+
+PRIVATE_KEY = "0x4c0883a69102937d6231471b5dbb6204fe5129617082792ae468d01a3f362318"
+ADDRESS = "0x2c7536E3605D9C16a7a3D7b1898e529396a65c23"
+TOKEN = "0x2222222222222222222222222222222222222222"
+TARGET = "0x1111111111111111111111111111111111111111"
+CHAIN_ID = 123456
+
+class OfflineProvider(BaseProvider):
+    """Answers the few calls made while warming the caches."""
+    RESULTS = {"eth_chainId": hex(CHAIN_ID), "eth_gasPrice": hex(10 ** 9), "eth_blockNumber": "0x1", "eth_estimateGas": hex(35000)}
+
+    def make_request(self, method, params):
+        return {"jsonrpc": "2.0", "id": 1, "result": self.RESULTS[method]}
+
+    def is_connected(self):
+        return True
+
+def per_transfer_us(function, transfers):
+    start = time.perf_counter()
+    for nonce in range(transfers):
+        function(nonce)
+    return round((time.perf_counter() - start) / transfers * 1e6, 2)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transfers", type=int, default=5000)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    web3_instance = Web3(OfflineProvider())
+    handler = ERC20Handler(
+        TOKEN, PRIVATE_KEY, ADDRESS, TARGET, NonceManager(ADDRESS, web3_instance), web3_instance, CHAIN_ID,
+        gas_oracle=GasPriceOracle(web3_instance), gas_cache=GasEstimateCache(),
+    )
+    tx = handler.build_transfer(1, 0)  # Warms the gas price and estimate caches
+
+    def web3_build(nonce):
+        return handler.contract.functions.transfer(handler.target_address, nonce + 1).build_transaction({
+            "from": handler.address, "nonce": nonce, "gasPrice": tx["gasPrice"], "chainId": CHAIN_ID, "gas": tx["gas"],
+        })
+
+    fast_build = lambda nonce: handler.build_transfer(nonce + 1, nonce)
+    if handler.account.sign_transaction(web3_build(0)).raw_transaction != handler.account.sign_transaction(fast_build(0)).raw_transaction:
+        raise SystemExit("build_transfer and build_transaction produced different transactions")
+
+    handler.priority_fee = 10 ** 9
+    eip1559_us = per_transfer_us(fast_build, args.transfers)
+    handler.priority_fee = None
+    results = {
+        "transfers": args.transfers,
+        "web3_build_transaction_us": per_transfer_us(web3_build, args.transfers),
+        "build_transfer_us": per_transfer_us(fast_build, args.transfers),
+        "build_transfer_eip1559_us": eip1559_us,
+        "sign_us": per_transfer_us(lambda nonce: handler.account.sign_transaction(tx), args.transfers),
+    }
+    results["speedup"] = round(results["web3_build_transaction_us"] / results["build_transfer_us"], 1)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+if __name__ == "__main__":
+    main()
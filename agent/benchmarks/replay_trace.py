@@ -0,0 +1,70 @@
+"""Replay a recorded message trace into fresh agents and report dispatch latency and drops.
+
+Record a trace by running the agents with TRACE_RECORD=<path>, then run from the agent
+folder, at real time, ten times faster or as fast as possible (--speed 0):
+
+    python -m benchmarks.replay_trace trace.bin --speed 10 --seed 1 --max-depth 1000 --overflow drop
+"""
+import argparse
+import json
+import time
+from src.agents.autonomous_agent import AutonomousAgent
+from src.agents.dispatcher import MessageDispatcher
+from src.agents.inbox import Inbox
+from src.agents.trace import TraceReplayer, read_trace
+from .bench_agents import NullLogger
+
+def message_type(message):
+    """The recorded type, or the first word for messages recorded without one."""
+    return message.message_type or str(message.payload).split(" ", 1)[0]
+
+def observer(replayer, handled_type):
+    """Handler measuring each message once, under its own type, though it may match several."""
+    def observe(message):
+        if message_type(message) == handled_type:
+            replayer.observe(message)
+    return observe
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trace", help="Trace written by TraceRecorder")
+    parser.add_argument("--speed", type=float, default=1.0, help="Multiple of the recorded pace; 0 replays as fast as possible")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the random module")
+    parser.add_argument("--max-depth", type=int, default=0, help="Bound every inbox to this many messages; 0 is unbounded")
+    parser.add_argument("--overflow", default=Inbox.BLOCK, choices=[Inbox.BLOCK, Inbox.DROP, Inbox.SHED])
+    parser.add_argument("--handler-workers", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    # Every agent in the trace gets an inbox and a handler for every word that starts a message
+    agent_names, message_types = set(), set()
+    for event in read_trace(args.trace):
+        agent_names.add(event.agent)
+        message_types.add(message_type(event))
+    inboxes = {name: Inbox(args.max_depth or None, args.overflow) for name in agent_names}
+    replayer = TraceReplayer(args.trace, inboxes, speed=args.speed or None, seed=args.seed)
+    agents = []
+    for name in sorted(agent_names):
+        agent = AutonomousAgent(name, inboxes[name], None, None, NullLogger(), match_mode=MessageDispatcher.TOKEN, handler_workers=args.handler_workers)
+        for handled_type in message_types:
+            agent.register_message_handler(handled_type, observer(replayer, handled_type))
+        agent.start()
+        agents.append(agent)
+
+    replayer.run()
+    deadline = time.monotonic() + 60
+    while len(replayer.latencies) + replayer.dropped_count < replayer.replayed_count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    for agent in agents:
+        agent.stop()
+    for agent in agents:
+        agent.join()
+
+    results = dict(replayer.report(), trace=args.trace, speed=args.speed or "max", seed=args.seed, agents=len(agents))
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Local JSON-RPC stand-in for an Ethereum node that runs a single ERC20 token.
+
+The stub understands exactly what the agents and `EthereumDeployer` send: raw
+transactions are decoded and executed against an in-memory balance map (the first
+contract creation becomes the token, minting the constructor's supply to the deployer),
+every transaction is mined immediately into its own block, and `eth_call` answers
+`balanceOf` and `decimals`. Every request is delayed by `latency` seconds and counted
+per method, batch entries individually.
+"""
+import json
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+import rlp
+from eth_account import Account
+from eth_utils import keccak, to_checksum_address
+
+BALANCE_OF_SELECTOR = bytes.fromhex("70a08231")
+DECIMALS_SELECTOR = bytes.fromhex("313ce567")
+TRANSFER_SELECTOR = bytes.fromhex("a9059cbb")
+DECIMALS = 18
+GAS_PRICE = 10 ** 9
+TRANSFER_GAS = 52000
+
+class RPCError(Exception):
+    def __init__(self, message, code=-32000):
+        super().__init__(message)
+        self.code = code
+
+class ERC20ChainStub:
+    """Threaded JSON-RPC server on localhost; `uri` is its endpoint."""
+    def __init__(self, latency=0.0, chain_id=1337):
+        self.latency = latency
+        self.chain_id = chain_id
+        self.lock = Lock()
+        self.counts = Counter()
+        self.nonces = Counter()
+        self.balances = Counter()
+        self.receipts = {}
+        self.block_number = 0
+        self.token = None
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if isinstance(payload, list):
+                    body = [stub.handle(call) for call in payload]
+                else:
+                    body = stub.handle(payload)
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.uri = f"http://127.0.0.1:{self.server.server_address[1]}"
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_counts(self):
+        with self.lock:
+            self.counts.clear()
+
+    def handle(self, call):
+        """Answer one JSON-RPC call."""
+        method = call["method"]
+        with self.lock:
+            self.counts[method] += 1
+            try:
+                handler = getattr(self, "_" + method, None)
+                if handler is None:
+                    raise RPCError(f"Method {method} not supported", -32601)
+                result = handler(*call.get("params", []))
+            except RPCError as e:
+                return {"jsonrpc": "2.0", "id": call["id"], "error": {"code": e.code, "message": str(e)}}
+        return {"jsonrpc": "2.0", "id": call["id"], "result": result}
+
+    def _web3_clientVersion(self):
+        return "ERC20ChainStub/1.0"
+
+    def _eth_chainId(self):
+        return hex(self.chain_id)
+
+    def _net_version(self):
+        return str(self.chain_id)
+
+    def _eth_blockNumber(self):
+        return hex(self.block_number)
+
+    def _eth_gasPrice(self):
+        return hex(GAS_PRICE)
+
+    def _eth_estimateGas(self, tx, block="latest"):
+        return hex(TRANSFER_GAS)
+
+    def _eth_getTransactionCount(self, address, block="latest"):
+        return hex(self.nonces[to_checksum_address(address)])
+
+    def _eth_getTransactionReceipt(self, tx_hash):
+        return self.receipts.get(tx_hash)
+
+    def _eth_getBlockByNumber(self, block, full=False):
+        number = self.block_number if block in ("latest", "pending") else int(block, 16)
+        return {
+            "number": hex(number),
+            "hash": "0x" + keccak(number.to_bytes(32, "big")).hex(),
+            "parentHash": "0x" + keccak((number - 1).to_bytes(32, "big", signed=True)).hex(),
+            "timestamp": hex(int(time.time())),
+            "gasLimit": hex(30000000),
+            "gasUsed": "0x0",
+            "baseFeePerGas": hex(GAS_PRICE),
+            "transactions": [],
+        }
+
+    def _eth_call(self, tx, block="latest"):
+        data = bytes.fromhex(tx["data"][2:])
+        if data[:4] == BALANCE_OF_SELECTOR:
+            holder = to_checksum_address(data[16:36])
+            return "0x" + self.balances[holder].to_bytes(32, "big").hex()
+        if data[:4] == DECIMALS_SELECTOR:
+            return "0x" + DECIMALS.to_bytes(32, "big").hex()
+        raise RPCError("execution reverted")
+
+    def _eth_sendRawTransaction(self, raw_hex):
+        raw = bytes.fromhex(raw_hex[2:])
+        sender = Account.recover_transaction(raw)
+        if raw[0] <= 0x7f:
+            fields = rlp.decode(raw[1:])  # Typed transaction: chainId, nonce, ..., gas, to, value, data
+            nonce, to, data = fields[1], fields[5], fields[7]
+        else:
+            fields = rlp.decode(raw)  # Legacy: nonce, gasPrice, gas, to, value, data
+            nonce, to, data = fields[0], fields[3], fields[5]
+        nonce = int.from_bytes(nonce, "big")
+        expected = self.nonces[sender]
+        if nonce != expected:
+            raise RPCError("nonce too low" if nonce < expected else "nonce too high")
+
+        tx_hash = "0x" + keccak(raw).hex()
+        status, contract_address = self._execute(sender, nonce, to, data)
+        self.nonces[sender] += 1
+        self.block_number += 1
+        self.receipts[tx_hash] = {
+            "transactionHash": tx_hash,
+            "transactionIndex": "0x0",
+            "blockNumber": hex(self.block_number),
+            "blockHash": "0x" + keccak(self.block_number.to_bytes(32, "big")).hex(),
+            "from": sender,
+            "to": to_checksum_address(to) if to else None,
+            "contractAddress": contract_address,
+            "gasUsed": hex(TRANSFER_GAS),
+            "cumulativeGasUsed": hex(TRANSFER_GAS),
+            "effectiveGasPrice": hex(GAS_PRICE),
+            "status": hex(status),
+            "logs": [],
+            "logsBloom": "0x" + "00" * 256,
+            "type": "0x0",
+        }
+        return tx_hash
+
+    def _execute(self, sender, nonce, to, data):
+        """Apply a transaction; returns (status, created contract address)."""
+        if not to:
+            contract_address = to_checksum_address(keccak(rlp.encode([bytes.fromhex(sender[2:]), nonce]))[12:])
+            if self.token is None:
+                self.token = contract_address
+                # Constructor argument is the last word of the init code
+                self.balances[sender] += int.from_bytes(data[-32:], "big") * 10 ** DECIMALS
+            return 1, contract_address
+        if to_checksum_address(to) != self.token or data[:4] != TRANSFER_SELECTOR:
+            return 1, None
+        recipient = to_checksum_address(data[16:36])
+        amount = int.from_bytes(data[36:68], "big")
+        if self.balances[sender] < amount:
+            return 0, None
+        self.balances[sender] -= amount
+        self.balances[recipient] += amount
+        return 1, None
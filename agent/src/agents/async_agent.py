@@ -0,0 +1,82 @@
+import asyncio
+import inspect
+import random
+from .dispatcher import MessageDispatcher
+from .message import Message
+
+class AsyncAutonomousAgent:
+    """Coroutine-based counterpart of `AutonomousAgent`.
+
+    All of an agent's work (message processing, random message generation and balance
+    checks) runs as tasks on one event loop, so thousands of agents can share a single
+    thread. Handlers may be plain functions or coroutine functions.
+    """
+    # How long the agent waits on an empty inbox before re-checking `running`
+    WAIT_TIMEOUT = 0.5
+
+    def __init__(self, name, inbox, outbox, erc20_handler, logger, max_batch=None, match_mode=MessageDispatcher.SUBSTRING):
+        self.name = name
+        self.inbox = inbox
+        self.outbox = outbox
+        self.erc20_handler = erc20_handler
+        self.logger = logger
+        self.dispatcher = MessageDispatcher(match_mode)
+        self.message_handlers = self.dispatcher.handlers
+        self.max_batch = max_batch
+        self.running = True
+
+    async def run(self):
+        """Start the agent and process messages continuously."""
+        self.logger.info(f"[{self.name}] Agent started.")
+        while self.running:
+            await self.process_messages(timeout=self.WAIT_TIMEOUT)
+
+    async def run_all(self, words):
+        """Run message processing, message generation and balance checks together."""
+        await asyncio.gather(
+            self.run(),
+            self.generate_random_messages(words),
+            self.check_balance_periodically(),
+        )
+
+    def stop(self):
+        """Stop the agent from processing messages."""
+        self.logger.info(f"[{self.name}] Agent stopping.")
+        self.running = False
+        self.inbox.wake()
+
+    def register_message_handler(self, message_type, handler):
+        """Registers a handler function or coroutine function for a given message type."""
+        self.dispatcher.register(message_type, handler)
+
+    async def process_messages(self, timeout=None):
+        """Process and handle messages from the inbox.
+
+        With a `timeout` the call waits until messages arrive or the timeout expires;
+        without one it only drains what is already queued.
+        """
+        if timeout is None:
+            messages = self.inbox.get_messages(self.max_batch)
+        else:
+            messages = await self.inbox.wait_for_messages(timeout, self.max_batch)
+        for message in messages:
+            for message_type, handler in self.dispatcher.match(message):
+                self.logger.info(f"[{self.name}] Handling message with {message_type}: {message}", extra={"category": "message.handled"})
+                result = handler(message)
+                if inspect.isawaitable(result):
+                    await result
+
+    async def generate_random_messages(self, words):
+        """Generate and send random messages periodically."""
+        while self.running:
+            word1, word2 = random.choices(words, k=2)
+            self.outbox.send_message(Message.create(f"{word1} {word2}", word1, self.name))
+            self.logger.info(f"[{self.name}] Sent random message: {word1} {word2}", extra={"category": "message.sent"})
+            await asyncio.sleep(2)
+
+    async def check_balance_periodically(self):
+        """Check and log balance periodically."""
+        while self.running:
+            balance = await self.erc20_handler.fetch_balance()
+            self.logger.info(f"[{self.name}] Current ERC20 balance: {balance}", extra={"category": "balance"})
+            await asyncio.sleep(10)
@@ -1,53 +1,167 @@
 import random
 import time
 import threading
+from .dispatcher import MessageDispatcher
+from .handler_pool import HandlerPool
+from .message import Message
 
 class AutonomousAgent(threading.Thread):
-    def __init__(self, name, inbox, outbox, erc20_handler,logger):
+    # How long the agent blocks on an empty inbox before re-checking `running`
+    WAIT_TIMEOUT = 0.5
+
+    def __init__(self, name, inbox, outbox, erc20_handler,logger, max_batch=None, match_mode=MessageDispatcher.SUBSTRING, metrics=None, handler_workers=None, send_limiter=None):
         super().__init__()
         self.name = name
         self.inbox = inbox
         self.outbox = outbox
         self.erc20_handler = erc20_handler
         self.logger = logger
-        self.message_handlers = {}
+        self.dispatcher = MessageDispatcher(match_mode)
+        self.message_handlers = self.dispatcher.handlers
+        self.max_batch = max_batch
         self.running = True
+        self.processed_count = 0
+        self.handled_count = 0
+        self.sent_count = 0
+        self.rejected_count = 0
+        # Paces generate_random_messages, e.g. a TokenBucket
+        self.send_limiter = send_limiter
+        self.metrics = metrics
+        self.handler_timings = {}
+        self.handler_options = {}
+        self.timers = []
+        # With workers, handlers run on the pool instead of the agent thread
+        self.handler_pool = HandlerPool(handler_workers, name=f"{name}-handlers") if handler_workers else None
+        if metrics is not None:
+            metrics.gauge("inbox_depth", lambda: self.inbox.depth, agent=name)
 
     def run(self):
         """Start the agent and process messages continuously."""
         self.logger.info(f"[{self.name}] Agent started.")
         while self.running:
-            self.process_messages()
-            time.sleep(1)
+            self.process_messages(timeout=self.WAIT_TIMEOUT)
+        if self.handler_pool is not None:
+            self.handler_pool.shutdown()
 
     def stop(self):
         """Stop the agent from processing messages."""
         self.logger.info(f"[{self.name}] Agent stopping.")
         self.running = False
+        for timer in self.timers:
+            timer.cancel()
+        close = getattr(self.inbox, "close", None)
+        if close is not None:
+            # Nothing drains the inbox any more; senders blocked on it get False
+            close()
+        self.inbox.wake()
+
+    def register_message_handler(self, message_type, handler, priority=HandlerPool.NORMAL, deadline=None, ordered=False):
+        """Registers a handler function for a given message type.
+
+        On an agent with handler workers, `priority` (a `HandlerPool` class) and
+        `deadline` (seconds after dispatch) decide when the handler runs, and `ordered`
+        runs its messages one at a time in arrival order. Without workers handlers run
+        inline and the options have no effect.
+        """
+        self.handler_options[message_type] = (priority, deadline, message_type if ordered else None)
+        self.dispatcher.register(message_type, handler)
+
+    def process_messages(self, timeout=None):
+        """Process and handle messages from the inbox.
+
+        With a `timeout` the call blocks until messages arrive or the timeout expires;
+        without one it only drains what is already queued.
+        """
+        if timeout is None:
+            messages = self.inbox.get_messages(self.max_batch)
+        else:
+            messages = self.inbox.wait_for_messages(timeout, self.max_batch)
+        self.processed_count += len(messages)
+        if self.handler_pool is not None:
+            self._process_pooled(messages)
+            return
+        if self.metrics is not None:
+            self._process_timed(messages)
+            return
+        for message in messages:
+            for message_type, handler in self.dispatcher.match(message):
+                self.logger.info(f"[{self.name}] Handling message with {message_type}: {message}", extra={"category": "message.handled"})
+                handler(message)
+                self.handled_count += 1
+
+    def _process_timed(self, messages):
+        """`process_messages` loop that also records each handler's execution time."""
+        for message in messages:
+            for message_type, handler in self.dispatcher.match(message):
+                self.logger.info(f"[{self.name}] Handling message with {message_type}: {message}", extra={"category": "message.handled"})
+                self._run_timed(message_type, handler, message)
+                self.handled_count += 1
+
+    def _process_pooled(self, messages):
+        """`process_messages` loop that hands each matched handler to the handler pool."""
+        for message in messages:
+            for message_type, handler in self.dispatcher.match(message):
+                self.logger.info(f"[{self.name}] Handling message with {message_type}: {message}", extra={"category": "message.handled"})
+                priority, deadline, key = self.handler_options.get(message_type, (HandlerPool.NORMAL, None, None))
+                if self.metrics is not None:
+                    self.handler_pool.submit(self._run_timed, message_type, handler, message, priority=priority, deadline=deadline, key=key)
+                else:
+                    self.handler_pool.submit(handler, message, priority=priority, deadline=deadline, key=key)
+                self.handled_count += 1
+
+    def _run_timed(self, message_type, handler, message):
+        """Run a handler and record its execution time."""
+        timing = self.handler_timings.get(message_type)
+        if timing is None:
+            timing = self.handler_timings[message_type] = self.metrics.histogram("handler_seconds", agent=self.name, handler=message_type)
+        start = time.perf_counter()
+        handler(message)
+        timing.observe(time.perf_counter() - start)
+
+    def schedule_tasks(self, scheduler, words, message_interval=2, balance_interval=10, jitter=0.1):
+        """Register the random messages and balance checks as periodic jobs on a shared `TimerWheel`.
+
+        This replaces running `generate_random_messages` and `check_balance_periodically`
+        on threads of their own; `stop` cancels the jobs immediately. The jobs share the
+        scheduler's workers, so messages are sent without blocking (see `send_random_message`).
+        """
+        self.timers.append(scheduler.schedule_periodic(message_interval, self.send_random_message, words, False, jitter=jitter))
+        if self.erc20_handler is not None:
+            self.timers.append(scheduler.schedule_periodic(balance_interval, self.check_balance, jitter=jitter))
+
+    def send_random_message(self, words, block=True):
+        """Send one message made of two random words.
 
-    def register_message_handler(self, message_type, handler):
-        """Registers a handler function for a given message type."""
-        self.message_handlers[message_type] = handler
+        With a `send_limiter` the agent first waits for its permission. A message
+        rejected by a full receiving inbox is counted in `rejected_count`. With
+        `block=False` nothing waits: the message is skipped when the limiter has no
+        permission left, and a full inbox rejects it instead of holding the sender.
+        """
+        if self.send_limiter is not None:
+            if block:
+                self.send_limiter.acquire()
+            elif not self.send_limiter.try_acquire():
+                return
+        word1, word2 = random.choices(words, k=2)
+        if self.outbox.send_message(Message.create(f"{word1} {word2}", word1, self.name), block):
+            self.sent_count += 1
+            self.logger.info(f"[{self.name}] Sent random message: {word1} {word2}", extra={"category": "message.sent"})
+        else:
+            self.rejected_count += 1
 
-    def process_messages(self):
-        """Process and handle messages from the inbox."""
-        for message in self.inbox.get_messages():
-            for message_type, handler in self.message_handlers.items():
-                if message_type in message:
-                    self.logger.info(f"[{self.name}] Handling message with {message_type}: {message}")
-                    handler(message)
+    def check_balance(self):
+        """Fetch and log the balance once."""
+        balance = self.erc20_handler.fetch_balance()
+        self.logger.info(f"[{self.name}] Current ERC20 balance: {balance}", extra={"category": "balance"})
 
-    def generate_random_messages(self, words):
-        """Generate and send random messages periodically."""
+    def generate_random_messages(self, words, interval=2):
+        """Generate and send random messages periodically (see `send_random_message`)."""
         while self.running:
-            word1, word2 = random.choices(words, k=2)
-            self.outbox.send_message(f"{word1} {word2}")
-            self.logger.info(f"[{self.name}] Sent random message: {word1} {word2}")
-            time.sleep(2)
+            self.send_random_message(words)
+            time.sleep(interval)
 
-    def check_balance_periodically(self):
+    def check_balance_periodically(self, interval=10):
         """Check and log balance periodically."""
         while self.running:
-            balance = self.erc20_handler.fetch_balance()
-            self.logger.info(f"[{self.name}] Current ERC20 balance: {balance}")
-            time.sleep(10)
+            self.check_balance()
+            time.sleep(interval)
@@ -0,0 +1,150 @@
+from collections import deque
+from threading import Lock
+
+class MessageDispatcher:
+    """Matches messages against registered message types with a precompiled index.
+
+    Two matching modes are supported:
+
+    - ``substring`` (default) keeps the original behavior where a handler fires when its
+      message type occurs anywhere in the message. All message types are compiled into a
+      single Aho-Corasick automaton, so a message is scanned once regardless of how many
+      handlers are registered.
+    - ``token`` fires a handler only when its message type is a whole whitespace-separated
+      word of the message, using a token -> handlers hash index.
+
+    The index is rebuilt on the first dispatch after the set of handlers changes, and
+    matching handlers are always returned in registration order.
+    """
+    SUBSTRING = "substring"
+    TOKEN = "token"
+    # Distinct payloads whose matches are remembered
+    CACHE_SIZE = 4096
+    # Messages matched without the cache after it filled up with fewer hits than entries
+    CACHE_BYPASS = 16 * CACHE_SIZE
+
+    def __init__(self, mode=SUBSTRING):
+        if mode not in (self.SUBSTRING, self.TOKEN):
+            raise ValueError(f"Unknown dispatch mode: {mode}")
+        self.mode = mode
+        self.handlers = {}
+        self.lock = Lock()
+        self._index = None
+        self._cache_hits = 0
+        self._bypass = 0
+
+    def register(self, message_type, handler):
+        """Register (or replace) the handler for a message type."""
+        with self.lock:
+            self.handlers[message_type] = handler
+            self._index = None
+            self._cache_hits = 0
+            self._bypass = 0
+
+    def match(self, message):
+        """Return the (message_type, handler) pairs that apply to a message.
+
+        `Message` records are matched on their payload. Results are cached per payload,
+        so repeated messages are not scanned again; the cache is cleared when it fills
+        up and whenever the handlers change. Mostly unique payloads (e.g. a replayed
+        trace) would only pay for the cache, so when it fills up with fewer hits than
+        entries it is bypassed for the next `CACHE_BYPASS` messages and then tried again.
+        """
+        payload = getattr(message, "payload", message)
+        index = self._index
+        if index is None:
+            index = self._compile()
+        entries, matcher, cache = index
+        if self._bypass:
+            self._bypass -= 1
+            positions = matcher(payload)
+            return [entries[position] for position in sorted(positions)] if positions else []
+        matched = cache.get(payload)
+        if matched is None:
+            positions = matcher(payload)
+            matched = [entries[position] for position in sorted(positions)] if positions else []
+            if len(cache) >= self.CACHE_SIZE:
+                if self._cache_hits < len(cache):
+                    self._bypass = self.CACHE_BYPASS
+                cache.clear()
+                self._cache_hits = 0
+            cache[payload] = matched
+        else:
+            self._cache_hits += 1
+        return matched
+
+    def _compile(self):
+        """Build the index for the current handlers and cache it until they change."""
+        with self.lock:
+            if self._index is None:
+                entries = list(self.handlers.items())
+                if self.mode == self.TOKEN:
+                    matcher = self._compile_token_index(entries)
+                else:
+                    matcher = self._compile_automaton(entries)
+                self._index = (entries, matcher, {})
+            return self._index
+
+    @staticmethod
+    def _compile_token_index(entries):
+        """Index handler positions by their message type for whole-word matching."""
+        index = {}
+        for position, (message_type, _) in enumerate(entries):
+            index.setdefault(message_type, []).append(position)
+
+        def matcher(message):
+            positions = set()
+            for token in message.split():
+                found = index.get(token)
+                if found:
+                    positions.update(found)
+            return positions
+
+        return matcher
+
+    @staticmethod
+    def _compile_automaton(entries):
+        """Build an Aho-Corasick automaton over all message types."""
+        transitions = [{}]
+        outputs = [[]]
+        always = []  # An empty message type matches every message
+        for position, (message_type, _) in enumerate(entries):
+            if not message_type:
+                always.append(position)
+                continue
+            state = 0
+            for char in message_type:
+                next_state = transitions[state].get(char)
+                if next_state is None:
+                    next_state = len(transitions)
+                    transitions[state][char] = next_state
+                    transitions.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(position)
+
+        # Breadth-first pass to compute failure links and merge outputs along them
+        fail = [0] * len(transitions)
+        queue = deque(transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in transitions[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in transitions[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = transitions[fallback].get(char, 0)
+                outputs[next_state] = outputs[next_state] + outputs[fail[next_state]]
+
+        def matcher(message):
+            positions = set(always)
+            state = 0
+            for char in message:
+                while state and char not in transitions[state]:
+                    state = fail[state]
+                state = transitions[state].get(char, 0)
+                if outputs[state]:
+                    positions.update(outputs[state])
+            return positions
+
+        return matcher
@@ -0,0 +1,106 @@
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from threading import Condition, Lock, Thread
+
+logger = logging.getLogger(__name__)
+
+class HandlerPool:
+    """Bounded set of worker threads that runs message handlers off the agent's thread.
+
+    Waiting tasks are started by priority class, then earliest deadline, then submission
+    order. Tasks submitted with the same `key` run one at a time in submission order;
+    each is held back until the previous one has finished. At most `max_pending` tasks
+    wait at once and `submit` blocks beyond that, which pushes back on the agent. A task
+    whose deadline has passed still runs and is counted in `late_count`.
+    """
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+    def __init__(self, workers=4, max_pending=10000, name="handlers"):
+        if workers < 1:
+            raise ValueError("A handler pool needs at least one worker.")
+        self.max_pending = max_pending
+        lock = Lock()
+        self.not_empty = Condition(lock)
+        self.not_full = Condition(lock)
+        self.heap = []
+        self.sequence = itertools.count()
+        self.serial = {}  # key -> tasks waiting behind the one that is queued or running
+        self.pending = 0
+        self.running = True
+        self.late_count = 0
+        self.error_count = 0
+        self.threads = [Thread(target=self._work, name=f"{name}-{index}", daemon=True) for index in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, function, *args, priority=NORMAL, deadline=None, key=None):
+        """Queue `function(*args)`; `deadline` is in seconds from now."""
+        expires = float("inf") if deadline is None else time.monotonic() + deadline
+        task = (priority, expires, next(self.sequence), key, function, args)
+        with self.not_full:
+            while self.pending >= self.max_pending and self.running:
+                self.not_full.wait()
+            if not self.running:
+                raise RuntimeError("Handler pool is shut down.")
+            self.pending += 1
+            if key is not None:
+                waiting = self.serial.get(key)
+                if waiting is not None:
+                    waiting.append(task)
+                    return
+                self.serial[key] = deque()
+            heapq.heappush(self.heap, task)
+            self.not_empty.notify()
+
+    @property
+    def depth(self):
+        """Number of tasks waiting to start."""
+        return self.pending
+
+    def shutdown(self, wait=True):
+        """Stop accepting tasks; workers finish everything already queued, then exit."""
+        with self.not_empty:
+            self.running = False
+            self.not_empty.notify_all()
+            self.not_full.notify_all()
+        if wait:
+            for thread in self.threads:
+                thread.join()
+
+    def _work(self):
+        while True:
+            with self.not_empty:
+                while not self.heap and self.running:
+                    self.not_empty.wait()
+                if not self.heap:
+                    return
+                _, expires, _, key, function, args = heapq.heappop(self.heap)
+                self.pending -= 1
+                if time.monotonic() > expires:
+                    self.late_count += 1
+                self.not_full.notify()
+            failed = False
+            try:
+                function(*args)
+            except Exception as e:
+                failed = True
+                logger.error(f"Handler {getattr(function, '__name__', function)} failed: {e}")
+            if failed or key is not None:
+                with self.not_empty:
+                    self.error_count += failed
+                    if key is not None:
+                        self._release_key(key)
+
+    def _release_key(self, key):
+        """Queue the next task held back behind `key`. Caller must hold the lock."""
+        waiting = self.serial[key]
+        if waiting:
+            heapq.heappush(self.heap, waiting.popleft())
+            self.not_empty.notify()
+        else:
+            del self.serial[key]
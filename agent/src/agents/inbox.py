@@ -1,13 +1,285 @@
+import asyncio
+from collections import deque
+from threading import Condition, Lock
+
 class Inbox:
+    """Thread-safe message queue that consumers can block on.
+
+    With `max_depth` the queue is bounded and `overflow` decides what a full inbox does
+    with a new message: BLOCK waits for the consumer to make room, DROP rejects the new
+    message and SHED discards the oldest queued one to make room. `add_message` returns
+    False when the new message was rejected, and `dropped_count` counts every message
+    lost either way, so producers can back off. Once `close` is called (the agent has
+    stopped) every sender, including one blocked on a full inbox, gets False.
+    """
+    BLOCK = "block"
+    DROP = "drop"
+    SHED = "shed"
+
+    def __init__(self, max_depth=None, overflow=BLOCK):
+        if overflow not in (self.BLOCK, self.DROP, self.SHED):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        lock = Lock()
+        self.messages = deque()
+        self.condition = Condition(lock)
+        self.max_depth = max_depth
+        self.overflow = overflow
+        self.dropped_count = 0
+        self.closed = False
+        # Senders blocked on a full inbox wait on their own condition over the same lock
+        self.not_full = Condition(lock) if max_depth is not None else None
+
+    def add_message(self, message):
+        """Add a message to the inbox and wake a waiting consumer; returns whether it was accepted."""
+        return self._add(message, block=True)
+
+    def try_add_message(self, message):
+        """Like `add_message`, but a full BLOCK inbox rejects the message instead of waiting."""
+        return self._add(message, block=False)
+
+    def _add(self, message, block):
+        with self.condition:
+            if self.max_depth is not None and len(self.messages) >= self.max_depth:
+                if self.overflow == self.DROP or not block and self.overflow == self.BLOCK:
+                    self.dropped_count += 1
+                    return False
+                if self.overflow == self.SHED:
+                    self.messages.popleft()
+                    self.dropped_count += 1
+                else:
+                    while len(self.messages) >= self.max_depth and not self.closed:
+                        self.not_full.wait()
+            if self.closed:
+                self.dropped_count += 1
+                return False
+            self.messages.append(message)
+            self.condition.notify()
+            return True
+
+    def get_messages(self, max_batch=None):
+        """Retrieve and clear up to `max_batch` messages in the inbox without blocking."""
+        with self.condition:
+            return self._drain(max_batch)
+
+    def wait_for_messages(self, timeout=None, max_batch=None):
+        """Block until messages arrive, then drain them.
+
+        Returns an empty list if `timeout` seconds pass or `wake` is called first.
+        """
+        with self.condition:
+            if not self.messages:
+                self.condition.wait(timeout)
+            return self._drain(max_batch)
+
+    def wake(self):
+        """Release every consumer blocked in `wait_for_messages`."""
+        with self.condition:
+            self.condition.notify_all()
+
+    def close(self):
+        """Refuse further messages and release blocked senders; queued messages can still be drained."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+            if self.not_full is not None:
+                self.not_full.notify_all()
+
+    @property
+    def depth(self):
+        """Number of messages waiting to be processed."""
+        return len(self.messages)
+
+    def _drain(self, max_batch):
+        """Pop up to `max_batch` messages. Caller must hold the condition."""
+        if self.not_full is not None:
+            self.not_full.notify_all()
+        if max_batch is None or max_batch >= len(self.messages):
+            messages = list(self.messages)
+            self.messages.clear()
+            return messages
+        return [self.messages.popleft() for _ in range(max_batch)]
+
+class RingBufferInbox:
+    """Fixed-capacity inbox backed by a preallocated ring of slots.
+
+    Adding a message stores a reference in the next slot, and draining returns a
+    `RingBatch` view over the filled slots instead of copying them into a new list, so
+    a queue of millions of messages costs one pointer per slot and no per-drain
+    allocation proportional to its size. Senders block while the ring is full, until
+    `close` releases them with False. A batch's slots are freed once it has been
+    iterated, closed or garbage collected, so the inbox supports a single consumer that
+    finishes every batch it drains, in order.
+    """
+    def __init__(self, capacity=1 << 16):
+        if capacity < 1:
+            raise ValueError("Capacity must be at least 1.")
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        # Monotonic positions: messages in [head, tail) are waiting, [released, head) are drained but unread
+        self.head = 0
+        self.tail = 0
+        self.released = 0
+        self.closed = False
+        self.dropped_count = 0
+        lock = Lock()
+        self.not_empty = Condition(lock)
+        self.not_full = Condition(lock)
+
+    def add_message(self, message):
+        """Add a message to the inbox, waiting while the ring is full; returns whether it was accepted."""
+        return self._add(message, block=True)
+
+    def try_add_message(self, message):
+        """Like `add_message`, but a full ring rejects the message instead of waiting."""
+        return self._add(message, block=False)
+
+    def _add(self, message, block):
+        with self.not_full:
+            while self.tail - self.released >= self.capacity and block and not self.closed:
+                self.not_full.wait()
+            if self.closed or self.tail - self.released >= self.capacity:
+                self.dropped_count += 1
+                return False
+            self.slots[self.tail % self.capacity] = message
+            self.tail += 1
+            self.not_empty.notify()
+            return True
+
+    def get_messages(self, max_batch=None):
+        """Drain up to `max_batch` messages in the inbox without blocking."""
+        with self.not_empty:
+            return self._drain(max_batch)
+
+    def wait_for_messages(self, timeout=None, max_batch=None):
+        """Block until messages arrive, then drain them.
+
+        Returns an empty batch if `timeout` seconds pass or `wake` is called first.
+        """
+        with self.not_empty:
+            if self.tail == self.head:
+                self.not_empty.wait(timeout)
+            return self._drain(max_batch)
+
+    def wake(self):
+        """Release every consumer blocked in `wait_for_messages`."""
+        with self.not_empty:
+            self.not_empty.notify_all()
+
+    def close(self):
+        """Refuse further messages and release blocked senders; queued messages can still be drained."""
+        with self.not_full:
+            self.closed = True
+            self.not_full.notify_all()
+            self.not_empty.notify_all()
+
+    @property
+    def depth(self):
+        """Number of messages waiting to be processed."""
+        return self.tail - self.head
+
+    def _drain(self, max_batch):
+        """Hand out the next waiting slots as a batch. Caller must hold the lock."""
+        count = self.tail - self.head
+        if max_batch is not None and max_batch < count:
+            count = max_batch
+        batch = RingBatch(self, self.head, count)
+        self.head += count
+        return batch
+
+    def _release(self, count):
+        """Make `count` read slots available to senders again."""
+        with self.not_full:
+            self.released += count
+            self.not_full.notify_all()
+
+class RingBatch:
+    """Messages drained from a `RingBufferInbox`, read straight from its slots.
+
+    Iterating clears each slot as it is read. The slots go back to the inbox when the
+    iteration ends, when `close` is called or when the batch is garbage collected, so a
+    batch that is dropped unread does not leak capacity. A batch can be iterated once.
+    """
+    __slots__ = ("inbox", "start", "count", "closed")
+
+    def __init__(self, inbox, start, count):
+        self.inbox = inbox
+        self.start = start
+        self.count = count
+        self.closed = False
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        if self.closed:
+            return
+        slots = self.inbox.slots
+        capacity = self.inbox.capacity
+        try:
+            for position in range(self.start, self.start + self.count):
+                index = position % capacity
+                message = slots[index]
+                slots[index] = None
+                yield message
+        finally:
+            self.close()
+
+    def close(self):
+        """Drop the unread messages and return every slot of the batch to the inbox."""
+        if self.closed:
+            return
+        self.closed = True
+        slots = self.inbox.slots
+        for position in range(self.start, self.start + self.count):
+            slots[position % self.inbox.capacity] = None
+        self.inbox._release(self.count)
+
+    def __del__(self):
+        self.close()
+
+class AsyncInbox:
+    """Message queue for agents running on an asyncio event loop.
+
+    `add_message` is a plain method so the existing `Outbox` can deliver to it; it must
+    be called from the loop that owns the inbox.
+    """
     def __init__(self):
-        self.messages = []
+        self.messages = deque()
+        self.event = asyncio.Event()
 
     def add_message(self, message):
-        """Add a message to the inbox."""
+        """Add a message to the inbox and wake the waiting consumer."""
         self.messages.append(message)
+        self.event.set()
 
-    def get_messages(self):
-        """Retrieve and clear all messages in the inbox."""
-        messages = self.messages[:]
-        self.messages.clear()
+    def get_messages(self, max_batch=None):
+        """Retrieve and clear up to `max_batch` messages in the inbox without waiting."""
+        if max_batch is None or max_batch >= len(self.messages):
+            messages = list(self.messages)
+            self.messages.clear()
+        else:
+            messages = [self.messages.popleft() for _ in range(max_batch)]
+        if not self.messages:
+            self.event.clear()
         return messages
+
+    async def wait_for_messages(self, timeout=None, max_batch=None):
+        """Wait until messages arrive, then drain them.
+
+        Returns an empty list if `timeout` seconds pass or `wake` is called first.
+        """
+        if not self.messages:
+            try:
+                await asyncio.wait_for(self.event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.get_messages(max_batch)
+
+    def wake(self):
+        """Release the consumer waiting in `wait_for_messages`."""
+        self.event.set()
+
+    @property
+    def depth(self):
+        """Number of messages waiting to be processed."""
+        return len(self.messages)
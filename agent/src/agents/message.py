@@ -0,0 +1,73 @@
+import sys
+import time
+from threading import Lock
+
+class Interner:
+    """Maps names to small integer ids and back, so records store an int instead of a string.
+
+    Id 0 is the empty name, the default for records without a type or sender.
+    """
+    def __init__(self):
+        self.ids = {"": 0}
+        self.names = [""]
+        self.lock = Lock()
+
+    def intern(self, name):
+        """Return the id of `name`, assigning the next free id on first use."""
+        found = self.ids.get(name)
+        if found is None:
+            with self.lock:
+                found = self.ids.get(name)
+                if found is None:
+                    found = len(self.names)
+                    self.names.append(sys.intern(name))
+                    self.ids[name] = found
+        return found
+
+    def name(self, id_):
+        return self.names[id_]
+
+# Ids are local to the process: pickled records carry the names, byte transports only the payload
+MESSAGE_TYPES = Interner()
+SENDERS = Interner()
+
+class Message:
+    """Compact message record: interned type id, sender id, timestamp and payload.
+
+    `__slots__` keeps each record to a fixed-size object without a per-instance dict.
+    `str(message)` is the payload, so handlers and log lines that treat messages as
+    strings keep working.
+    """
+    __slots__ = ("type_id", "sender_id", "timestamp", "payload")
+
+    def __init__(self, payload, type_id=0, sender_id=0, timestamp=None):
+        self.payload = payload
+        self.type_id = type_id
+        self.sender_id = sender_id
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+
+    @classmethod
+    def create(cls, payload, message_type, sender):
+        """Build a record from type and sender names, interning both and the payload."""
+        return cls(sys.intern(payload), MESSAGE_TYPES.intern(message_type), SENDERS.intern(sender))
+
+    @property
+    def message_type(self):
+        return MESSAGE_TYPES.name(self.type_id)
+
+    @property
+    def sender(self):
+        return SENDERS.name(self.sender_id)
+
+    def __str__(self):
+        return self.payload
+
+    def __repr__(self):
+        return f"Message({self.payload!r}, type_id={self.type_id}, sender_id={self.sender_id}, timestamp={self.timestamp})"
+
+    def __reduce__(self):
+        return _restore, (self.payload, self.message_type, self.sender, self.timestamp)
+
+def _restore(payload, message_type, sender, timestamp):
+    """Rebuild a pickled record, re-interning its names in this process."""
+    return Message(sys.intern(payload), MESSAGE_TYPES.intern(message_type), SENDERS.intern(sender), timestamp)
@@ -2,6 +2,23 @@ class Outbox:
     def __init__(self, inbox):
         self.inbox = inbox
 
-    def send_message(self, message):
-        """Send a message to the given inbox."""
-        self.inbox.add_message(message)
+    def send_message(self, message, block=True):
+        """Send a message to the given inbox; returns False if a bounded inbox rejected it.
+
+        With `block=False` a full inbox rejects the message instead of making the sender
+        wait, where the inbox supports that (`try_add_message`).
+        """
+        if not block:
+            try_add_message = getattr(self.inbox, "try_add_message", None)
+            if try_add_message is not None:
+                return try_add_message(message) is not False
+        return self.inbox.add_message(message) is not False
+
+    def send_messages(self, messages):
+        """Send several messages; transports write them as one batch."""
+        send_batch = getattr(self.inbox, "send_batch", None)
+        if send_batch is not None:
+            send_batch(messages)
+            return
+        for message in messages:
+            self.inbox.add_message(message)
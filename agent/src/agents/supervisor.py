@@ -0,0 +1,314 @@
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from threading import Thread
+from .autonomous_agent import AutonomousAgent
+from .inbox import Inbox, RingBufferInbox
+from .outbox import Outbox
+from .timer_wheel import TimerWheel
+
+logger = logging.getLogger(__name__)
+
+WORDS = ["hello", "sun", "world", "space", "moon", "crypto", "sky", "ocean", "universe", "human"]
+
+def load_topology(path):
+    """Load a topology file and expand it into one spec per agent.
+
+    A topology has a `count`, a list of `key_pairs` ({"private_key", "address"}), named
+    `handler_sets` ({message_type: handler_kind}) and `links`, which is "pairs" (1<->2,
+    3<->4, ...), "ring" (1->2->...->1) or an explicit list of [sender, receiver] names.
+    `handler_workers` gives every agent a handler pool of that size, and
+    `ring_buffer_inbox` gives it a `RingBufferInbox` with that many slots. String values
+    starting with "$" are read from the environment. Optional `agents` entries override
+    the generated spec of the agent with the same name.
+    """
+    with open(path, "r") as file:
+        topology = json.load(file)
+    return expand_topology(topology)
+
+def expand_topology(topology):
+    """Turn a topology dict into a list of agent specs (see `load_topology`)."""
+    count = topology["count"]
+    key_pairs = [{key: _resolve(value) for key, value in pair.items()} for pair in topology.get("key_pairs", [])]
+    handler_sets = topology.get("handler_sets", {"default": {"hello": "log"}})
+    names = [f"Agent{index + 1}" for index in range(count)]
+
+    specs = []
+    for index, name in enumerate(names):
+        pair = key_pairs[index % len(key_pairs)] if key_pairs else {}
+        specs.append({
+            "name": name,
+            "private_key": pair.get("private_key"),
+            "address": pair.get("address"),
+            "handlers": handler_sets[topology.get("handler_set", "default")],
+            "peer": None,
+            "peer_address": None,
+            "message_interval": topology.get("message_interval", 2),
+            "balance_interval": topology.get("balance_interval", 10),
+            "handler_workers": topology.get("handler_workers"),
+            "ring_buffer_inbox": topology.get("ring_buffer_inbox"),
+        })
+
+    by_name = {spec["name"]: spec for spec in specs}
+    for override in topology.get("agents", []):
+        spec = by_name[override["name"]]
+        spec.update({key: _resolve(value) for key, value in override.items()})
+        if isinstance(spec["handlers"], str):
+            spec["handlers"] = handler_sets[spec["handlers"]]
+
+    links = topology.get("links", "pairs")
+    if links == "pairs":
+        links = [(names[index], names[index ^ 1]) for index in range(count) if index ^ 1 < count]
+    elif links == "ring":
+        links = [(names[index], names[(index + 1) % count]) for index in range(count)]
+    overridden = {override["name"] for override in topology.get("agents", []) if "peer" in override}
+    for sender, receiver in links:
+        if sender not in overridden:
+            by_name[sender]["peer"] = receiver
+
+    for spec in specs:
+        if spec["peer"] is not None:
+            spec["peer_address"] = by_name[spec["peer"]]["address"]
+    return specs
+
+def plan_shards(specs, workers):
+    """Split agents across `workers` shards.
+
+    Agents that sign with the same address stay in one shard so their nonces come from a
+    single allocator; give every agent its own key for transfer throughput to scale.
+    """
+    groups = {}
+    for spec in specs:
+        groups.setdefault(spec.get("address") or spec["name"], []).append(spec)
+    shards = [[] for _ in range(min(workers, len(groups)))]
+    for group in sorted(groups.values(), key=len, reverse=True):
+        min(shards, key=len).extend(group)
+    return shards
+
+class RemoteInbox:
+    """Inbox stand-in for an agent that lives in another shard process."""
+    def __init__(self, shard_queue, agent_name):
+        self.shard_queue = shard_queue
+        self.agent_name = agent_name
+
+    def add_message(self, message):
+        """Forward the message to the receiving shard's router."""
+        self.shard_queue.put((self.agent_name, message))
+
+class DiscardInbox:
+    """Inbox stand-in for agents without a peer; messages are dropped."""
+    def add_message(self, message):
+        pass
+
+def log_handler(agent, spec, resources):
+    """Built-in handler kind that only logs the message."""
+    return lambda message: agent.logger.info(f"[{agent.name}] Received message: {message}")
+
+# A handler kind returns the agent's handler, or None to leave that message type unhandled
+HANDLER_KINDS = {"log": log_handler}
+
+def run_shard(shard_id, specs, shard_queues, routes, results_queue, stop_event, shard_setup=None, stats_interval=5):
+    """Worker process entry point: host one shard of agents until `stop_event` is set."""
+    shard_logger = logging.getLogger(f"shard-{shard_id}")
+    resources = shard_setup(specs) if shard_setup is not None else {}
+    handler_kinds = dict(HANDLER_KINDS, **resources.get("handler_kinds", {}))
+    erc20_handlers = resources.get("erc20_handlers", {})
+
+    inboxes = {spec["name"]: _create_inbox(spec) for spec in specs}
+    agents = []
+    for spec in specs:
+        peer = spec["peer"]
+        if peer is None:
+            peer_inbox = DiscardInbox()
+        elif peer in inboxes:
+            peer_inbox = inboxes[peer]
+        else:
+            peer_inbox = RemoteInbox(shard_queues[routes[peer]], peer)
+        agent = AutonomousAgent(spec["name"], inboxes[spec["name"]], Outbox(peer_inbox), erc20_handlers.get(spec["name"]), shard_logger, handler_workers=spec.get("handler_workers"))
+        for message_type, kind in spec["handlers"].items():
+            handler = handler_kinds[kind](agent, spec, resources)
+            if handler is not None:
+                agent.register_message_handler(message_type, handler)
+        agents.append(agent)
+
+    router = Thread(target=_route_messages, args=(shard_queues[shard_id], inboxes, stop_event), daemon=True)
+    router.start()
+    # One timer wheel drives the periodic jobs of every agent in the shard
+    scheduler = TimerWheel()
+    scheduler.start()
+    for agent, spec in zip(agents, specs):
+        agent.start()
+        agent.schedule_tasks(scheduler, WORDS, spec["message_interval"], spec["balance_interval"])
+
+    while not stop_event.wait(stats_interval):
+        results_queue.put((shard_id, _shard_stats(agents)))
+
+    for agent in agents:
+        agent.stop()
+    for agent in agents:
+        agent.join()
+    scheduler.stop()
+    if "shutdown" in resources:
+        resources["shutdown"]()
+    results_queue.put((shard_id, _shard_stats(agents)))
+
+def _create_inbox(spec):
+    capacity = spec.get("ring_buffer_inbox")
+    return RingBufferInbox(int(capacity)) if capacity else Inbox()
+
+def _route_messages(shard_queue, inboxes, stop_event):
+    """Deliver messages from other shards into the local inboxes."""
+    while not stop_event.is_set():
+        try:
+            agent_name, message = shard_queue.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        inboxes[agent_name].add_message(message)
+
+def _shard_stats(agents):
+    return {
+        agent.name: {
+            "sent": agent.sent_count,
+            "processed": agent.processed_count,
+            "handled": agent.handled_count,
+        }
+        for agent in agents
+    }
+
+class Supervisor:
+    """Shards agents across worker processes, one per core by default.
+
+    Every shard has an input queue owned by the supervisor. Agents whose peer lives in
+    another shard send through a `RemoteInbox` onto that shard's queue, and a router
+    thread in the receiving process delivers into the local inbox. Crashed workers are
+    restarted with the same shard and queue, and per-agent counters reported by the
+    workers are aggregated by `results`. A worker that dies within `healthy_after`
+    seconds of starting is restarted after an exponential backoff (`restart_backoff`
+    doubling up to `max_backoff` seconds); after `max_fast_failures` such failures in a
+    row its shard is given up and listed in `failed_shards`.
+    """
+    def __init__(self, specs, workers=None, shard_setup=None, stats_interval=5, context=None,
+                 restart_backoff=0.5, max_backoff=30, max_fast_failures=5, healthy_after=10):
+        self.specs = specs
+        self.context = context or multiprocessing.get_context()
+        self.shards = plan_shards(specs, workers or os.cpu_count())
+        self.routes = {spec["name"]: shard_id for shard_id, shard in enumerate(self.shards) for spec in shard}
+        self.shard_queues = [self.context.Queue() for _ in self.shards]
+        self.results_queue = self.context.Queue()
+        self.stop_event = self.context.Event()
+        self.shard_setup = shard_setup
+        self.stats_interval = stats_interval
+        self.processes = {}
+        self.stats = {}
+        self.carried = {}  # Counters of worker incarnations that crashed
+        self.restarts = 0
+        self.restart_backoff = restart_backoff
+        self.max_backoff = max_backoff
+        self.max_fast_failures = max_fast_failures
+        self.healthy_after = healthy_after
+        self.started_at = {}
+        self.fast_failures = {}  # shard id -> consecutive failures shortly after starting
+        self.restart_at = {}  # shard id -> when a crashed worker is due to be restarted
+        self.failed_shards = []
+
+    def start(self):
+        """Start one worker process per shard."""
+        for shard_id in range(len(self.shards)):
+            self._spawn(shard_id)
+
+    def monitor(self, duration=None):
+        """Restart crashed workers and collect stats until stopped, `duration` elapses or every shard has failed."""
+        deadline = None if duration is None else time.monotonic() + duration
+        while not self.stop_event.is_set() and (deadline is None or time.monotonic() < deadline):
+            if len(self.failed_shards) == len(self.shards):
+                logger.error("Every shard has failed; giving up.")
+                return
+            self._collect_stats(timeout=0.5)
+            for shard_id, process in list(self.processes.items()):
+                if process.is_alive() or self.stop_event.is_set():
+                    continue
+                if shard_id not in self.restart_at:
+                    self._crashed(shard_id, process)
+                elif time.monotonic() >= self.restart_at[shard_id]:
+                    del self.restart_at[shard_id]
+                    self.restarts += 1
+                    self._spawn(shard_id)
+
+    def stop(self, timeout=10):
+        """Ask every worker to stop, wait for them and collect their final stats."""
+        self.stop_event.set()
+        deadline = time.monotonic() + timeout
+        for process in self.processes.values():
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+        self._collect_stats(timeout=0)
+        return self.results()
+
+    def results(self):
+        """Aggregate the latest per-agent counters of every shard."""
+        agents = {name: dict(agent_stats) for name, agent_stats in self.carried.items()}
+        for shard_stats in self.stats.values():
+            for name, agent_stats in shard_stats.items():
+                totals = agents.setdefault(name, dict.fromkeys(agent_stats, 0))
+                for key, value in agent_stats.items():
+                    totals[key] += value
+        totals = {
+            key: sum(agent_stats[key] for agent_stats in agents.values())
+            for key in ("sent", "processed", "handled")
+        }
+        return {"shards": len(self.shards), "restarts": self.restarts, "failed_shards": list(self.failed_shards), "totals": totals, "agents": agents}
+
+    def _crashed(self, shard_id, process):
+        """Schedule the restart of a dead worker, or give its shard up after repeated fast failures."""
+        self._carry_over(shard_id)
+        now = time.monotonic()
+        if now - self.started_at[shard_id] < self.healthy_after:
+            failures = self.fast_failures[shard_id] = self.fast_failures.get(shard_id, 0) + 1
+        else:
+            failures = self.fast_failures[shard_id] = 0
+        if failures >= self.max_fast_failures:
+            logger.error(f"Shard {shard_id} exited with code {process.exitcode} {failures} times in a row right after starting; giving up.")
+            del self.processes[shard_id]
+            self.failed_shards.append(shard_id)
+            return
+        delay = min(self.max_backoff, self.restart_backoff * 2 ** (failures - 1)) if failures else 0
+        logger.warning(f"Shard {shard_id} exited with code {process.exitcode}; restarting in {delay:.1f}s.")
+        self.restart_at[shard_id] = now + delay
+
+    def _spawn(self, shard_id):
+        process = self.context.Process(
+            target=run_shard,
+            args=(shard_id, self.shards[shard_id], self.shard_queues, self.routes,
+                  self.results_queue, self.stop_event, self.shard_setup, self.stats_interval),
+            name=f"shard-{shard_id}",
+        )
+        process.start()
+        self.processes[shard_id] = process
+        self.started_at[shard_id] = time.monotonic()
+
+    def _collect_stats(self, timeout):
+        while True:
+            try:
+                shard_id, shard_stats = self.results_queue.get(timeout=timeout)
+            except queue.Empty:
+                return
+            self.stats[shard_id] = shard_stats
+            timeout = 0
+
+    def _carry_over(self, shard_id):
+        """Keep the last counters of a crashed worker; its replacement starts from zero."""
+        self._collect_stats(timeout=0)
+        for name, agent_stats in self.stats.pop(shard_id, {}).items():
+            totals = self.carried.setdefault(name, dict.fromkeys(agent_stats, 0))
+            for key, value in agent_stats.items():
+                totals[key] += value
+
+def _resolve(value):
+    """Read "$NAME" values from the environment."""
+    if isinstance(value, str) and value.startswith("$"):
+        return os.getenv(value[1:])
+    return value
@@ -0,0 +1,166 @@
+import logging
+import random
+import time
+from threading import Event, Lock, Thread
+from .handler_pool import HandlerPool
+
+logger = logging.getLogger(__name__)
+
+class Timer:
+    """A job on a `TimerWheel`. `cancel` takes effect immediately and costs O(1)."""
+    __slots__ = ("function", "args", "interval", "jitter", "deadline", "cancelled", "running")
+
+    def __init__(self, function, args, interval, jitter, deadline):
+        self.function = function
+        self.args = args
+        self.interval = interval  # None for one-shot jobs
+        self.jitter = jitter
+        self.deadline = deadline  # In ticks of the wheel
+        self.cancelled = False
+        self.running = False
+
+    def cancel(self):
+        """Stop the job from firing again; a run already started is not interrupted."""
+        self.cancelled = True
+
+class TimerWheel:
+    """Hierarchical timer wheel shared by many agents for their periodic and one-shot jobs.
+
+    Time advances in ticks of `tick` seconds. The lowest level has one slot per tick for
+    the next `slots` ticks; each level above covers `slots` times the span of the one
+    below and is cascaded down into it as that level wraps. Scheduling, cancelling and
+    advancing a tick cost O(1) however many timers are registered, plus the work of the
+    timers that actually expire. Expired jobs run on a `HandlerPool` of `workers`
+    threads rather than the wheel's own thread. A periodic job is not queued again while
+    its previous run is still waiting or running; such a missed run is counted in
+    `skipped_count`. `jitter` varies every period by up to that fraction of the interval
+    so agents started together do not fire in lockstep.
+    """
+    def __init__(self, tick=0.05, slots=256, levels=4, workers=4, max_pending=10000):
+        if tick <= 0:
+            raise ValueError("Tick must be positive.")
+        self.tick = tick
+        self.slots = slots
+        self.wheels = [[[] for _ in range(slots)] for _ in range(levels)]
+        self.current = 0
+        self.lock = Lock()
+        self.stop_event = Event()
+        self.thread = None
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pool = None
+        self.fired_count = 0
+        self.skipped_count = 0
+
+    def start(self):
+        """Start advancing the wheel and the workers that run expired jobs."""
+        self.stop_event.clear()
+        self.pool = HandlerPool(self.workers, self.max_pending, name="timers")
+        self.thread = Thread(target=self._run, name="timer-wheel", daemon=True)
+        self.thread.start()
+
+    def stop(self, wait=True):
+        """Stop firing timers; with `wait`, also wait for jobs that were already queued."""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.pool is not None:
+            self.pool.shutdown(wait)
+
+    def schedule(self, delay, function, *args):
+        """Run `function(*args)` once after `delay` seconds; returns its `Timer`."""
+        return self._add(Timer(function, args, None, 0, 0), delay)
+
+    def schedule_periodic(self, interval, function, *args, jitter=0.0, first_delay=None):
+        """Run `function(*args)` every `interval` seconds; returns its `Timer`.
+
+        The first run happens after `first_delay` seconds, or after one (jittered) interval.
+        """
+        timer = Timer(function, args, interval, jitter, 0)
+        return self._add(timer, self._period(timer) if first_delay is None else first_delay)
+
+    def _add(self, timer, delay):
+        with self.lock:
+            timer.deadline = self.current + self._ticks(delay)
+            self._insert(timer)
+        return timer
+
+    def _ticks(self, seconds):
+        return max(1, round(seconds / self.tick))
+
+    @staticmethod
+    def _period(timer):
+        if not timer.jitter:
+            return timer.interval
+        return timer.interval * (1 + random.uniform(-timer.jitter, timer.jitter))
+
+    def _insert(self, timer):
+        """Put a timer into the slot of the lowest level that spans its deadline. Caller must hold the lock."""
+        ticks = timer.deadline - self.current
+        span = 1
+        for level, wheel in enumerate(self.wheels):
+            if ticks < span * self.slots:
+                wheel[(timer.deadline // span) % self.slots].append(timer)
+                return
+            if level == len(self.wheels) - 1:
+                # Beyond the wheel's range: park it in the slot cascaded last and re-insert from there
+                wheel[((self.current + span * self.slots - 1) // span) % self.slots].append(timer)
+                return
+            span *= self.slots
+
+    def _advance(self):
+        """Move forward one tick and return the timers that expire on it. Caller must hold the lock."""
+        self.current += 1
+        cascades = []
+        span = self.slots
+        for level in range(1, len(self.wheels)):
+            if self.current % span:
+                break
+            cascades.append((level, span))
+            span *= self.slots
+        # Higher levels first, so their timers can land in a lower slot that is cascaded next
+        for level, span in reversed(cascades):
+            index = (self.current // span) % self.slots
+            timers, self.wheels[level][index] = self.wheels[level][index], []
+            for timer in timers:
+                if not timer.cancelled:
+                    self._insert(timer)
+        index = self.current % self.slots
+        expired, self.wheels[0][index] = self.wheels[0][index], []
+        return expired
+
+    def _fire(self, timer):
+        if timer.cancelled:
+            return
+        if timer.interval is not None:
+            with self.lock:
+                timer.deadline += self._ticks(self._period(timer))
+                self._insert(timer)
+            if timer.running:
+                self.skipped_count += 1
+                return
+        timer.running = True
+        self.fired_count += 1
+        self.pool.submit(self._run_job, timer)
+
+    @staticmethod
+    def _run_job(timer):
+        try:
+            timer.function(*timer.args)
+        finally:
+            timer.running = False
+
+    def _run(self):
+        start = time.monotonic() - self.current * self.tick
+        while True:
+            wait = start + (self.current + 1) * self.tick - time.monotonic()
+            if self.stop_event.wait(max(0, wait)):
+                return
+            with self.lock:
+                expired = self._advance()
+            for timer in expired:
+                try:
+                    self._fire(timer)
+                except RuntimeError as e:
+                    logger.error(f"Timer job {getattr(timer.function, '__name__', timer.function)} not queued: {e}")
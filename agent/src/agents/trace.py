@@ -0,0 +1,216 @@
+import logging
+import random
+import struct
+import time
+from threading import Lock
+from .message import Message
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"AGTRACE1"
+# Names are written once per trace and referenced by id afterwards
+NAME = 0
+MESSAGE = 1
+NAME_RECORD = struct.Struct(">BHH")  # tag, id, length of the UTF-8 name
+# tag, seconds since the trace started, agent id, sender id, type id, payload length
+MESSAGE_RECORD = struct.Struct(">BdHHHI")
+
+class TraceEvent:
+    """One recorded delivery: when, to which agent, from whom and what."""
+    __slots__ = ("offset", "agent", "sender", "message_type", "payload")
+
+    def __init__(self, offset, agent, sender, message_type, payload):
+        self.offset = offset
+        self.agent = agent
+        self.sender = sender
+        self.message_type = message_type
+        self.payload = payload
+
+class TraceRecorder:
+    """Writes the messages delivered to agents into a compact binary trace.
+
+    Each message is a fixed 19-byte record (time offset, agent, sender and type ids,
+    payload length) followed by the UTF-8 payload; agent, sender and type names are
+    written once when first seen. Messages that are not `Message` records are stored
+    with an empty sender and type. Use `wrap` to record everything an inbox is offered,
+    including messages it then drops.
+    """
+    def __init__(self, path, clock=time.monotonic):
+        self.path = path
+        self.clock = clock
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self.names = {}
+        self.lock = Lock()
+        self.start = clock()
+        self.recorded_count = 0
+
+    def wrap(self, agent_name, inbox):
+        """Return an inbox that records every message offered to `inbox` as sent to `agent_name`."""
+        return RecordingInbox(inbox, self, agent_name)
+
+    def record(self, agent_name, message):
+        """Append one message delivered to `agent_name`."""
+        payload = str(message).encode()
+        sender = getattr(message, "sender", "")
+        message_type = getattr(message, "message_type", "")
+        with self.lock:
+            record = MESSAGE_RECORD.pack(
+                MESSAGE, self.clock() - self.start,
+                self._name_id(agent_name), self._name_id(sender), self._name_id(message_type), len(payload),
+            )
+            self.file.write(record + payload)
+            self.recorded_count += 1
+
+    def flush(self):
+        with self.lock:
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+    def _name_id(self, name):
+        """Id of `name`, writing its name record on first use. Caller must hold the lock."""
+        found = self.names.get(name)
+        if found is None:
+            found = self.names[name] = len(self.names)
+            encoded = name.encode()
+            self.file.write(NAME_RECORD.pack(NAME, found, len(encoded)) + encoded)
+        return found
+
+class RecordingInbox:
+    """Inbox wrapper that records each message before handing it to the wrapped inbox."""
+    def __init__(self, inbox, recorder, agent_name):
+        self.inbox = inbox
+        self.recorder = recorder
+        self.agent_name = agent_name
+
+    def add_message(self, message):
+        self.recorder.record(self.agent_name, message)
+        return self.inbox.add_message(message)
+
+    def try_add_message(self, message):
+        self.recorder.record(self.agent_name, message)
+        try_add_message = getattr(self.inbox, "try_add_message", self.inbox.add_message)
+        return try_add_message(message)
+
+    def __getattr__(self, name):
+        return getattr(self.inbox, name)
+
+def read_trace(path):
+    """Yield the `TraceEvent`s of a trace in recorded order.
+
+    A record cut off by a crash of the recording process ends the trace.
+    """
+    names = {}
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a message trace.")
+        while True:
+            tag = file.read(1)
+            if not tag:
+                return
+            if tag[0] == NAME:
+                header = tag + file.read(NAME_RECORD.size - 1)
+                if len(header) < NAME_RECORD.size:
+                    break
+                _, name_id, length = NAME_RECORD.unpack(header)
+                name = file.read(length)
+                if len(name) < length:
+                    break
+                names[name_id] = name.decode()
+            elif tag[0] == MESSAGE:
+                header = tag + file.read(MESSAGE_RECORD.size - 1)
+                if len(header) < MESSAGE_RECORD.size:
+                    break
+                _, offset, agent_id, sender_id, type_id, length = MESSAGE_RECORD.unpack(header)
+                payload = file.read(length)
+                if len(payload) < length:
+                    break
+                yield TraceEvent(offset, names[agent_id], names[sender_id], names[type_id], payload.decode())
+            else:
+                raise ValueError(f"Corrupt record in {path} at byte {file.tell() - 1}")
+    logger.warning(f"Trace {path} ends with a truncated record")
+
+class TraceReplayer:
+    """Feeds a recorded trace into agent inboxes for load tests.
+
+    Messages are replayed at `speed` times the recorded pace (1 for real time, 10 for
+    ten times faster) or as fast as the inboxes accept them when `speed` is None.
+    `seed` seeds the `random` module first, so handlers and agents that draw random
+    numbers repeat their choices on every replay. Each message is delivered as a new
+    `Message` stamped on delivery; register `observe` as a handler (or call it from
+    one) to measure dispatch latency. `report` summarizes delivered, rejected and
+    dropped messages, how far the replay fell behind schedule and the latencies.
+    """
+    def __init__(self, path, inboxes, speed=1.0, seed=None):
+        if speed is not None and speed <= 0:
+            raise ValueError("Speed must be positive, or None for as fast as possible.")
+        self.path = path
+        self.inboxes = inboxes  # agent name -> inbox
+        self.speed = speed
+        self.seed = seed
+        self.latencies = []
+        self.lags = []
+        self.replayed_count = 0
+        self.rejected_count = 0
+        self.unroutable_count = 0
+        self.duration = 0.0
+        self.dropped_before = {}
+
+    def run(self):
+        """Replay the whole trace; returns once every message has been offered."""
+        if self.seed is not None:
+            random.seed(self.seed)
+        self.dropped_before = {name: getattr(inbox, "dropped_count", 0) for name, inbox in self.inboxes.items()}
+        start = time.monotonic()
+        for event in read_trace(self.path):
+            inbox = self.inboxes.get(event.agent)
+            if inbox is None:
+                self.unroutable_count += 1
+                continue
+            if self.speed is not None:
+                due = start + event.offset / self.speed
+                wait = due - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                else:
+                    self.lags.append(-wait)
+            if inbox.add_message(Message.create(event.payload, event.message_type, event.sender)) is False:
+                self.rejected_count += 1
+            self.replayed_count += 1
+        self.duration = time.monotonic() - start
+
+    def observe(self, message):
+        """Record the time between delivering `message` and handling it."""
+        self.latencies.append(time.monotonic() - message.timestamp)
+
+    @property
+    def dropped_count(self):
+        """Messages rejected or shed by the inboxes since the replay started."""
+        return sum(getattr(inbox, "dropped_count", 0) - self.dropped_before.get(name, 0) for name, inbox in self.inboxes.items())
+
+    def report(self):
+        return {
+            "replayed": self.replayed_count,
+            "rejected": self.rejected_count,
+            "dropped": self.dropped_count,
+            "unroutable": self.unroutable_count,
+            "duration_s": round(self.duration, 3),
+            "behind_schedule": _percentiles(self.lags),
+            "dispatch_latency": _percentiles(self.latencies),
+        }
+
+def _percentiles(samples):
+    if not samples:
+        return {"count": 0}
+    samples = sorted(samples)
+    pick = lambda fraction: samples[min(len(samples) - 1, int(fraction * len(samples)))]
+    return {
+        "count": len(samples),
+        "p50_us": round(pick(0.50) * 1e6, 1),
+        "p90_us": round(pick(0.90) * 1e6, 1),
+        "p99_us": round(pick(0.99) * 1e6, 1),
+        "max_us": round(samples[-1] * 1e6, 1),
+    }
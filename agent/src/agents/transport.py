@@ -0,0 +1,398 @@
+import logging
+import multiprocessing
+import os
+import socket
+import struct
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from threading import Condition, Thread
+from .inbox import Inbox
+
+logger = logging.getLogger(__name__)
+
+LENGTH = struct.Struct(">I")
+
+class Transport(ABC):
+    """Common send/receive API of the message transports.
+
+    A transport can stand in for an `Inbox` (`add_message`, `get_messages`,
+    `wait_for_messages`, `wake`, `depth`, `close`), so agents and `Outbox` use any
+    backend unchanged. `close` may be called while a consumer is still receiving, e.g.
+    by a stopping agent; sends after it, and senders waiting for space, get False.
+    """
+    def send(self, message):
+        """Send one message; returns False if the transport was closed."""
+        return self.send_batch([message])
+
+    @abstractmethod
+    def send_batch(self, messages):
+        """Send several messages with a single write where the backend allows it."""
+
+    @abstractmethod
+    def receive(self, timeout=None, max_batch=None):
+        """Block until messages arrive, then return up to `max_batch` of them.
+
+        Returns an empty list if `timeout` seconds pass or `wake` is called first.
+        """
+
+    @abstractmethod
+    def wake(self):
+        """Release every consumer blocked in `receive`."""
+
+    @property
+    @abstractmethod
+    def depth(self):
+        """Number of messages waiting to be received."""
+
+    def close(self):
+        pass
+
+    def add_message(self, message):
+        return self.send(message)
+
+    def get_messages(self, max_batch=None):
+        return self.receive(0, max_batch)
+
+    def wait_for_messages(self, timeout=None, max_batch=None):
+        return self.receive(timeout, max_batch)
+
+class InProcessTransport(Transport):
+    """Transport between threads of one process; messages are passed by reference."""
+    def __init__(self, inbox=None):
+        self.inbox = inbox or Inbox()
+
+    def send(self, message):
+        return self.inbox.add_message(message)
+
+    def send_batch(self, messages):
+        return all([self.inbox.add_message(message) is not False for message in messages])
+
+    def receive(self, timeout=None, max_batch=None):
+        return self.inbox.wait_for_messages(timeout, max_batch)
+
+    def get_messages(self, max_batch=None):
+        return self.inbox.get_messages(max_batch)
+
+    def wake(self):
+        self.inbox.wake()
+
+    @property
+    def depth(self):
+        return self.inbox.depth
+
+    def close(self):
+        self.inbox.close()
+
+class SharedMemoryTransport(Transport):
+    """Multi-producer, single-consumer ring buffer in shared memory for same-host processes.
+
+    Messages are stored as length-prefixed UTF-8 records of their string form (the
+    payload of a `Message`). Create the transport in the parent and pass it to the
+    worker processes as a `Process` argument; the lock and condition are inherited, the
+    buffer is re-attached by name. `read_views` hands out
+    memoryviews into the ring so a consumer can parse records without copying them.
+    Senders block while the ring is full; a message may take at most half the ring.
+    Closing the transport in any process closes it for all of them.
+    """
+    HEADER = struct.Struct("QQQ")  # head, tail, message count
+    CLOSED = struct.Struct("Q")  # Set once closed; follows the header
+    HEADER_SIZE = 32
+    WRAP = 0xFFFFFFFF
+
+    def __init__(self, capacity=1 << 20, context=None):
+        if capacity % 4:
+            raise ValueError("Capacity must be a multiple of 4.")
+        self.capacity = capacity
+        self.condition = (context or multiprocessing.get_context()).Condition()
+        self.memory = shared_memory.SharedMemory(create=True, size=self.HEADER_SIZE + capacity)
+        self.HEADER.pack_into(self.memory.buf, 0, 0, 0, 0)
+        self.CLOSED.pack_into(self.memory.buf, self.HEADER.size, 0)
+        self.owner_pid = os.getpid()
+        self.readers = 0
+        self.detached = False
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["memory"] = self.memory.name
+        state["readers"] = 0
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.memory = shared_memory.SharedMemory(name=state["memory"])
+
+    def send_batch(self, messages):
+        records = [str(message).encode("utf-8") for message in messages]
+        with self.condition:
+            try:
+                for record in records:
+                    if not self._write(record):
+                        return False
+                return True
+            finally:
+                self.condition.notify_all()
+
+    def receive(self, timeout=None, max_batch=None):
+        with self.read_views(timeout, max_batch) as views:
+            return [str(view, "utf-8") for view in views]
+
+    @contextmanager
+    def read_views(self, timeout=None, max_batch=None):
+        """Yield memoryviews of waiting records; the records are freed on exit.
+
+        The views point into shared memory and are released when the block exits.
+        """
+        with self.condition:
+            detached = self.detached
+            if not detached:
+                self.readers += 1
+        if detached:
+            yield []
+            return
+        try:
+            with self.condition:
+                head, tail, count = self.HEADER.unpack_from(self.memory.buf)
+                if not count and timeout != 0 and not self._closed():
+                    self.condition.wait(timeout)
+                    head, tail, count = self.HEADER.unpack_from(self.memory.buf)
+            with self._views(head, tail, max_batch) as views:
+                yield views
+        finally:
+            with self.condition:
+                self.readers -= 1
+                detach = self._closed() and not self.readers and not self.detached
+            if detach:
+                self._detach()
+
+    @contextmanager
+    def _views(self, head, tail, max_batch):
+        """Views of the records from `head` to `tail`; frees the ones handed out on exit."""
+        views = []
+        position = head
+        data = self.memory.buf[self.HEADER_SIZE:]
+        try:
+            # Records between head and tail are never touched by senders
+            while position < tail and (max_batch is None or len(views) < max_batch):
+                offset = position % self.capacity
+                length, = LENGTH.unpack_from(data, offset)
+                if length == self.WRAP:
+                    position += self.capacity - offset
+                    continue
+                views.append(data[offset + 4:offset + 4 + length])
+                position += self._record_size(length)
+            yield views
+        finally:
+            for view in views:
+                view.release()
+            data.release()
+            with self.condition:
+                _, tail, count = self.HEADER.unpack_from(self.memory.buf)
+                self.HEADER.pack_into(self.memory.buf, 0, position, tail, count - len(views))
+                self.condition.notify_all()
+
+    def wake(self):
+        with self.condition:
+            self.condition.notify_all()
+
+    @property
+    def depth(self):
+        if self.detached:
+            return 0
+        return self.HEADER.unpack_from(self.memory.buf)[2]
+
+    def close(self):
+        """Close the ring for every process, waking blocked senders, and detach from it.
+
+        The creating process also frees the buffer. A receive in progress in this process
+        finishes first and the buffer is detached when it returns.
+        """
+        with self.condition:
+            if self.detached:
+                return
+            self.CLOSED.pack_into(self.memory.buf, self.HEADER.size, 1)
+            self.condition.notify_all()
+            if self.readers:
+                return
+        self._detach()
+
+    def _detach(self):
+        self.detached = True
+        self.memory.close()
+        if os.getpid() == self.owner_pid:
+            self.memory.unlink()
+
+    def _closed(self):
+        return self.CLOSED.unpack_from(self.memory.buf, self.HEADER.size)[0] == 1
+
+    def _write(self, record):
+        """Append one record, waiting for space; returns False if the ring is closed. Caller must hold the condition."""
+        size = self._record_size(len(record))
+        if size > self.capacity // 2:
+            # Larger records might never fit once the skipped tail end is counted
+            raise ValueError(f"Message of {len(record)} bytes exceeds half the ring buffer.")
+        while True:
+            if self.detached or self._closed():
+                return False
+            head, tail, count = self.HEADER.unpack_from(self.memory.buf)
+            offset = tail % self.capacity
+            # Records never wrap; the tail end of the buffer is skipped instead
+            padding = self.capacity - offset if offset + size > self.capacity else 0
+            if self.capacity - (tail - head) >= padding + size:
+                break
+            # Let the consumer drain what was written so far before waiting for space
+            self.condition.notify_all()
+            self.condition.wait()
+        if padding:
+            LENGTH.pack_into(self.memory.buf, self.HEADER_SIZE + offset, self.WRAP)
+            tail += padding
+            offset = 0
+        start = self.HEADER_SIZE + offset
+        LENGTH.pack_into(self.memory.buf, start, len(record))
+        self.memory.buf[start + 4:start + 4 + len(record)] = record
+        self.HEADER.pack_into(self.memory.buf, 0, head, tail + size, count + 1)
+        return True
+
+    @staticmethod
+    def _record_size(length):
+        """Length prefix plus payload, padded to 4 bytes so a prefix always fits before the end."""
+        return (4 + length + 3) & ~3
+
+class SocketTransport(Transport):
+    """Transport over a Unix (address is a path) or TCP (address is (host, port)) socket.
+
+    With `listen=True` the transport receives: it accepts any number of senders and
+    decodes their frames into a local inbox, and sending on it raises. Otherwise it
+    connects to `address` and sends. Frames are a 4-byte big-endian length followed by a msgpack payload (a
+    `Message` is sent as its payload string); pending messages are packed into one
+    buffer and written with a single `sendall` by a writer thread, so a burst of sends
+    costs one system call. msgpack is imported
+    lazily and only this backend needs it.
+    """
+    def __init__(self, address, listen=False, backlog=128, read_size=65536):
+        self.msgpack = _load_msgpack()
+        self.address = address
+        self.family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        self.read_size = read_size
+        self.running = True
+        self.inbox = Inbox()
+        self.pending = deque()
+        self.condition = Condition()
+        self.sock = socket.socket(self.family, socket.SOCK_STREAM)
+        if listen:
+            if self.family == socket.AF_UNIX and os.path.exists(address):
+                os.unlink(address)
+            self.sock.bind(address)
+            self.sock.listen(backlog)
+            self.address = self.sock.getsockname()
+            self.thread = Thread(target=self._accept, name="transport-accept", daemon=True)
+        else:
+            self.sock.connect(address)
+            if self.family == socket.AF_INET:
+                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.thread = Thread(target=self._write, name="transport-writer", daemon=True)
+        self.listening = listen
+        self.thread.start()
+
+    def send_batch(self, messages):
+        if self.listening:
+            # Only the connecting side runs a writer; nothing would ever drain these
+            raise RuntimeError(f"SocketTransport listening on {self.address} cannot send; connect a sending transport to it instead.")
+        with self.condition:
+            self.pending.extend(messages)
+            self.condition.notify()
+
+    def receive(self, timeout=None, max_batch=None):
+        return self.inbox.wait_for_messages(timeout, max_batch)
+
+    def get_messages(self, max_batch=None):
+        return self.inbox.get_messages(max_batch)
+
+    def wake(self):
+        self.inbox.wake()
+
+    @property
+    def depth(self):
+        return self.inbox.depth
+
+    def close(self):
+        """Flush pending messages and close the socket; closing again does nothing."""
+        with self.condition:
+            if not self.running:
+                return
+            self.running = False
+            self.condition.notify()
+        self.inbox.close()
+        if not self.listening:
+            self.thread.join()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        if self.listening:
+            self.thread.join()
+            if self.family == socket.AF_UNIX:
+                os.unlink(self.address)
+
+    def _write(self):
+        packb = self.msgpack.packb
+        while True:
+            with self.condition:
+                while not self.pending and self.running:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                messages = list(self.pending)
+                self.pending.clear()
+            frames = bytearray()
+            for message in messages:
+                payload = packb(message, default=str)
+                frames += LENGTH.pack(len(payload))
+                frames += payload
+            try:
+                self.sock.sendall(frames)
+            except OSError as e:
+                logger.error(f"Dropped {len(messages)} messages to {self.address}: {e}")
+
+    def _accept(self):
+        while self.running:
+            try:
+                connection, _ = self.sock.accept()
+            except OSError:
+                return
+            Thread(target=self._read, args=(connection,), name="transport-reader", daemon=True).start()
+
+    def _read(self, connection):
+        unpackb = self.msgpack.unpackb
+        buffer = bytearray()
+        with connection:
+            while True:
+                try:
+                    chunk = connection.recv(self.read_size)
+                except OSError:
+                    return
+                if not chunk:
+                    return
+                buffer += chunk
+                messages = []
+                offset = 0
+                # Frames are decoded straight from views of the receive buffer
+                with memoryview(buffer) as view:
+                    while len(buffer) - offset >= 4:
+                        length, = LENGTH.unpack_from(view, offset)
+                        if len(buffer) - offset - 4 < length:
+                            break
+                        messages.append(unpackb(view[offset + 4:offset + 4 + length]))
+                        offset += 4 + length
+                del buffer[:offset]
+                for message in messages:
+                    self.inbox.add_message(message)
+
+def _load_msgpack():
+    try:
+        import msgpack
+    except ImportError as e:
+        raise ImportError("SocketTransport requires msgpack; install it with `pip install msgpack`.") from e
+    return msgpack
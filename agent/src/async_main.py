@@ -0,0 +1,83 @@
+import asyncio
+import os
+from utils.env_loader import load_env
+from erc20.nonce_manager import AsyncNonceManager
+from erc20.async_erc20_handler import AsyncERC20Handler
+from agents.inbox import AsyncInbox
+from agents.outbox import Outbox
+from agents.async_agent import AsyncAutonomousAgent
+from utils.logging_utils import setup_logger
+from web3 import AsyncWeb3
+
+# Load environment variables (they also configure logging)
+load_env()
+
+# Set up logging
+logger = setup_logger()
+
+# Define WORDS list
+WORDS = ["hello", "sun", "world", "space", "moon", "crypto", "sky", "ocean", "universe", "human"]
+
+async def create_web3_instance():
+    """Create and return an AsyncWeb3 instance connected to the Ethereum network."""
+    eth_rpc_url = os.getenv("ETH_RPC_URL")
+    web3_instance = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(eth_rpc_url))
+    if not await web3_instance.is_connected():
+        raise ConnectionError("Web3 connection failed.")
+    return web3_instance
+
+def create_agent_pair(index, web3_instance, chain_id, nonce_managers):
+    """Create two agents wired to each other's inboxes, as in `main.py`."""
+    contract_address = os.getenv("ERC20_CONTRACT_ADDRESS")
+    source_address, target_address = os.getenv("SOURCE_ADDRESS"), os.getenv("TARGET_ADDRESS")
+
+    erc20_handler1 = AsyncERC20Handler(
+        contract_address, os.getenv("SOURCE_PRIVATE_KEY"), source_address, target_address,
+        nonce_managers[source_address], web3_instance, chain_id
+    )
+    erc20_handler2 = AsyncERC20Handler(
+        contract_address, os.getenv("TARGET_PRIVATE_KEY"), target_address, source_address,
+        nonce_managers[target_address], web3_instance, chain_id
+    )
+
+    inbox1, inbox2 = AsyncInbox(), AsyncInbox()
+    outbox1, outbox2 = Outbox(inbox2), Outbox(inbox1)
+
+    agent1 = AsyncAutonomousAgent(f"Agent{2 * index + 1}", inbox1, outbox1, erc20_handler1, logger)
+    agent2 = AsyncAutonomousAgent(f"Agent{2 * index + 2}", inbox2, outbox2, erc20_handler2, logger)
+
+    agent1.register_message_handler("hello", lambda message: logger.info(f"[{agent1.name}] Received hello message: {message}"))
+    agent2.register_message_handler("crypto", lambda message: logger.info(f"[{agent2.name}] Received crypto message: {message}"))
+    return agent1, agent2
+
+async def run_agents():
+    """Host AGENT_PAIRS pairs of agents on a single event loop."""
+    web3_instance = await create_web3_instance()
+    chain_id = int(os.getenv("CHAIN_ID", 123456))
+    agent_pairs = int(os.getenv("AGENT_PAIRS", 1))
+
+    # Agents that sign with the same key must share a nonce manager
+    nonce_managers = {
+        address: AsyncNonceManager(address, web3_instance)
+        for address in (os.getenv("SOURCE_ADDRESS"), os.getenv("TARGET_ADDRESS"))
+    }
+
+    agents = []
+    for index in range(agent_pairs):
+        agents.extend(create_agent_pair(index, web3_instance, chain_id, nonce_managers))
+    logger.info(f"Starting {len(agents)} agents on one event loop.")
+
+    try:
+        await asyncio.gather(*(agent.run_all(WORDS) for agent in agents))
+    finally:
+        for agent in agents:
+            agent.stop()
+
+def main():
+    try:
+        asyncio.run(run_agents())
+    except KeyboardInterrupt:
+        logger.info("Shutting down agents.")
+
+if __name__ == "__main__":
+    main()
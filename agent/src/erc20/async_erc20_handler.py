@@ -0,0 +1,60 @@
+from web3 import Web3
+from .erc20_handler import ERC20Handler
+
+class AsyncERC20Handler:
+    """Asyncio counterpart of `ERC20Handler` built on `AsyncWeb3`.
+
+    Takes an `AsyncWeb3` instance and an `AsyncNonceManager`; every RPC call is awaited
+    so many handlers can share one event loop.
+    """
+    def __init__(self, contract_address, private_key, source_address, target_address, nonce_manager, web3_instance, chain_id):
+        self.contract_address = Web3.to_checksum_address(contract_address)
+        self.private_key = private_key
+        self.account = web3_instance.eth.account.from_key(private_key)
+        self.address = self.account.address
+        self.source_address = Web3.to_checksum_address(source_address)
+        self.target_address = Web3.to_checksum_address(target_address)
+        self.nonce_manager = nonce_manager
+        self.contract = web3_instance.eth.contract(
+            address=self.contract_address, abi=ERC20Handler._get_standard_erc20_abi()
+        )
+        self.web3_instance = web3_instance
+        self.chain_id = chain_id
+
+    async def fetch_balance(self):
+        """Fetch the balance of ERC20 tokens for the source address."""
+        return await self.contract.functions.balanceOf(self.source_address).call()
+
+    async def execute_transfer(self, amount):
+        """Execute an ERC20 token transfer from source to target address."""
+        nonce = await self.nonce_manager.get_nonce()
+        try:
+            # Build the transaction for transfer
+            transfer_function = self.contract.functions.transfer(self.target_address, amount)
+            tx = await transfer_function.build_transaction({
+                'from': self.address,
+                'nonce': nonce,
+                'gasPrice': await self.web3_instance.eth.gas_price,
+                'chainId': self.chain_id
+            })
+
+            # Estimate gas and set it
+            gas = await self.web3_instance.eth.estimate_gas(tx)
+            tx['gas'] = int(gas * 1.2)  # Add 20% buffer
+
+            # Sign the transaction
+            signed_tx = self.account.sign_transaction(tx)
+        except Exception:
+            # Nothing was broadcast, so the nonce can be handed out again
+            self.nonce_manager.release(nonce)
+            raise
+
+        try:
+            tx_hash = await self.web3_instance.eth.send_raw_transaction(signed_tx.raw_transaction)
+        except Exception as e:
+            if ERC20Handler._is_nonce_error(e):
+                self.nonce_manager.resync()
+            else:
+                self.nonce_manager.release(nonce)
+            raise
+        return tx_hash.hex()
@@ -0,0 +1,147 @@
+import logging
+import time
+from threading import Lock
+from eth_abi import decode, encode
+from web3 import Web3
+from .rpc_batch import BatchRequestError, make_batch_request
+
+BALANCE_OF_SELECTOR = "70a08231"
+DECIMALS_SELECTOR = "313ce567"
+AGGREGATE3_SELECTOR = "82ad56cb"
+
+# Multicall3 is deployed at the same address on most EVM chains
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+logger = logging.getLogger(__name__)
+
+class BalanceReader:
+    """Reads `balanceOf`/`decimals` for many holders and tokens in one round-trip.
+
+    Holders are registered with `watch`. When a cached balance is older than `max_age`
+    seconds, every watched balance (and any unknown `decimals`) is refreshed together,
+    either as one JSON-RPC batch request or, with `use_multicall`, as a single
+    `eth_call` to a Multicall3 contract. One reader is meant to be shared by all agents,
+    so the RPC load stays nearly flat as the number of agents grows.
+
+    A query that fails during a refresh keeps its last known value and the failure is
+    logged, so one bad token or holder does not fail the refresh for every agent. Its
+    error is kept in `errors` and raised by `balance_of` only if no value was ever read.
+    """
+    def __init__(self, web3_instance, max_age=10, use_multicall=False, multicall_address=MULTICALL3_ADDRESS):
+        self.web3_instance = web3_instance
+        self.max_age = max_age
+        self.use_multicall = use_multicall
+        self.multicall_address = Web3.to_checksum_address(multicall_address)
+        self.lock = Lock()
+        self.watched = set()
+        self.balances = {}
+        self.token_decimals = {}
+        self.errors = {}
+        self.refreshed_at = None
+
+    def watch(self, token, holder):
+        """Include a (token, holder) balance in every refresh."""
+        with self.lock:
+            self.watched.add((Web3.to_checksum_address(token), Web3.to_checksum_address(holder)))
+            self.refreshed_at = None
+
+    def balance_of(self, token, holder):
+        """Return a holder's balance, refreshing all watched balances if the cache is stale."""
+        key = (Web3.to_checksum_address(token), Web3.to_checksum_address(holder))
+        with self.lock:
+            if key not in self.watched:
+                self.watched.add(key)
+                self.refreshed_at = None
+            if self.refreshed_at is None or time.monotonic() - self.refreshed_at >= self.max_age:
+                self._refresh()
+            if key not in self.balances:
+                raise self.errors[key]
+            return self.balances[key]
+
+    def decimals(self, token):
+        """Return a token's decimals; the value is read once and cached."""
+        token = Web3.to_checksum_address(token)
+        with self.lock:
+            if token not in self.token_decimals:
+                self.token_decimals[token] = self.read([("decimals", token, None)])[0]
+            return self.token_decimals[token]
+
+    def refresh(self):
+        """Refresh every watched balance now."""
+        with self.lock:
+            self._refresh()
+
+    def read(self, queries):
+        """Execute ("balanceOf", token, holder) and ("decimals", token, None) queries in one request."""
+        values = self._read(queries)
+        for value in values:
+            if isinstance(value, Exception):
+                raise value
+        return values
+
+    def _read(self, queries):
+        """Execute the queries, returning the exception in place of each failed value."""
+        if self.use_multicall:
+            return self._read_multicall(queries)
+        return self._read_batch(queries)
+
+    def _refresh(self):
+        """Refresh watched balances and missing decimals. Caller must hold the lock."""
+        queries = [("balanceOf", token, holder) for token, holder in self.watched]
+        tokens = {token for token, _ in self.watched if token not in self.token_decimals}
+        queries.extend(("decimals", token, None) for token in tokens)
+
+        for (name, token, holder), value in zip(queries, self._read(queries)):
+            key = (token, holder) if name == "balanceOf" else token
+            if isinstance(value, Exception):
+                # Keep the last known value; decimals missing here are read again later
+                logger.warning(f"{name} query failed for {key}, keeping last known value: {value}")
+                self.errors[key] = value
+            elif name == "balanceOf":
+                self.balances[key] = value
+                self.errors.pop(key, None)
+            else:
+                self.token_decimals[key] = value
+                self.errors.pop(key, None)
+        self.refreshed_at = time.monotonic()
+
+    @staticmethod
+    def _calldata(name, holder):
+        """Encode the calldata for a balanceOf or decimals call."""
+        if name == "balanceOf":
+            return BALANCE_OF_SELECTOR + holder[2:].lower().rjust(64, "0")
+        return DECIMALS_SELECTOR
+
+    def _read_batch(self, queries):
+        """Send every query as its own eth_call inside one JSON-RPC batch."""
+        calls = [
+            ("eth_call", [{"to": token, "data": "0x" + self._calldata(name, holder)}, "latest"])
+            for name, token, holder in queries
+        ]
+        values = []
+        for (name, _, _), result in zip(queries, make_batch_request(self.web3_instance, calls)):
+            if isinstance(result, Exception):
+                values.append(result)
+            elif not result or result == "0x":
+                values.append(BatchRequestError(name, "empty result, is the address a token contract?"))
+            else:
+                values.append(int(result, 16))
+        return values
+
+    def _read_multicall(self, queries):
+        """Aggregate every query into a single eth_call to Multicall3."""
+        calls = [
+            (token, True, bytes.fromhex(self._calldata(name, holder)))
+            for name, token, holder in queries
+        ]
+        data = "0x" + AGGREGATE3_SELECTOR + encode(["(address,bool,bytes)[]"], [calls]).hex()
+        result = self.web3_instance.eth.call({"to": self.multicall_address, "data": data})
+        (returned,) = decode(["(bool,bytes)[]"], bytes(result))
+
+        values = []
+        for (name, _, _), (success, return_data) in zip(queries, returned):
+            if success and return_data:
+                values.append(int.from_bytes(return_data, "big"))
+            else:
+                values.append(BatchRequestError(name, "call reverted inside multicall"))
+        return values
@@ -1,8 +1,14 @@
-import time
+from concurrent.futures import Future
 from web3 import Web3
 
+# 4-byte selector of transfer(address,uint256)
+TRANSFER_SELECTOR = "a9059cbb"
+
+# Node error fragments that mean the local nonce counter is out of step with the chain
+NONCE_ERRORS = ("nonce too low", "nonce too high", "already known", "replacement transaction underpriced")
+
 class ERC20Handler:
-    def __init__(self, contract_address, private_key, source_address, target_address, nonce_manager, web3_instance, chain_id):
+    def __init__(self, contract_address, private_key, source_address, target_address, nonce_manager, web3_instance, chain_id, balance_reader=None, gas_oracle=None, gas_cache=None, signer=None, ledger=None, priority_fee=None):
         self.contract_address = Web3.to_checksum_address(contract_address)
         self.private_key = private_key
         self.account = web3_instance.eth.account.from_key(private_key)
@@ -15,6 +21,18 @@ class ERC20Handler:
         )
         self.web3_instance = web3_instance
         self.chain_id = chain_id
+        self.balance_reader = balance_reader
+        if balance_reader is not None:
+            balance_reader.watch(self.contract_address, self.source_address)
+        self.gas_oracle = gas_oracle
+        self.gas_cache = gas_cache
+        self.signer = signer
+        self.ledger = ledger
+        self.funded_recipients = set()
+        # With a priority fee (in wei) transfers are EIP-1559 transactions, otherwise legacy
+        self.priority_fee = priority_fee
+        # Calldata up to the amount never changes: selector plus the left-padded recipient
+        self.transfer_prefix = bytes.fromhex(TRANSFER_SELECTOR) + bytes(12) + bytes.fromhex(self.target_address[2:])
 
     @staticmethod
     def _get_standard_erc20_abi():
@@ -27,34 +45,128 @@ class ERC20Handler:
 
     def fetch_balance(self):
         """Fetch and log the balance of ERC20 tokens for the source address."""
+        if self.ledger is not None:
+            # Indexed from Transfer logs, so this is a local O(1) lookup
+            return self.ledger.balance_of(self.source_address)
+        if self.balance_reader is not None:
+            # Shared reader refreshes every watched balance in one batched request
+            return self.balance_reader.balance_of(self.contract_address, self.source_address)
         balance = self.contract.functions.balanceOf(self.source_address).call()
         return balance
 
     def execute_transfer(self, amount):
         """Execute an ERC20 token transfer from source to target address."""
+        nonce = self.nonce_manager.get_nonce()
         try:
-            nonce = self.nonce_manager.get_nonce()
-            time.sleep(0.1)  # Small delay to avoid nonce issues
-
-            # Build the transaction for transfer
-            transfer_function = self.contract.functions.transfer(self.target_address, amount)
-            tx = transfer_function.build_transaction({
-                'from': self.address,
-                'nonce': nonce,
-                'gasPrice': self.web3_instance.eth.gas_price,
-                'chainId': self.chain_id
-            })
+            tx = self.build_transfer(amount, nonce)
+            signed_tx = self.sign_transaction(tx)
+        except Exception:
+            # Nothing was broadcast, so the nonce can be handed out again
+            self.nonce_manager.release(nonce)
+            raise
+        return self.send_transaction(signed_tx, nonce).hex()
+
+    def build_transfer(self, amount, nonce):
+        """Build an unsigned transfer transaction with the given nonce.
 
+        The transaction dict is assembled directly rather than through web3's
+        `build_transaction`: only the amount is encoded per transfer.
+        """
+        tx = {
+            'from': self.address,
+            'to': self.contract_address,
+            'value': 0,
+            'nonce': nonce,
+            'chainId': self.chain_id,
+            'data': self._transfer_data(amount),
+        }
+        gas_price = self._gas_price()
+        if self.priority_fee is None:
+            tx['gasPrice'] = gas_price
+        else:
+            tx['type'] = 2
+            tx['maxPriorityFeePerGas'] = self.priority_fee
+            tx['maxFeePerGas'] = gas_price + self.priority_fee
+        if self.gas_cache is None:
             # Estimate gas and set it
             gas = self.web3_instance.eth.estimate_gas(tx)
             tx['gas'] = int(gas * 1.2)  # Add 20% buffer
+        else:
+            tx['gas'] = self.gas_cache.get(self._gas_cache_key(), lambda: self._estimate_transfer_gas(amount))
+        return tx
+
+    def sign_transaction(self, tx):
+        """Sign a transaction with the handler's key."""
+        if self.signer is not None:
+            return self.signer.submit(self.address, tx).result()
+        return self.account.sign_transaction(tx)
+
+    def sign_transaction_async(self, tx):
+        """Start signing a transaction and return a Future of the signed transaction.
+
+        With a process pool signer several transactions are signed in parallel; without
+        one the transaction is signed immediately in the calling thread.
+        """
+        if self.signer is not None:
+            return self.signer.submit(self.address, tx)
+        future = Future()
+        future.set_result(self.account.sign_transaction(tx))
+        return future
+
+    def send_transaction(self, signed_tx, nonce):
+        """Broadcast a signed transaction and return its hash.
 
-            # Sign and send the transaction
-            signed_tx = self.account.sign_transaction(tx)
+        On failure the nonce is resynced if the node rejected it, and released otherwise.
+        """
+        try:
             tx_hash = self.web3_instance.eth.send_raw_transaction(signed_tx.raw_transaction)
-            return tx_hash.hex()
         except Exception as e:
-            if "nonce too low" in str(e):
-                return self.execute_transfer(amount)
+            if self._is_nonce_error(e):
+                self.nonce_manager.resync()
+            else:
+                self.nonce_manager.release(nonce)
+                self.invalidate_gas_estimate()
             raise
+        self.funded_recipients.add(self.target_address)
+        return tx_hash
+
+    def invalidate_gas_estimate(self):
+        """Forget the cached transfer estimate, e.g. after a transfer failed or reverted."""
+        if self.gas_cache is not None:
+            self.gas_cache.invalidate(self._gas_cache_key())
+
+    def _gas_price(self):
+        """Gas price from the shared oracle if there is one, otherwise from the node."""
+        if self.gas_oracle is not None:
+            return self.gas_oracle.gas_price
+        return self.web3_instance.eth.gas_price
+
+    def _gas_cache_key(self):
+        """Key for the transfer estimate; sending to an empty balance costs more storage gas."""
+        return (self.contract_address, TRANSFER_SELECTOR, self._recipient_is_new())
 
+    def _recipient_is_new(self):
+        """Return True if the target may not hold any tokens yet."""
+        if self.target_address in self.funded_recipients:
+            return False
+        if self.balance_reader is not None:
+            return self.balance_reader.balance_of(self.contract_address, self.target_address) == 0
+        return True
+
+    def _estimate_transfer_gas(self, amount):
+        """Ask the node for the gas used by a transfer to the target."""
+        return self.web3_instance.eth.estimate_gas({
+            'from': self.address,
+            'to': self.contract_address,
+            'data': self._transfer_data(amount),
+        })
+
+    def _transfer_data(self, amount):
+        """ABI-encoded transfer(target, amount) calldata."""
+        return self.transfer_prefix + amount.to_bytes(32, 'big')
+
+    @staticmethod
+    def _is_nonce_error(error):
+        """Return True if the node rejected a transaction because of its nonce."""
+        message = str(error).lower()
+        return any(reason in message for reason in NONCE_ERRORS)
@@ -0,0 +1,92 @@
+import logging
+import time
+from threading import Event, Lock, Thread
+
+logger = logging.getLogger(__name__)
+
+class GasPriceOracle:
+    """Shared, cached gas price.
+
+    The price is refreshed lazily once it is older than `ttl` seconds. After `start`, a
+    background thread also watches the block number every `poll_interval` seconds and
+    refreshes the price as soon as a new block arrives, so transfers read the price from
+    memory instead of calling `eth_gasPrice` each time.
+    """
+    def __init__(self, web3_instance, ttl=15, poll_interval=1):
+        self.web3_instance = web3_instance
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.lock = Lock()
+        self.stop_event = Event()
+        self.thread = None
+        self.block_number = None
+        self._gas_price = None
+        self._updated_at = None
+
+    @property
+    def gas_price(self):
+        """Return the cached gas price, refreshing it if it has expired."""
+        with self.lock:
+            if self._gas_price is None or time.monotonic() - self._updated_at >= self.ttl:
+                self._refresh()
+            return self._gas_price
+
+    def start(self):
+        """Start refreshing the price on every new block."""
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = Thread(target=self._watch_blocks, name="gas-price-oracle", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Stop the background refresher."""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _refresh(self):
+        """Fetch the gas price from the node. Caller must hold the lock."""
+        self._gas_price = self.web3_instance.eth.gas_price
+        self._updated_at = time.monotonic()
+
+    def _watch_blocks(self):
+        while not self.stop_event.wait(self.poll_interval):
+            try:
+                block_number = self.web3_instance.eth.block_number
+                if block_number != self.block_number:
+                    with self.lock:
+                        self._refresh()
+                    self.block_number = block_number
+            except Exception as e:
+                logger.warning(f"Gas price refresh failed: {e}")
+
+class GasEstimateCache:
+    """Caches gas estimates for calls whose gas use is effectively constant.
+
+    Entries are keyed by (contract, function selector, recipient-is-new); the estimate
+    is stored raw and `margin` is applied on every read. Entries should be invalidated
+    when a transaction using them fails.
+    """
+    def __init__(self, margin=1.2):
+        self.margin = margin
+        self.lock = Lock()
+        self.estimates = {}
+
+    def get(self, key, estimate):
+        """Return the gas limit for `key`, calling `estimate()` on a cache miss."""
+        with self.lock:
+            gas = self.estimates.get(key)
+        if gas is None:
+            gas = estimate()
+            with self.lock:
+                self.estimates[key] = gas
+        return int(gas * self.margin)
+
+    def invalidate(self, key=None):
+        """Drop one cached estimate, or all of them when no key is given."""
+        with self.lock:
+            if key is None:
+                self.estimates.clear()
+            else:
+                self.estimates.pop(key, None)
@@ -0,0 +1,176 @@
+import json
+import logging
+import os
+from collections import deque
+from threading import Event, Lock, Thread
+from web3 import Web3
+from web3.exceptions import BlockNotFound
+
+logger = logging.getLogger(__name__)
+
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+class TokenLedger:
+    """In-memory balance map for every holder of a token, built from its Transfer logs.
+
+    `sync` follows the chain with `eth_getLogs` over block ranges of `batch_size`. The
+    balance changes of the last `confirmations` blocks are kept per block together with
+    the block hash, so a reorg inside that window is rolled back and re-indexed. Only
+    confirmed state is written to `snapshot_path`, which lets a restart resume from the
+    snapshot block instead of rescanning from genesis.
+    """
+    def __init__(self, web3_instance, contract_address, confirmations=12, batch_size=2000,
+                 snapshot_path=None, start_block=0, poll_interval=2):
+        self.web3_instance = web3_instance
+        self.contract_address = Web3.to_checksum_address(contract_address)
+        self.confirmations = confirmations
+        self.batch_size = batch_size
+        self.snapshot_path = snapshot_path
+        self.poll_interval = poll_interval
+        self.lock = Lock()
+        self.stop_event = Event()
+        self.thread = None
+        self.balances = {}
+        self.checkpoints = deque()  # (block_number, block_hash, {address: delta}) of unconfirmed blocks
+        self.last_block = start_block - 1
+        if snapshot_path and os.path.exists(snapshot_path):
+            self.load_snapshot()
+
+    def balance_of(self, address, confirmed=False):
+        """Return an address's balance from memory, optionally excluding unconfirmed blocks."""
+        address = Web3.to_checksum_address(address)
+        with self.lock:
+            balance = self.balances.get(address, 0)
+            if confirmed:
+                balance -= sum(deltas.get(address, 0) for _, _, deltas in self.checkpoints)
+            return balance
+
+    def start(self):
+        """Follow the chain in a background thread."""
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = Thread(target=self._follow, name="token-ledger", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Stop following the chain and write a final snapshot."""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.snapshot_path:
+            self.save_snapshot()
+
+    def sync(self):
+        """Index every block up to the current head, rolling back first if a reorg happened."""
+        head = self.web3_instance.eth.block_number
+        with self.lock:
+            self._rollback_reorg()
+            while self.last_block < head:
+                to_block = min(self.last_block + self.batch_size, head)
+                self._index_range(self.last_block + 1, to_block, head)
+                self.last_block = to_block
+            self._checkpoint_head(head)
+            self._finalize(head)
+        return head
+
+    def save_snapshot(self):
+        """Write confirmed balances and the block they are valid for."""
+        with self.lock:
+            balances = dict(self.balances)
+            for _, _, deltas in self.checkpoints:
+                for address, delta in deltas.items():
+                    balances[address] -= delta
+            confirmed_block = self.checkpoints[0][0] - 1 if self.checkpoints else self.last_block
+        snapshot = {
+            "contract": self.contract_address,
+            "block": confirmed_block,
+            "balances": {address: str(balance) for address, balance in balances.items() if balance},
+        }
+        temp_path = self.snapshot_path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(snapshot, file)
+        os.replace(temp_path, self.snapshot_path)
+
+    def load_snapshot(self):
+        """Restore confirmed balances from `snapshot_path`."""
+        with open(self.snapshot_path, "r") as file:
+            snapshot = json.load(file)
+        if snapshot["contract"] != self.contract_address:
+            raise ValueError(f"Snapshot {self.snapshot_path} belongs to {snapshot['contract']}")
+        with self.lock:
+            self.balances = {address: int(balance) for address, balance in snapshot["balances"].items()}
+            self.checkpoints.clear()
+            self.last_block = snapshot["block"]
+        logger.info(f"Ledger restored from snapshot at block {self.last_block}.")
+
+    def _follow(self):
+        while not self.stop_event.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                logger.warning(f"Ledger sync failed: {e}")
+            self.stop_event.wait(self.poll_interval)
+
+    def _index_range(self, from_block, to_block, head):
+        """Apply the Transfer logs of a block range. Caller must hold the lock."""
+        logs = self.web3_instance.eth.get_logs({
+            "address": self.contract_address,
+            "topics": [TRANSFER_TOPIC],
+            "fromBlock": from_block,
+            "toBlock": to_block,
+        })
+        unconfirmed_from = head - self.confirmations + 1
+        block_deltas = {}
+        for log in logs:
+            sender = self._topic_address(log["topics"][1])
+            recipient = self._topic_address(log["topics"][2])
+            value = int.from_bytes(bytes(log["data"]), "big")
+            deltas = None
+            if log["blockNumber"] >= unconfirmed_from:
+                key = (log["blockNumber"], Web3.to_hex(log["blockHash"]))
+                deltas = block_deltas.setdefault(key, {})
+            self._apply(sender, -value, deltas)
+            self._apply(recipient, value, deltas)
+        for (block_number, block_hash), deltas in sorted(block_deltas.items()):
+            self.checkpoints.append((block_number, block_hash, deltas))
+
+    def _apply(self, address, delta, deltas):
+        if address == ZERO_ADDRESS:
+            return  # Mints and burns only change the holder's side
+        self.balances[address] = self.balances.get(address, 0) + delta
+        if deltas is not None:
+            deltas[address] = deltas.get(address, 0) + delta
+
+    def _checkpoint_head(self, head):
+        """Record the head hash even without logs, so a reorg of empty blocks is noticed too."""
+        if not self.checkpoints or self.checkpoints[-1][0] != head:
+            block_hash = Web3.to_hex(self.web3_instance.eth.get_block(head)["hash"])
+            self.checkpoints.append((head, block_hash, {}))
+
+    def _finalize(self, head):
+        """Forget per-block deltas once they are `confirmations` deep."""
+        while self.checkpoints and self.checkpoints[0][0] <= head - self.confirmations:
+            self.checkpoints.popleft()
+
+    def _rollback_reorg(self):
+        """Undo unconfirmed blocks whose hash no longer matches the chain. Caller must hold the lock."""
+        while self.checkpoints:
+            block_number, block_hash, deltas = self.checkpoints[-1]
+            try:
+                if Web3.to_hex(self.web3_instance.eth.get_block(block_number)["hash"]) == block_hash:
+                    return
+            except BlockNotFound:
+                pass  # The chain was reorganized to a shorter one
+            self.checkpoints.pop()
+            for address, delta in deltas.items():
+                self.balances[address] -= delta
+            # Re-index from the block after the newest checkpoint that is still valid
+            self.last_block = self.checkpoints[-1][0] if self.checkpoints else block_number - 1
+            logger.warning(f"Reorg detected at block {block_number}; rolled back to {self.last_block}.")
+
+    @staticmethod
+    def _topic_address(topic):
+        return Web3.to_checksum_address("0x" + bytes(topic)[-20:].hex())
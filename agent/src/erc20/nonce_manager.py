@@ -1,15 +1,84 @@
+import asyncio
 from threading import Lock
 from web3 import Web3
 
 class NonceManager:
-    """Manages transaction nonces for an Ethereum address."""
+    """Manages transaction nonces for an Ethereum address.
+
+    The pending transaction count is read from the node once and nonces are then
+    handed out from memory, so many transactions can be in flight for a single key.
+    The allocator only goes back to the node when a nonce is rejected or dropped.
+    """
     def __init__(self, address, web3_instance):
         self.address = Web3.to_checksum_address(address)
         self.lock = Lock()
         self.web3_instance = web3_instance
+        self.next_nonce = None
+        self.resync_count = 0
 
     def get_nonce(self):
-        """Safely fetches the current nonce."""
+        """Safely allocates the next nonce, syncing with the node on first use."""
+        with self.lock:
+            if self.next_nonce is None:
+                self._sync()
+            nonce = self.next_nonce
+            self.next_nonce += 1
+            return nonce
+
+    def release(self, nonce):
+        """Return a nonce that was allocated but never broadcast.
+
+        If it is the most recently allocated nonce it is simply reused; otherwise a
+        gap has been left behind it and the allocator resyncs on the next call.
+        """
+        with self.lock:
+            if self.next_nonce is not None and nonce == self.next_nonce - 1:
+                self.next_nonce = nonce
+            else:
+                self.next_nonce = None
+
+    def resync(self):
+        """Discard the local counter after a nonce was rejected or dropped by the node."""
+        with self.lock:
+            self.next_nonce = None
+
+    def restore(self, next_nonce):
+        """Seed the counter from a transaction journal instead of asking the node."""
         with self.lock:
-            return self.web3_instance.eth.get_transaction_count(self.address)
+            if self.next_nonce is None or next_nonce > self.next_nonce:
+                self.next_nonce = next_nonce
+
+    def _sync(self):
+        """Read the pending transaction count from the node. Caller must hold the lock."""
+        self.next_nonce = self.web3_instance.eth.get_transaction_count(self.address, 'pending')
+        self.resync_count += 1
+
+class AsyncNonceManager:
+    """Asyncio counterpart of `NonceManager` for use with `AsyncWeb3`."""
+    def __init__(self, address, web3_instance):
+        self.address = Web3.to_checksum_address(address)
+        self.lock = asyncio.Lock()
+        self.web3_instance = web3_instance
+        self.next_nonce = None
+        self.resync_count = 0
+
+    async def get_nonce(self):
+        """Allocates the next nonce, syncing with the node on first use."""
+        async with self.lock:
+            if self.next_nonce is None:
+                self.next_nonce = await self.web3_instance.eth.get_transaction_count(self.address, 'pending')
+                self.resync_count += 1
+            nonce = self.next_nonce
+            self.next_nonce += 1
+            return nonce
+
+    def release(self, nonce):
+        """Return a nonce that was allocated but never broadcast."""
+        if self.next_nonce is not None and nonce == self.next_nonce - 1:
+            self.next_nonce = nonce
+        else:
+            self.next_nonce = None
 
+    def resync(self):
+        """Discard the local counter after a nonce was rejected or dropped by the node."""
+        self.next_nonce = None
@@ -0,0 +1,64 @@
+import json
+from threading import Lock
+import requests
+
+class BatchRequestError(Exception):
+    """An individual call inside a JSON-RPC batch returned an error."""
+    def __init__(self, method, error):
+        super().__init__(f"{method} failed: {error}")
+        self.method = method
+        self.error = error
+
+_session = None
+_session_lock = Lock()
+
+def _get_session():
+    """Return the process-wide keep-alive session used for batch requests."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+        return _session
+
+def make_batch_request(web3_instance, calls, timeout=10):
+    """Send several JSON-RPC calls to the node in a single HTTP request.
+
+    `calls` is a list of (method, params) tuples. Returns the results in the same order;
+    a call that failed is returned as a `BatchRequestError` instead of raising, so one
+    bad entry does not discard the rest of the batch.
+    """
+    if not calls:
+        return []
+
+    # Providers that know how to batch (e.g. a pooled provider) take precedence
+    provider = web3_instance.provider
+    if hasattr(provider, "make_batch_request"):
+        responses = provider.make_batch_request(calls)
+    else:
+        payload = [
+            {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+            for request_id, (method, params) in enumerate(calls)
+        ]
+        response = _get_session().post(
+            provider.endpoint_uri,
+            data=json.dumps(payload),
+            headers={"Content-Type": "application/json"},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        responses = response.json()
+        if isinstance(responses, dict):
+            # Nodes answer a rejected batch with a single error object
+            raise BatchRequestError("batch", responses.get("error", responses))
+
+    by_id = {item.get("id"): item for item in responses}
+    results = []
+    for request_id, (method, _) in enumerate(calls):
+        item = by_id.get(request_id)
+        if item is None:
+            results.append(BatchRequestError(method, "missing from batch response"))
+        elif "error" in item:
+            results.append(BatchRequestError(method, item["error"]))
+        else:
+            results.append(item.get("result"))
+    return results
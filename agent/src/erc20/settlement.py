@@ -0,0 +1,101 @@
+import logging
+from concurrent.futures import Future
+from threading import Event, Lock, Thread
+
+logger = logging.getLogger(__name__)
+
+class _Ledger:
+    """Intents collected for one (token, address pair) during the current window."""
+    __slots__ = ("net", "handlers", "futures")
+
+    def __init__(self):
+        self.net = 0  # Positive: tokens owed from the lower address to the higher one
+        self.handlers = {}  # direction (+1 / -1) -> handler that can send that way
+        self.futures = []
+
+class SettlementEngine:
+    """Coalesces transfer intents between agent pairs and settles only the net amount.
+
+    `submit_transfer` collects intents per (token, source, target); every `window`
+    seconds, or when `flush` is called (for example on each new block), the intents of
+    each pair of addresses are netted against each other and a single transfer of the
+    difference is sent in the winning direction through `pipeline`. Intents that cancel
+    out send nothing. Every intent's future resolves when its settlement does: to the
+    receipt of the net transfer, or to None when the flows cancelled exactly. If the net
+    transfer fails, every intent of that settlement fails with its error.
+    """
+    def __init__(self, pipeline, window=1.0):
+        self.pipeline = pipeline
+        self.window = window
+        self.ledgers = {}
+        self.lock = Lock()
+        self.stop_event = Event()
+        self.thread = None
+        self.intent_count = 0
+        self.transfer_count = 0
+
+    def start(self):
+        """Start settling every `window` seconds."""
+        self.stop_event.clear()
+        self.thread = Thread(target=self._settle_periodically, name="settlement", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the timer and settle whatever is still collected."""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+
+    def submit_transfer(self, erc20_handler, amount):
+        """Queue a transfer intent and return a Future that resolves when it is settled."""
+        source, target = erc20_handler.source_address.lower(), erc20_handler.target_address.lower()
+        direction = 1 if source < target else -1
+        key = (erc20_handler.contract_address.lower(), min(source, target), max(source, target))
+        future = Future()
+        with self.lock:
+            ledger = self.ledgers.get(key)
+            if ledger is None:
+                ledger = self.ledgers[key] = _Ledger()
+            ledger.net += direction * amount
+            ledger.handlers[direction] = erc20_handler
+            ledger.futures.append(future)
+            self.intent_count += 1
+        return future
+
+    def flush(self):
+        """Settle every pair now."""
+        with self.lock:
+            ledgers, self.ledgers = self.ledgers, {}
+        for ledger in ledgers.values():
+            self._settle(ledger)
+
+    def _settle(self, ledger):
+        if ledger.net == 0:
+            for future in ledger.futures:
+                future.set_result(None)
+            return
+        direction = 1 if ledger.net > 0 else -1
+        try:
+            transfer = self.pipeline.submit_transfer(ledger.handlers[direction], abs(ledger.net))
+        except Exception as e:
+            logger.error(f"Net transfer of {abs(ledger.net)} failed to submit: {e}")
+            for future in ledger.futures:
+                future.set_exception(e)
+            return
+        self.transfer_count += 1
+        transfer.add_done_callback(lambda transfer: self._resolve(transfer, ledger.futures))
+
+    @staticmethod
+    def _resolve(transfer, futures):
+        error = transfer.exception()
+        for future in futures:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(transfer.result())
+
+    def _settle_periodically(self):
+        while not self.stop_event.wait(self.window):
+            self.flush()
@@ -0,0 +1,42 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from eth_account import Account
+
+# Picklable subset of eth_account's SignedTransaction that ERC20Handler needs
+SignedRawTransaction = namedtuple("SignedRawTransaction", ["raw_transaction", "hash"])
+
+# Accounts loaded once per worker process by `_load_keys`, keyed by address
+_worker_accounts = {}
+
+def _load_keys(private_keys):
+    """Process pool initializer: derive every account once so keys are not pickled per call."""
+    for private_key in private_keys:
+        account = Account.from_key(private_key)
+        _worker_accounts[account.address] = account
+
+def _sign(address, tx):
+    """Hash and sign a transaction inside a worker process."""
+    signed = _worker_accounts[address].sign_transaction(tx)
+    return SignedRawTransaction(bytes(signed.raw_transaction), bytes(signed.hash))
+
+class ProcessPoolSigner:
+    """Signs transactions in a `ProcessPoolExecutor` so signing is not serialized by the GIL.
+
+    Every worker loads all `private_keys` once at start-up; each request only sends the
+    signer address and the transaction dict across the process boundary.
+    """
+    def __init__(self, private_keys, max_workers=None):
+        self.addresses = {Account.from_key(private_key).address for private_key in private_keys}
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_load_keys, initargs=(tuple(private_keys),)
+        )
+
+    def submit(self, address, tx):
+        """Queue a transaction for signing and return a Future of `SignedRawTransaction`."""
+        if address not in self.addresses:
+            raise KeyError(f"No key loaded for {address}")
+        return self.executor.submit(_sign, address, tx)
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        self.executor.shutdown()
@@ -0,0 +1,302 @@
+import logging
+import mmap
+import os
+import struct
+import zlib
+from threading import Condition, Event, Lock, Thread
+from web3 import Web3
+from .rpc_batch import make_batch_request
+
+logger = logging.getLogger(__name__)
+
+# Every record is a length and CRC32 followed by its body; a torn tail fails the check
+HEADER = struct.Struct(">II")
+# state, nonce, address, transaction hash; signed records append the raw transaction
+BODY = struct.Struct(">BQ20s32s")
+NO_HASH = bytes(32)
+
+class JournalEntry:
+    """A journaled transaction that has not been mined or dropped yet."""
+    __slots__ = ("address", "nonce", "tx_hash", "raw_transaction", "state")
+
+    def __init__(self, address, nonce, tx_hash, raw_transaction, state):
+        self.address = address
+        self.nonce = nonce
+        self.tx_hash = tx_hash
+        self.raw_transaction = raw_transaction
+        self.state = state
+
+class TxJournal:
+    """Append-only, crash-safe journal of signed transactions and their state.
+
+    `record_signed` returns only once the record is on disk, so a transaction is never
+    broadcast without being journaled; concurrent callers share one fsync (group
+    commit). State changes (sent, mined, dropped) are buffered and synced by the
+    background thread every `sync_interval` seconds or with the next signed record.
+    The same thread compacts the file down to the pending transactions and each key's
+    next nonce once `compact_after` records have been appended. Opening a journal
+    replays it, reading through `mmap` when `use_mmap` is set, and cuts off a record
+    torn by a crash. `recover` then seeds the nonce allocators and resolves the pending
+    transactions without rescanning the chain. A released transaction, one the node never
+    accepted, hands its nonce back, so a restart fills the gap it left instead of
+    allocating past it. If a write or fsync fails the journal is marked failed: that sync
+    and every later one raise `OSError`, so nothing more is broadcast on its account.
+    """
+    NONCE = 0
+    SIGNED = 1
+    SENT = 2
+    MINED = 3
+    DROPPED = 4
+    RELEASED = 5
+
+    def __init__(self, path, sync_interval=0.05, compact_after=10000, use_mmap=False):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.compact_after = compact_after
+        self.use_mmap = use_mmap
+        self.pending = {}  # transaction hash -> JournalEntry
+        self.next_nonces = {}  # address -> next unused nonce
+        self.lock = Lock()
+        self.synced = Condition(self.lock)
+        self.buffer = bytearray()
+        self.sequence = 0
+        self.synced_sequence = 0
+        self.syncing = False
+        self.appended = 0
+        self.error = None
+        self.stop_event = Event()
+        self.thread = None
+        self._replay()
+        self.file = open(path, "ab")
+
+    def start(self):
+        """Start the background sync and compaction thread."""
+        self.stop_event.clear()
+        self.thread = Thread(target=self._run, name="tx-journal", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the background thread, sync what is buffered and close the file."""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        try:
+            self.sync()
+        except OSError as e:
+            logger.error(f"Journal {self.path} not synced on shutdown: {e}")
+        finally:
+            self.file.close()
+
+    def record_signed(self, address, nonce, tx_hash, raw_transaction):
+        """Journal a signed transaction; returns once the record is durable."""
+        with self.lock:
+            sequence = self._append(self.SIGNED, address, nonce, tx_hash, bytes(raw_transaction))
+            self._sync_to(sequence)
+
+    def record_sent(self, tx_hash):
+        self._record_state(self.SENT, tx_hash)
+
+    def record_mined(self, tx_hash):
+        self._record_state(self.MINED, tx_hash)
+
+    def record_dropped(self, tx_hash):
+        self._record_state(self.DROPPED, tx_hash)
+
+    def record_released(self, tx_hash):
+        """Journal a transaction the node never accepted; its nonce is allocated again."""
+        self._record_state(self.RELEASED, tx_hash)
+
+    def sync(self):
+        """Write and fsync every buffered record."""
+        with self.lock:
+            self._sync_to(self.sequence)
+
+    def pending_transactions(self):
+        """Pending entries ordered by address and nonce."""
+        with self.lock:
+            return sorted(self.pending.values(), key=lambda entry: (entry.address, entry.nonce))
+
+    def compact(self):
+        """Rewrite the journal with only each key's next nonce and the pending transactions."""
+        with self.lock:
+            while self.syncing:
+                self.synced.wait()
+            records = bytearray()
+            for entry in self.pending.values():
+                records += self._encode(self.SIGNED, entry.address, entry.nonce, entry.tx_hash, entry.raw_transaction)
+                if entry.state == self.SENT:
+                    records += self._encode(self.SENT, entry.address, entry.nonce, entry.tx_hash, b"")
+            # Last, so a nonce released below a pending transaction is not raised again on replay
+            for address, nonce in self.next_nonces.items():
+                records += self._encode(self.NONCE, address, nonce, NO_HASH, b"")
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "wb") as file:
+                file.write(records)
+                file.flush()
+                os.fsync(file.fileno())
+            self.file.close()
+            os.replace(temp_path, self.path)
+            self._sync_directory()
+            self.file = open(self.path, "ab")
+            # The compacted file already reflects everything that was buffered
+            self.buffer = bytearray()
+            self.synced_sequence = self.sequence
+            self.appended = 0
+            self.synced.notify_all()
+
+    def recover(self, web3_instance, nonce_managers):
+        """Restore nonce allocators and resolve the transactions left pending by a restart.
+
+        `nonce_managers` maps addresses to their `NonceManager`. Receipts of all pending
+        transactions are fetched in one batch; mined ones are closed and the rest are
+        rebroadcast in nonce order. Returns the entries that are still pending so the
+        caller can track them (see `TransactionPipeline.track`).
+        """
+        for address, next_nonce in list(self.next_nonces.items()):
+            manager = nonce_managers.get(Web3.to_checksum_address(address))
+            if manager is not None:
+                manager.restore(next_nonce)
+        entries = self.pending_transactions()
+        results = make_batch_request(web3_instance, [("eth_getTransactionReceipt", [Web3.to_hex(entry.tx_hash)]) for entry in entries])
+        still_pending = []
+        for entry, result in zip(entries, results):
+            if result is not None and not isinstance(result, Exception):
+                self.record_mined(entry.tx_hash)
+                continue
+            try:
+                web3_instance.eth.send_raw_transaction(entry.raw_transaction)
+            except Exception as e:
+                if "already known" not in str(e).lower():
+                    # The nonce was used by another transaction or the node refused this one
+                    logger.warning(f"Dropping journaled transaction {Web3.to_hex(entry.tx_hash)}: {e}")
+                    self.record_dropped(entry.tx_hash)
+                    manager = nonce_managers.get(Web3.to_checksum_address(entry.address))
+                    if manager is not None:
+                        manager.resync()
+                    continue
+            self.record_sent(entry.tx_hash)
+            still_pending.append(entry)
+        self.sync()
+        logger.info(f"Recovered {len(entries)} journaled transactions; {len(still_pending)} still pending")
+        return still_pending
+
+    def _record_state(self, state, tx_hash):
+        with self.lock:
+            tx_hash = self._hash_bytes(tx_hash)
+            entry = self.pending.get(tx_hash)
+            if entry is not None:
+                self._append(state, entry.address, entry.nonce, tx_hash, b"")
+
+    def _append(self, state, address, nonce, tx_hash, raw_transaction):
+        """Buffer one record and apply it. Caller must hold the lock."""
+        address = self._address_bytes(address)
+        tx_hash = self._hash_bytes(tx_hash)
+        self.buffer += self._encode(state, address, nonce, tx_hash, raw_transaction)
+        self._apply(state, address, nonce, tx_hash, raw_transaction)
+        self.sequence += 1
+        self.appended += 1
+        return self.sequence
+
+    def _sync_to(self, sequence):
+        """Make records up to `sequence` durable, as the writer or by waiting for one. Caller must hold the lock."""
+        while self.synced_sequence < sequence:
+            if self.error is not None:
+                raise OSError(f"Journal {self.path} failed: {self.error}")
+            if self.syncing:
+                self.synced.wait()
+                continue
+            self.syncing = True
+            data, self.buffer = self.buffer, bytearray()
+            target = self.sequence
+            self.lock.release()
+            try:
+                self.file.write(data)
+                self.file.flush()
+                os.fsync(self.file.fileno())
+            except OSError as e:
+                # A failed fsync may already have discarded the data, so it cannot be retried
+                self.error = e
+                raise
+            finally:
+                self.lock.acquire()
+                self.syncing = False
+                self.synced.notify_all()
+            self.synced_sequence = target
+
+    def _apply(self, state, address, nonce, tx_hash, raw_transaction):
+        if state == self.NONCE:
+            self.next_nonces[address] = nonce
+        elif state == self.SIGNED:
+            self.pending[tx_hash] = JournalEntry(address, nonce, tx_hash, raw_transaction, state)
+            self.next_nonces[address] = max(self.next_nonces.get(address, 0), nonce + 1)
+        elif state == self.SENT:
+            entry = self.pending.get(tx_hash)
+            if entry is not None:
+                entry.state = state
+        elif state == self.RELEASED:
+            if self.pending.pop(tx_hash, None) is not None:
+                self.next_nonces[address] = min(self.next_nonces.get(address, nonce), nonce)
+        else:
+            self.pending.pop(tx_hash, None)
+
+    def _replay(self):
+        """Rebuild the in-memory state from the file and cut off a torn last record."""
+        if not os.path.exists(self.path) or not os.path.getsize(self.path):
+            return
+        with open(self.path, "r+b") as file:
+            if self.use_mmap:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    end = self._replay_records(data)
+            else:
+                end = self._replay_records(file.read())
+            if end < os.path.getsize(self.path):
+                logger.warning(f"Truncating torn journal tail at byte {end} of {self.path}")
+                file.truncate(end)
+
+    def _replay_records(self, data):
+        """Apply every intact record; returns the offset where they end."""
+        offset = 0
+        with memoryview(data) as view:
+            while offset + HEADER.size <= len(view):
+                length, checksum = HEADER.unpack_from(view, offset)
+                start = offset + HEADER.size
+                with view[start:start + length] as body:
+                    if length < BODY.size or len(body) < length or zlib.crc32(body) != checksum:
+                        break
+                    state, nonce, address, tx_hash = BODY.unpack_from(body)
+                    self._apply(state, address, nonce, tx_hash, bytes(body[BODY.size:]))
+                offset = start + length
+        return offset
+
+    def _run(self):
+        while not self.stop_event.wait(self.sync_interval):
+            try:
+                self.sync()
+                if self.appended >= self.compact_after:
+                    self.compact()
+            except OSError as e:
+                logger.error(f"Journal write failed: {e}")
+                if self.error is not None:
+                    return
+
+    def _sync_directory(self):
+        """Persist the rename of a compacted journal."""
+        directory = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+    @staticmethod
+    def _encode(state, address, nonce, tx_hash, raw_transaction):
+        body = BODY.pack(state, nonce, address, tx_hash) + raw_transaction
+        return HEADER.pack(len(body), zlib.crc32(body)) + body
+
+    @staticmethod
+    def _address_bytes(address):
+        return address if isinstance(address, bytes) else bytes.fromhex(address[2:])
+
+    @staticmethod
+    def _hash_bytes(tx_hash):
+        return bytes.fromhex(tx_hash[2:]) if isinstance(tx_hash, str) else bytes(tx_hash)
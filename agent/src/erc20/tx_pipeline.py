@@ -0,0 +1,255 @@
+import logging
+import queue
+import time
+from concurrent.futures import Future
+from threading import Event, Lock, Thread
+from web3 import Web3
+from web3.datastructures import AttributeDict
+from .rpc_batch import make_batch_request
+
+logger = logging.getLogger(__name__)
+
+# Receipt fields returned as hex quantities by the node
+RECEIPT_QUANTITIES = ("blockNumber", "cumulativeGasUsed", "effectiveGasPrice", "gasUsed", "status", "transactionIndex", "type")
+
+class TransferIntent:
+    """A transfer travelling through the pipeline, with the future its caller holds."""
+    __slots__ = ("erc20_handler", "amount", "future", "nonce", "tx", "signed_tx", "tx_hash", "submitted_at", "sent_at")
+
+    def __init__(self, erc20_handler, amount):
+        self.erc20_handler = erc20_handler
+        self.amount = amount
+        self.future = Future()
+        self.nonce = None
+        self.tx = None
+        self.signed_tx = None
+        self.tx_hash = None
+        self.submitted_at = time.monotonic()
+        self.sent_at = None
+
+class TransactionPipeline:
+    """Pipelined transfer submission with asynchronous receipt tracking.
+
+    Transfer intents flow through build, sign and send stages, each on its own thread and
+    connected by bounded queues, so a key can have many transfers in flight without the
+    caller waiting on the node. A single poller fetches receipts for every pending hash
+    in one JSON-RPC batch per interval. `submit_transfer` returns a `Future` that
+    resolves to the transaction receipt. With a `metrics` registry the pipeline records
+    how long intents wait before broadcast, confirmation latency and queue depths.
+
+    A `rate_limiter` (e.g. `AdaptiveRateLimiter`) paces the build stage and is told the
+    latency and outcome of every broadcast. Once it holds intents back the bounded
+    queues fill up and `submit_transfer` blocks, pushing back on the callers.
+
+    With a `journal` (`TxJournal`) every signed transaction is made durable before it is
+    broadcast, and its sent, mined or dropped state is journaled as it changes.
+
+    When a nonce is released after signing or broadcasting failed, the intents already
+    built behind it with higher nonces would be broadcast into the gap and stall until
+    `receipt_timeout`. They are failed instead, until the allocator has resynced back to
+    the released nonce.
+    """
+    def __init__(self, web3_instance, queue_size=1000, poll_interval=0.5, receipt_timeout=120, metrics=None, rate_limiter=None, journal=None):
+        self.web3_instance = web3_instance
+        self.poll_interval = poll_interval
+        self.receipt_timeout = receipt_timeout
+        self.build_queue = queue.Queue(queue_size)
+        self.sign_queue = queue.Queue(queue_size)
+        self.send_queue = queue.Queue(queue_size)
+        self.pending = {}
+        self.pending_lock = Lock()
+        self.gaps = {}  # nonce manager -> nonce released while later ones were in flight
+        self.stop_event = Event()
+        self.threads = []
+        self.metrics = metrics
+        self.rate_limiter = rate_limiter
+        self.journal = journal
+        if metrics is not None:
+            self.send_latency = metrics.histogram("transfer_send_seconds")
+            self.confirmation_latency = metrics.histogram("transfer_confirmation_seconds")
+            metrics.gauge("transfers_in_flight", lambda: self.in_flight)
+            for stage, stage_queue in (("build", self.build_queue), ("sign", self.sign_queue), ("send", self.send_queue)):
+                metrics.gauge("pipeline_queue_depth", stage_queue.qsize, stage=stage)
+
+    def start(self):
+        """Start the pipeline stages and the receipt poller."""
+        self.stop_event.clear()
+        stages = [
+            ("tx-build", self._stage, (self.build_queue, self._build, self.sign_queue)),
+            ("tx-sign", self._stage, (self.sign_queue, self._sign, self.send_queue)),
+            ("tx-send", self._stage, (self.send_queue, self._send, None)),
+            ("tx-receipts", self._poll_receipts, ()),
+        ]
+        self.threads = [Thread(target=target, args=args, name=name, daemon=True) for name, target, args in stages]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        """Stop accepting work, let queued intents drain through the stages and stop polling."""
+        self.build_queue.put(None)
+        for thread in self.threads[:3]:
+            thread.join()
+        self.stop_event.set()
+        for thread in self.threads[3:]:
+            thread.join()
+        self.threads = []
+
+    def submit_transfer(self, erc20_handler, amount):
+        """Queue a transfer and return a Future that resolves to its receipt."""
+        intent = TransferIntent(erc20_handler, amount)
+        self.build_queue.put(intent)
+        return intent.future
+
+    def track(self, erc20_handler, tx_hash):
+        """Follow a transaction that was sent elsewhere, e.g. one recovered from a journal.
+
+        Returns a Future that resolves to its receipt.
+        """
+        intent = TransferIntent(erc20_handler, None)
+        intent.tx_hash = tx_hash
+        intent.sent_at = time.monotonic()
+        with self.pending_lock:
+            self.pending[Web3.to_hex(tx_hash)] = intent
+        return intent.future
+
+    @property
+    def in_flight(self):
+        """Number of transactions sent but not yet mined."""
+        return len(self.pending)
+
+    def _stage(self, source, work, destination):
+        """Run one stage: take intents from `source`, apply `work`, pass them on."""
+        while True:
+            intent = source.get()
+            if intent is None:
+                if destination is not None:
+                    destination.put(None)
+                return
+            try:
+                work(intent)
+            except Exception as e:
+                if self.metrics is not None:
+                    self.metrics.counter("transfer_errors_total", stage=work.__name__.lstrip("_")).inc()
+                intent.future.set_exception(e)
+                continue
+            if destination is not None:
+                destination.put(intent)
+
+    def _build(self, intent):
+        """Allocate a nonce and build the transaction. Nonces are allocated in queue order."""
+        handler = intent.erc20_handler
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        intent.nonce = handler.nonce_manager.get_nonce()
+        try:
+            intent.tx = handler.build_transfer(intent.amount, intent.nonce)
+        except Exception:
+            # Intents are built one at a time, so none has been built behind this nonce yet
+            handler.nonce_manager.release(intent.nonce)
+            raise
+
+    def _sign(self, intent):
+        """Start signing; with a process pool signer several intents are signed in parallel."""
+        intent.signed_tx = intent.erc20_handler.sign_transaction_async(intent.tx)
+
+    def _send(self, intent):
+        """Wait for the signature in queue order, so nonces are still broadcast in sequence."""
+        nonce_manager = intent.erc20_handler.nonce_manager
+        gap = self.gaps.get(nonce_manager)
+        if gap is not None:
+            if intent.nonce > gap:
+                raise RuntimeError(f"Transfer with nonce {intent.nonce} not sent: nonce {gap} before it was released")
+            # Built after the resync; the allocator is back at the released nonce
+            del self.gaps[nonce_manager]
+        try:
+            signed_tx = intent.signed_tx.result()
+        except Exception:
+            nonce_manager.release(intent.nonce)
+            self.gaps[nonce_manager] = intent.nonce
+            raise
+        if self.journal is not None:
+            self.journal.record_signed(intent.erc20_handler.address, intent.nonce, signed_tx.hash, signed_tx.raw_transaction)
+        start = time.monotonic()
+        try:
+            intent.tx_hash = intent.erc20_handler.send_transaction(signed_tx, intent.nonce)
+        except Exception as e:
+            released = not intent.erc20_handler._is_nonce_error(e)
+            if released:
+                # send_transaction released the nonce
+                self.gaps[nonce_manager] = intent.nonce
+            if self.journal is not None:
+                if not released:
+                    self.journal.record_dropped(signed_tx.hash)
+                else:
+                    # The node never took it, so the nonce is free again after a restart
+                    self.journal.record_released(signed_tx.hash)
+            if self.rate_limiter is not None:
+                self.rate_limiter.record(time.monotonic() - start, error=True)
+            raise
+        intent.sent_at = time.monotonic()
+        if self.rate_limiter is not None:
+            self.rate_limiter.record(intent.sent_at - start)
+        if self.journal is not None:
+            self.journal.record_sent(signed_tx.hash)
+        if self.metrics is not None:
+            self.send_latency.observe(intent.sent_at - intent.submitted_at)
+        with self.pending_lock:
+            self.pending[Web3.to_hex(intent.tx_hash)] = intent
+
+    def _poll_receipts(self):
+        # Keep polling after stop() until everything already sent has been resolved
+        while not (self.stop_event.is_set() and not self.pending):
+            time.sleep(self.poll_interval)
+            with self.pending_lock:
+                pending = list(self.pending.items())
+            if not pending:
+                continue
+            try:
+                self._check_receipts(pending)
+            except Exception as e:
+                logger.warning(f"Receipt polling failed: {e}")
+
+    def _check_receipts(self, pending):
+        """Fetch receipts for all pending hashes in one batch and resolve mined ones."""
+        start = time.monotonic()
+        calls = [("eth_getTransactionReceipt", [tx_hash]) for tx_hash, _ in pending]
+        results = make_batch_request(self.web3_instance, calls)
+        now = time.monotonic()
+        if self.metrics is not None:
+            # Batches bypass web3's middleware, so the RPC timing is recorded here
+            self.metrics.histogram("rpc_batch_seconds", method="eth_getTransactionReceipt").observe(now - start)
+        for (tx_hash, intent), result in zip(pending, results):
+            if isinstance(result, Exception):
+                continue
+            if result is None:
+                if now - intent.sent_at >= self.receipt_timeout:
+                    # Presumed dropped: stop tracking and let the nonce allocator resync
+                    self._forget(tx_hash)
+                    if self.journal is not None:
+                        self.journal.record_dropped(tx_hash)
+                    intent.erc20_handler.nonce_manager.resync()
+                    intent.future.set_exception(TimeoutError(f"Transaction {tx_hash} was not mined in {self.receipt_timeout}s"))
+                continue
+            receipt = self._format_receipt(result)
+            self._forget(tx_hash)
+            if self.journal is not None:
+                self.journal.record_mined(tx_hash)
+            if self.metrics is not None:
+                self.confirmation_latency.observe(now - intent.sent_at)
+                self.metrics.counter("transfers_total", status=receipt.get("status")).inc()
+            if receipt.get("status") == 0:
+                intent.erc20_handler.invalidate_gas_estimate()
+            intent.future.set_result(receipt)
+
+    def _forget(self, tx_hash):
+        with self.pending_lock:
+            self.pending.pop(tx_hash, None)
+
+    @staticmethod
+    def _format_receipt(result):
+        """Convert the hex quantities of a raw receipt to integers."""
+        receipt = dict(result)
+        for field in RECEIPT_QUANTITIES:
+            if isinstance(receipt.get(field), str):
+                receipt[field] = int(receipt[field], 16)
+        return AttributeDict(receipt)
@@ -1,43 +1,191 @@
 import os
 import time
-from threading import Thread
 from utils.env_loader import load_env
 from erc20.nonce_manager import NonceManager
 from erc20.erc20_handler import ERC20Handler
-from agents.inbox import Inbox
+from erc20.balance_reader import BalanceReader
+from erc20.gas_oracle import GasEstimateCache, GasPriceOracle
+from erc20.tx_pipeline import TransactionPipeline
+from erc20.signer import ProcessPoolSigner
+from erc20.ledger import TokenLedger
+from erc20.settlement import SettlementEngine
+from erc20.tx_journal import TxJournal
+from agents.inbox import Inbox, RingBufferInbox
 from agents.outbox import Outbox
 from agents.autonomous_agent import AutonomousAgent
+from agents.handler_pool import HandlerPool
+from agents.timer_wheel import TimerWheel
+from agents.trace import TraceRecorder
 from utils.logging_utils import setup_logger
+from utils.rpc_provider import get_shared_provider
+from utils.metrics import MetricsRegistry, rpc_timing_middleware
+from utils.rate_limit import AdaptiveRateLimiter, TokenBucket
 from web3 import Web3
 
+# Load environment variables (they also configure logging)
+load_env()
+
 # Set up logging
 logger = setup_logger()
 
-# Load environment variables
-load_env()
+def create_web3_instance(metrics=None):
+    """Create and return a Web3 instance connected to the Ethereum network.
 
-def create_web3_instance():
-    """Create and return a Web3 instance connected to the Ethereum network."""
-    eth_rpc_url = os.getenv("ETH_RPC_URL")
-    web3_instance = Web3(Web3.HTTPProvider(eth_rpc_url))
+    ETH_RPC_URLS may list several comma-separated endpoints; ETH_RPC_URL is used otherwise.
+    """
+    eth_rpc_urls = os.getenv("ETH_RPC_URLS") or os.getenv("ETH_RPC_URL")
+    provider = get_shared_provider([url.strip() for url in eth_rpc_urls.split(",") if url.strip()])
+    web3_instance = Web3(provider)
+    if metrics is not None:
+        web3_instance.middleware_onion.add(rpc_timing_middleware(metrics), "rpc_timing")
     if not web3_instance.is_connected():
         raise ConnectionError("Web3 connection failed.")
     return web3_instance
 
-def create_erc20_handler(contract_address, private_key, source_address, target_address, nonce_manager, web3_instance, chain_id):
-    """Create and return an ERC20Handler instance."""
+def create_erc20_handler(contract_address, private_key, source_address, target_address, nonce_manager, web3_instance, chain_id, balance_reader=None, gas_oracle=None, gas_cache=None, signer=None, ledger=None):
+    """Create and return an ERC20Handler instance; PRIORITY_FEE (wei) switches transfers to EIP-1559."""
+    priority_fee = int(os.getenv("PRIORITY_FEE", 0)) or None
     return ERC20Handler(
         contract_address, private_key, source_address, target_address, 
-        nonce_manager, web3_instance, chain_id
+        nonce_manager, web3_instance, chain_id, balance_reader, gas_oracle, gas_cache, signer, ledger, priority_fee
+    )
+
+def create_balance_reader(web3_instance):
+    """Create a BalanceReader shared by all agents so balance checks are batched."""
+    use_multicall = os.getenv("BALANCE_MULTICALL", "false").lower() == "true"
+    return BalanceReader(web3_instance, use_multicall=use_multicall)
+
+def create_signer():
+    """Create a process pool signer when SIGNER_PROCESSES is set, otherwise sign in-thread."""
+    processes = int(os.getenv("SIGNER_PROCESSES", 0))
+    if processes <= 0:
+        return None
+    private_keys = [os.getenv("SOURCE_PRIVATE_KEY"), os.getenv("TARGET_PRIVATE_KEY")]
+    return ProcessPoolSigner(private_keys, max_workers=processes)
+
+def create_ledger(web3_instance):
+    """Create a Transfer-log ledger when LEDGER_SNAPSHOT is set, otherwise poll balanceOf."""
+    snapshot_path = os.getenv("LEDGER_SNAPSHOT")
+    if not snapshot_path:
+        return None
+    return TokenLedger(
+        web3_instance, os.getenv("ERC20_CONTRACT_ADDRESS"),
+        confirmations=int(os.getenv("LEDGER_CONFIRMATIONS", 12)),
+        snapshot_path=snapshot_path,
+        start_block=int(os.getenv("LEDGER_START_BLOCK", 0)),
     )
 
-def create_nonce_manager(address, web3_instance):
+def create_metrics():
+    """Create the metrics registry; METRICS_PORT serves it on localhost, METRICS_SNAPSHOT dumps it to a file."""
+    metrics = MetricsRegistry()
+    if os.getenv("METRICS_PORT"):
+        metrics.serve(int(os.getenv("METRICS_PORT")))
+    if os.getenv("METRICS_SNAPSHOT"):
+        metrics.start_snapshots(os.getenv("METRICS_SNAPSHOT"), int(os.getenv("METRICS_SNAPSHOT_INTERVAL", 60)))
+    return metrics
+
+def create_nonce_manager(address, web3_instance, metrics=None):
     """Create and return a NonceManager instance."""
-    return NonceManager(address, web3_instance)
+    nonce_manager = NonceManager(address, web3_instance)
+    if metrics is not None:
+        metrics.gauge("nonce_resyncs", lambda: nonce_manager.resync_count, address=address)
+    return nonce_manager
+
+def create_transfer_limiter(metrics=None):
+    """Create an adaptive transfer rate limiter when TRANSFER_RATE_LIMIT (transfers per second) is set."""
+    max_rate = float(os.getenv("TRANSFER_RATE_LIMIT", 0))
+    if max_rate <= 0:
+        return None
+    limiter = AdaptiveRateLimiter(
+        max_rate,
+        min_rate=min(max_rate, float(os.getenv("TRANSFER_RATE_MIN", 1))),
+        target_latency=float(os.getenv("TRANSFER_TARGET_LATENCY", 1.0)),
+    )
+    if metrics is not None:
+        metrics.gauge("transfer_rate_limit", lambda: limiter.rate)
+    return limiter
 
-def create_agent(name, inbox, outbox, erc20_handler,logger):
-    """Create and return an AutonomousAgent instance."""
-    return AutonomousAgent(name, inbox, outbox, erc20_handler,logger)
+def create_inbox():
+    """Create an inbox bounded by INBOX_MAX_DEPTH with the INBOX_OVERFLOW policy (block, drop or shed).
+
+    INBOX_TYPE=ring creates a `RingBufferInbox` of INBOX_MAX_DEPTH slots (65536 by
+    default) instead, for very deep queues; it always blocks senders when full.
+    """
+    max_depth = int(os.getenv("INBOX_MAX_DEPTH", 0))
+    if os.getenv("INBOX_TYPE", "deque").lower() == "ring":
+        return RingBufferInbox(max_depth) if max_depth > 0 else RingBufferInbox()
+    if max_depth <= 0:
+        return Inbox()
+    return Inbox(max_depth, os.getenv("INBOX_OVERFLOW", Inbox.BLOCK))
+
+def log_transfer_result(agent_name, future):
+    """Log the outcome of a transfer submitted through the pipeline."""
+    try:
+        receipt = future.result()
+        if receipt is None:
+            logger.info(f"[{agent_name}] Transfer cancelled out by opposite transfers; nothing sent")
+            return
+        logger.info(f"[{agent_name}] Transfer mined in block {receipt.blockNumber} with status {receipt.status}")
+    except Exception as e:
+        logger.error(f"[{agent_name}] Transfer failed: {e}")
+
+def create_journal():
+    """Open the pending-transaction journal when TX_JOURNAL (a file path) is set."""
+    path = os.getenv("TX_JOURNAL")
+    if not path:
+        return None
+    journal = TxJournal(path, use_mmap=os.getenv("TX_JOURNAL_MMAP", "false").lower() == "true")
+    journal.start()
+    return journal
+
+def recover_journal(journal, web3_instance, tx_pipeline, erc20_handlers):
+    """Restore nonces from the journal and track the transactions it left pending."""
+    handlers = {handler.address: handler for handler in erc20_handlers}
+    pending = journal.recover(web3_instance, {address: handler.nonce_manager for address, handler in handlers.items()})
+    for entry in pending:
+        handler = handlers.get(Web3.to_checksum_address(entry.address))
+        if handler is not None:
+            future = tx_pipeline.track(handler, entry.tx_hash)
+            future.add_done_callback(lambda future: log_transfer_result("Recovery", future))
+
+def create_settlement(tx_pipeline):
+    """Create a net-settlement engine when SETTLEMENT_WINDOW (seconds) is set."""
+    window = float(os.getenv("SETTLEMENT_WINDOW", 0))
+    if window <= 0:
+        return None
+    return SettlementEngine(tx_pipeline, window)
+
+def handle_crypto_message(agent_name, message, transfers, erc20_handler):
+    """Log a crypto message and queue a token transfer without blocking the agent.
+
+    `transfers` is the transaction pipeline or a settlement engine in front of it.
+    """
+    logger.info(f"[{agent_name}] Received crypto message: {message}")
+    future = transfers.submit_transfer(erc20_handler, 1)
+    future.add_done_callback(lambda future: log_transfer_result(agent_name, future))
+
+def create_agent(name, inbox, outbox, erc20_handler,logger, metrics=None):
+    """Create and return an AutonomousAgent instance.
+
+    HANDLER_WORKERS moves handlers onto a worker pool and SEND_RATE_LIMIT caps the
+    random messages sent per second.
+    """
+    handler_workers = int(os.getenv("HANDLER_WORKERS", 0))
+    send_rate = float(os.getenv("SEND_RATE_LIMIT", 0))
+    send_limiter = TokenBucket(send_rate) if send_rate > 0 else None
+    return AutonomousAgent(name, inbox, outbox, erc20_handler,logger, metrics=metrics, handler_workers=handler_workers, send_limiter=send_limiter)
+
+def create_scheduler():
+    """Create the timer wheel that runs every agent's periodic jobs (TIMER_TICK, TIMER_WORKERS)."""
+    return TimerWheel(tick=float(os.getenv("TIMER_TICK", 0.05)), workers=int(os.getenv("TIMER_WORKERS", 4)))
+
+def create_trace_recorder():
+    """Record every message delivered to the agents when TRACE_RECORD names a file."""
+    path = os.getenv("TRACE_RECORD")
+    if not path:
+        return None
+    logger.info(f"Recording agent messages to {path}")
+    return TraceRecorder(path)
 
 def main():
     
@@ -45,46 +193,73 @@ def main():
     WORDS = ["hello", "sun", "world", "space", "moon", "crypto", "sky", "ocean", "universe", "human"]
 
     # Initialize Web3 and set up variables
-    web3_instance = create_web3_instance()
+    metrics = create_metrics()
+    web3_instance = create_web3_instance(metrics)
     chain_id = int(os.getenv("CHAIN_ID", 123456))
+    balance_reader = create_balance_reader(web3_instance)
+
+    # Gas price and transfer estimates shared by both agents
+    gas_oracle = GasPriceOracle(web3_instance)
+    gas_oracle.start()
+    gas_cache = GasEstimateCache()
+    signer = create_signer()
+    ledger = create_ledger(web3_instance)
+    if ledger is not None:
+        ledger.start()
+
+    # Transfers are built, signed and sent off the agents' message threads
+    journal = create_journal()
+    tx_pipeline = TransactionPipeline(web3_instance, metrics=metrics, rate_limiter=create_transfer_limiter(metrics), journal=journal)
+    tx_pipeline.start()
+    settlement = create_settlement(tx_pipeline)
+    if settlement is not None:
+        settlement.start()
+    transfers = settlement or tx_pipeline
     
     # Nonce managers for both agents
-    nonce_manager1 = create_nonce_manager(os.getenv("SOURCE_ADDRESS"), web3_instance)
-    nonce_manager2 = create_nonce_manager(os.getenv("TARGET_ADDRESS"), web3_instance)
+    nonce_manager1 = create_nonce_manager(os.getenv("SOURCE_ADDRESS"), web3_instance, metrics)
+    nonce_manager2 = create_nonce_manager(os.getenv("TARGET_ADDRESS"), web3_instance, metrics)
 
     # ERC20 handlers for both agents
     erc20_handler1 = create_erc20_handler(
         os.getenv("ERC20_CONTRACT_ADDRESS"), os.getenv("SOURCE_PRIVATE_KEY"),
         os.getenv("SOURCE_ADDRESS"), os.getenv("TARGET_ADDRESS"),
-        nonce_manager1, web3_instance, chain_id
+        nonce_manager1, web3_instance, chain_id, balance_reader, gas_oracle, gas_cache, signer, ledger
     )
     erc20_handler2 = create_erc20_handler(
         os.getenv("ERC20_CONTRACT_ADDRESS"), os.getenv("TARGET_PRIVATE_KEY"),
         os.getenv("TARGET_ADDRESS"), os.getenv("SOURCE_ADDRESS"),
-        nonce_manager2, web3_instance, chain_id
+        nonce_manager2, web3_instance, chain_id, balance_reader, gas_oracle, gas_cache, signer, ledger
     )
 
+    # Resume from the journal before any new transfer allocates a nonce
+    if journal is not None:
+        recover_journal(journal, web3_instance, tx_pipeline, [erc20_handler1, erc20_handler2])
+
     # Create inbox and outbox for both agents
-    inbox1, inbox2 = Inbox(), Inbox()
+    inbox1, inbox2 = create_inbox(), create_inbox()
     outbox1, outbox2 = Outbox(inbox2), Outbox(inbox1)
+    recorder = create_trace_recorder()
+    if recorder is not None:
+        outbox1, outbox2 = Outbox(recorder.wrap("Agent2", inbox2)), Outbox(recorder.wrap("Agent1", inbox1))
 
     # Create agents
-    agent1 = create_agent("Agent1", inbox1, outbox1, erc20_handler1,logger)
-    agent2 = create_agent("Agent2", inbox2, outbox2, erc20_handler2,logger)
+    agent1 = create_agent("Agent1", inbox1, outbox1, erc20_handler1,logger, metrics)
+    agent2 = create_agent("Agent2", inbox2, outbox2, erc20_handler2,logger, metrics)
 
     # Register message handlers
-    agent1.register_message_handler("hello", lambda message: logger.info(f"[Agent1] Received hello message: {message}"))
-    agent2.register_message_handler("crypto", lambda message: logger.info(f"[Agent2] Received crypto message: {message}"))
+    agent1.register_message_handler("hello", lambda message: logger.info(f"[Agent1] Received hello message: {message}"), priority=HandlerPool.HIGH)
+    agent2.register_message_handler("crypto", lambda message: handle_crypto_message("Agent2", message, transfers, erc20_handler2), ordered=True)
 
     # Start agents
     agent1.start()
     agent2.start()
 
-    # Run background tasks for agents
-    Thread(target=agent1.generate_random_messages, args=(WORDS,)).start()
-    Thread(target=agent2.generate_random_messages, args=(WORDS,)).start()
-    Thread(target=agent1.check_balance_periodically).start()
-    Thread(target=agent2.check_balance_periodically).start()
+    # Run background tasks for agents on one shared timer wheel
+    scheduler = create_scheduler()
+    scheduler.start()
+    agent1.schedule_tasks(scheduler, WORDS)
+    agent2.schedule_tasks(scheduler, WORDS)
 
     # Let the script run indefinitely
     try:
@@ -94,6 +269,22 @@ def main():
         logger.info("Shutting down agents.")
         agent1.stop()
         agent2.stop()
+        scheduler.stop()
+        if recorder is not None:
+            recorder.close()
+        # Settle the last window while the pipeline can still send the net transfers
+        if settlement is not None:
+            settlement.stop()
+        tx_pipeline.stop()
+        # After the pipeline, so the states of the last transfers are synced to disk
+        if journal is not None:
+            journal.stop()
+        gas_oracle.stop()
+        if signer is not None:
+            signer.shutdown()
+        if ledger is not None:
+            ledger.stop()
+        metrics.stop()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+from utils.env_loader import load_env
+from utils.logging_utils import setup_logger
+from utils.rpc_provider import get_shared_provider
+from erc20.nonce_manager import NonceManager
+from erc20.erc20_handler import ERC20Handler
+from erc20.gas_oracle import GasEstimateCache, GasPriceOracle
+from erc20.tx_pipeline import TransactionPipeline
+from agents.supervisor import Supervisor, load_topology
+from web3 import Web3
+
+# Load environment variables (they also configure logging)
+load_env()
+
+# Set up logging
+logger = setup_logger()
+
+def transfer_handler(agent, spec, resources):
+    """Handler kind that queues a 1-token transfer to the agent's peer.
+
+    Agents without a key or a peer address have no ERC20 handler and get no handler.
+    """
+    if agent.erc20_handler is None:
+        logger.warning(f"{agent.name} has no key or peer address; its transfer messages are not handled")
+        return None
+    pipeline = resources["pipeline"]
+    return lambda message: pipeline.submit_transfer(agent.erc20_handler, 1)
+
+def setup_erc20_shard(specs):
+    """Create the web3 objects one shard needs; runs inside the worker process."""
+    setup_logger()
+    if not any(spec.get("private_key") for spec in specs):
+        # Topologies still name the transfer kind; without keys it registers no handler
+        return {"handler_kinds": {"transfer": transfer_handler}}
+
+    eth_rpc_urls = os.getenv("ETH_RPC_URLS") or os.getenv("ETH_RPC_URL")
+    web3_instance = Web3(get_shared_provider([url.strip() for url in eth_rpc_urls.split(",") if url.strip()]))
+    chain_id = int(os.getenv("CHAIN_ID", 123456))
+    contract_address = os.getenv("ERC20_CONTRACT_ADDRESS")
+
+    gas_oracle = GasPriceOracle(web3_instance)
+    gas_oracle.start()
+    gas_cache = GasEstimateCache()
+    pipeline = TransactionPipeline(web3_instance)
+    pipeline.start()
+
+    # Agents of a shard that share a key also share its nonce manager
+    nonce_managers = {}
+    erc20_handlers = {}
+    for spec in specs:
+        if not spec.get("private_key") or not spec.get("peer_address"):
+            continue
+        nonce_manager = nonce_managers.setdefault(spec["address"], NonceManager(spec["address"], web3_instance))
+        erc20_handlers[spec["name"]] = ERC20Handler(
+            contract_address, spec["private_key"], spec["address"], spec["peer_address"],
+            nonce_manager, web3_instance, chain_id, gas_oracle=gas_oracle, gas_cache=gas_cache
+        )
+
+    def shutdown():
+        pipeline.stop()
+        gas_oracle.stop()
+
+    return {
+        "erc20_handlers": erc20_handlers,
+        "handler_kinds": {"transfer": transfer_handler},
+        "pipeline": pipeline,
+        "shutdown": shutdown,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an agent topology sharded across worker processes.")
+    parser.add_argument("topology", help="Path to the topology JSON file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    args = parser.parse_args()
+
+    supervisor = Supervisor(load_topology(args.topology), workers=args.workers, shard_setup=setup_erc20_shard)
+    logger.info(f"Starting {len(supervisor.specs)} agents in {len(supervisor.shards)} shards.")
+    supervisor.start()
+    try:
+        supervisor.monitor(args.duration)
+    except KeyboardInterrupt:
+        logger.info("Shutting down agents.")
+    logger.info(json.dumps(supervisor.stop()["totals"]))
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,188 @@
+import atexit
+import json
 import logging
+import os
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from threading import Lock
 
-def setup_logger(name=__name__):
-    """Sets up a logger with a console handler."""
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
-    
-    # Console handler
-    console_handler = logging.StreamHandler()
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_lock = Lock()
+_queue = None
+_listener = None
+_queue_handlers = []
+_configured = {}
+
+class CategoryFilter(logging.Filter):
+    """Rate-limits and samples records by their `category` extra.
+
+    `rate_limits` maps a category to the records per second it may emit (bursts of the
+    same size are allowed); `sample_rates` maps a category to the fraction of records
+    that is kept. Records without a category always pass. The next record let through
+    after a suppression carries the number of records that were dropped.
+    """
+    def __init__(self, rate_limits=None, sample_rates=None):
+        super().__init__()
+        self.rate_limits = rate_limits or {}
+        self.sample_rates = sample_rates or {}
+        self.lock = Lock()
+        self.seen = {}
+        self.buckets = {}  # category -> (tokens, last refill)
+        self.suppressed = {}
+
+    def filter(self, record):
+        category = getattr(record, "category", None)
+        if category is None or (category not in self.rate_limits and category not in self.sample_rates):
+            return True
+        with self.lock:
+            if not self._sampled(category) or not self._within_rate(category):
+                self.suppressed[category] = self.suppressed.get(category, 0) + 1
+                return False
+            suppressed = self.suppressed.pop(category, 0)
+        if suppressed:
+            record.msg = f"{record.getMessage()} [{suppressed} similar suppressed]"
+            record.args = None
+        return True
+
+    def _sampled(self, category):
+        """Keep an evenly spaced `rate` fraction of the records. Caller must hold the lock."""
+        rate = self.sample_rates.get(category)
+        if rate is None:
+            return True
+        count = self.seen.get(category, 0) + 1
+        self.seen[category] = count
+        return int(count * rate) != int((count - 1) * rate)
+
+    def _within_rate(self, category):
+        """Token bucket per category. Caller must hold the lock."""
+        limit = self.rate_limits.get(category)
+        if limit is None:
+            return True
+        now = time.monotonic()
+        tokens, last = self.buckets.get(category, (limit, now))
+        tokens = min(limit, tokens + (now - last) * limit)
+        if tokens < 1:
+            self.buckets[category] = (tokens, now)
+            return False
+        self.buckets[category] = (tokens - 1, now)
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        category = getattr(record, "category", None)
+        if category is not None:
+            entry["category"] = category
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+class ConsoleHandler(logging.StreamHandler):
+    """StreamHandler that looks up `sys.stderr` on every write, so redirection is honoured."""
+    def __init__(self):
+        super().__init__(sys.stderr)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def setup_logger(name=__name__, json_format=None, rate_limits=None, sample_rates=None, queue_size=10000):
+    """Sets up a logger whose records are written to the console by a background thread.
+
+    Calling it again for the same name returns the same logger without adding handlers.
+    Callers only enqueue records; one process-wide `QueueListener` does the console I/O,
+    and records are dropped rather than blocking if it falls `queue_size` behind.
+    `rate_limits` and `sample_rates` configure a `CategoryFilter`; they and
+    `json_format` default to the LOG_RATE_LIMITS, LOG_SAMPLE_RATES ("category=value,...")
+    and LOG_JSON environment variables. The output format is fixed by the first call.
+    """
+    with _lock:
+        if name in _configured:
+            return _configured[name]
+        if json_format is None:
+            json_format = os.getenv("LOG_JSON", "false").lower() == "true"
+        _start_listener(json_format, queue_size)
+
+        logger = logging.getLogger(name)
+        logger.setLevel(logging.INFO)
+        queue_handler = DroppingQueueHandler(_queue)
+        queue_handler.setLevel(logging.INFO)
+        queue_handler.addFilter(CategoryFilter(
+            _parse_settings(os.getenv("LOG_RATE_LIMITS")) if rate_limits is None else rate_limits,
+            _parse_settings(os.getenv("LOG_SAMPLE_RATES")) if sample_rates is None else sample_rates,
+        ))
+        logger.addHandler(queue_handler)
+        _queue_handlers.append(queue_handler)
+        _configured[name] = logger
+        return logger
+
+def shutdown_logging():
+    """Write out every queued record and stop the background writer."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+def _start_listener(json_format, queue_size):
+    """Create the shared queue and console writer on first use. Caller must hold the lock."""
+    global _queue, _listener
+    if _listener is not None:
+        return
+    if _queue is None:
+        _queue = queue.Queue(queue_size)
+    console_handler = ConsoleHandler()
     console_handler.setLevel(logging.INFO)
-    
-    # Format
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    console_handler.setFormatter(formatter)
-    
-    # Add handler
-    logger.addHandler(console_handler)
-    return logger
+    console_handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+    _listener = QueueListener(_queue, console_handler, respect_handler_level=True)
+    _listener.start()
+
+def _restart_in_child():
+    """A forked child has no listener thread; give it a fresh queue and writer."""
+    global _lock, _queue, _listener
+    _lock = Lock()
+    if _listener is None:
+        return
+    handlers = _listener.handlers
+    _queue = queue.Queue(_queue.maxsize)
+    _listener = QueueListener(_queue, *handlers, respect_handler_level=True)
+    for queue_handler in _queue_handlers:
+        queue_handler.queue = _queue
+    _listener.start()
+
+def _parse_settings(value):
+    """Parse "category=number,..." into a dict."""
+    settings = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            category, number = item.split("=", 1)
+            settings[category.strip()] = float(number)
+    return settings
 
+atexit.register(shutdown_logging)
+os.register_at_fork(after_in_child=_restart_in_child)
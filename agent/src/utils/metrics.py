@@ -0,0 +1,261 @@
+import json
+import logging
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Lock, Thread
+
+logger = logging.getLogger(__name__)
+
+class Counter:
+    """Monotonically increasing count."""
+    def __init__(self):
+        self.value = 0
+        self.lock = Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+class Histogram:
+    """Log-linear latency histogram in the style of HdrHistogram.
+
+    Values are recorded in whole microseconds into buckets that are linear within each
+    power of two, so every bucket is at most 1/2**(precision - 1) wide relative to its
+    value (about 6% with the default precision of 5 bits). Recording is a bit length,
+    a shift and a dict increment, and memory stays small whatever the range.
+    """
+    def __init__(self, precision=5):
+        self.precision = precision
+        self.half = 1 << (precision - 1)
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = Lock()
+
+    def observe(self, seconds):
+        """Record a duration in seconds."""
+        index = self._index(int(seconds * 1e6))
+        with self.lock:
+            self.buckets[index] = self.buckets.get(index, 0) + 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def time(self):
+        """Context manager that records the duration of its block."""
+        return _Timer(self)
+
+    def percentile(self, fraction):
+        """Upper bound, in seconds, of the bucket holding the given fraction of values."""
+        with self.lock:
+            if not self.count:
+                return 0.0
+            rank = fraction * self.count
+            seen = 0
+            for index in sorted(self.buckets):
+                seen += self.buckets[index]
+                if seen >= rank:
+                    return min(self._upper_bound(index) / 1e6, self.max)
+            return self.max
+
+    def _index(self, value):
+        magnitude = max(0, value.bit_length() - self.precision)
+        return magnitude * self.half + (value >> magnitude)
+
+    def _upper_bound(self, index):
+        if index < 2 * self.half:
+            return index + 1
+        magnitude = index // self.half - 1
+        return ((index - magnitude * self.half) + 1) << magnitude
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+class MetricsRegistry:
+    """Process-wide counters, latency histograms and gauges.
+
+    Metrics are identified by a name plus keyword labels and created on first use; hot
+    paths should keep the returned object instead of looking it up per call. Gauges are
+    callbacks read only when metrics are exported. `render_prometheus` produces the
+    Prometheus text format (histograms are exported as summaries with p50/p90/p99),
+    `serve` exposes it on localhost and `start_snapshots` dumps JSON periodically.
+    """
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, prefix="agent_"):
+        self.prefix = prefix
+        self.lock = Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.stop_event = Event()
+        self.server = None
+        self.threads = []
+
+    def counter(self, name, **labels):
+        return self._get(self.counters, name, labels, Counter)
+
+    def histogram(self, name, **labels):
+        return self._get(self.histograms, name, labels, Histogram)
+
+    def gauge(self, name, callback, **labels):
+        """Register a callback returning the current value of a gauge."""
+        with self.lock:
+            self.gauges[(name, self._label_key(labels))] = callback
+
+    def snapshot(self):
+        """Return every metric as a JSON-serializable dict."""
+        with self.lock:
+            counters = list(self.counters.items())
+            histograms = list(self.histograms.items())
+            gauges = list(self.gauges.items())
+        return {
+            "timestamp": time.time(),
+            "counters": [dict(name=name, labels=dict(labels), value=counter.value) for (name, labels), counter in counters],
+            "gauges": [dict(name=name, labels=dict(labels), value=self._read_gauge(callback)) for (name, labels), callback in gauges],
+            "histograms": [
+                dict(
+                    name=name, labels=dict(labels), count=histogram.count, sum=histogram.total, max=histogram.max,
+                    **{f"p{int(quantile * 100)}": histogram.percentile(quantile) for quantile in self.QUANTILES}
+                )
+                for (name, labels), histogram in histograms
+            ],
+        }
+
+    def render_prometheus(self):
+        """Render every metric in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        typed = set()
+        for kind, entries in (("counter", snapshot["counters"]), ("gauge", snapshot["gauges"])):
+            for entry in sorted(entries, key=lambda entry: entry["name"]):
+                name = self.prefix + entry["name"]
+                if name not in typed:
+                    lines.append(f"# TYPE {name} {kind}")
+                    typed.add(name)
+                lines.append(f"{name}{self._format_labels(entry['labels'])} {entry['value']}")
+        for entry in sorted(snapshot["histograms"], key=lambda entry: entry["name"]):
+            name = self.prefix + entry["name"]
+            if name not in typed:
+                lines.append(f"# TYPE {name} summary")
+                typed.add(name)
+            for quantile in self.QUANTILES:
+                labels = dict(entry["labels"], quantile=str(quantile))
+                lines.append(f"{name}{self._format_labels(labels)} {entry[f'p{int(quantile * 100)}']}")
+            lines.append(f"{name}_sum{self._format_labels(entry['labels'])} {entry['sum']}")
+            lines.append(f"{name}_count{self._format_labels(entry['labels'])} {entry['count']}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve `render_prometheus` at /metrics; binds to localhost by default."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        thread = Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        thread.start()
+        self.threads.append(thread)
+        logger.info(f"Serving metrics on http://{host}:{self.server.server_address[1]}/metrics")
+        return self.server.server_address[1]
+
+    def start_snapshots(self, path, interval=60):
+        """Write `snapshot` as JSON to `path` every `interval` seconds."""
+        thread = Thread(target=self._dump_snapshots, args=(path, interval), name="metrics-snapshot", daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def write_snapshot(self, path):
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(self.snapshot(), file)
+        os.replace(temp_path, path)
+
+    def stop(self):
+        """Stop the HTTP endpoint and the snapshot writer."""
+        self.stop_event.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def _dump_snapshots(self, path, interval):
+        while not self.stop_event.wait(interval):
+            try:
+                self.write_snapshot(path)
+            except OSError as e:
+                logger.warning(f"Metrics snapshot failed: {e}")
+        self.write_snapshot(path)
+
+    def _get(self, metrics, name, labels, factory):
+        key = (name, self._label_key(labels))
+        metric = metrics.get(key)
+        if metric is None:
+            with self.lock:
+                metric = metrics.setdefault(key, factory())
+        return metric
+
+    @staticmethod
+    def _label_key(labels):
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ""
+        pairs = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+        return "{" + pairs + "}"
+
+    @staticmethod
+    def _read_gauge(callback):
+        try:
+            return callback()
+        except Exception:
+            return float("nan")
+
+def rpc_timing_middleware(metrics):
+    """Web3 middleware that records the latency and errors of every RPC method."""
+    def middleware(make_request, web3_instance):
+        def timed_request(method, params):
+            start = time.perf_counter()
+            try:
+                response = make_request(method, params)
+            except Exception:
+                metrics.counter("rpc_errors_total", method=method).inc()
+                raise
+            metrics.histogram("rpc_request_seconds", method=method).observe(time.perf_counter() - start)
+            if "error" in response:
+                metrics.counter("rpc_errors_total", method=method).inc()
+            return response
+        return timed_request
+    return middleware
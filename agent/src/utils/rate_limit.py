@@ -0,0 +1,93 @@
+import time
+from threading import Lock
+
+class TokenBucket:
+    """Token bucket allowing `rate` operations per second with bursts of up to `burst`."""
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError("Rate must be positive.")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.last = time.monotonic()
+        self.lock = Lock()
+
+    def try_acquire(self, tokens=1):
+        """Take `tokens` if they are available now; returns whether they were taken."""
+        with self.lock:
+            return self._take(tokens) == 0
+
+    def acquire(self, tokens=1, timeout=None):
+        """Wait until `tokens` are available and take them.
+
+        Returns False if that would take longer than `timeout` seconds. Raises
+        ValueError for more tokens than the bucket holds, which would never arrive.
+        """
+        if tokens > self.burst:
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket with a burst of {self.burst}.")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                wait = self._take(tokens)
+            if not wait:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def set_rate(self, rate):
+        """Change the refill rate; tokens already earned are kept."""
+        with self.lock:
+            self._refill()
+            self.rate = rate
+
+    def _take(self, tokens):
+        """Take the tokens or return the seconds until they would be available. Caller must hold the lock."""
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0
+        return (tokens - self.tokens) / self.rate
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+class AdaptiveRateLimiter(TokenBucket):
+    """Token bucket whose rate follows observed latency and errors (AIMD).
+
+    Callers report each operation with `record`. While operations succeed under
+    `target_latency` the rate grows by `increase` per second of elapsed time, up to
+    `max_rate`. An error or a slow operation multiplies the rate by `decrease`, down to
+    `min_rate`, at most once per `cooldown` seconds so one burst of failures counts once.
+    """
+    def __init__(self, max_rate, min_rate=1.0, target_latency=1.0, increase=1.0, decrease=0.5, cooldown=1.0, initial_rate=None):
+        super().__init__(initial_rate or max_rate, burst=max(1.0, min_rate))
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.target_latency = target_latency
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.last_adjusted = time.monotonic()
+        self.last_decrease = float("-inf")
+        self.errors = 0
+        self.slow = 0
+
+    def record(self, latency, error=False):
+        """Report the latency of one operation and whether it failed."""
+        with self.lock:
+            self._refill()
+            now = time.monotonic()
+            if error or latency > self.target_latency:
+                if error:
+                    self.errors += 1
+                else:
+                    self.slow += 1
+                if now - self.last_decrease >= self.cooldown:
+                    self.rate = max(self.min_rate, self.rate * self.decrease)
+                    self.last_decrease = now
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase * (now - self.last_adjusted))
+            self.last_adjusted = now
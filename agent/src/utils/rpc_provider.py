@@ -0,0 +1,162 @@
+import json
+import logging
+import time
+from threading import Event, Lock, Thread
+import requests
+from requests.adapters import HTTPAdapter
+from web3.providers.base import JSONBaseProvider
+
+logger = logging.getLogger(__name__)
+
+# Methods that must reach the same node so pending nonces stay consistent
+WRITE_METHODS = {"eth_sendRawTransaction", "eth_sendTransaction", "eth_getTransactionCount"}
+
+class RPCEndpoint:
+    """One RPC URL with its keep-alive session pool, latency EWMA and health state."""
+    def __init__(self, uri, pool_size):
+        self.uri = uri
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.latency = None
+        self.failures = 0
+        self.healthy = True
+
+    def post(self, data, timeout):
+        """POST an encoded JSON-RPC payload and return the decoded response."""
+        response = self.session.post(
+            self.uri, data=data, headers={"Content-Type": "application/json"}, timeout=timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+class PooledHTTPProvider(JSONBaseProvider):
+    """Web3 provider that spreads requests over several RPC endpoints.
+
+    Each endpoint keeps its own keep-alive session with up to `pool_size` connections.
+    Reads go to the healthy endpoint with the lowest latency EWMA; writes and nonce reads
+    are pinned to one endpoint and only move when it fails. An endpoint is ejected after
+    `max_failures` consecutive errors and readmitted once a background health check
+    succeeds. Create one instance per process and share it between all agents.
+    """
+    def __init__(self, endpoint_uris, pool_size=50, timeout=10, ewma_alpha=0.2, max_failures=3, health_check_interval=5):
+        super().__init__()
+        if not endpoint_uris:
+            raise ValueError("At least one RPC endpoint is required.")
+        self.endpoints = [RPCEndpoint(uri, pool_size) for uri in endpoint_uris]
+        self.timeout = timeout
+        self.ewma_alpha = ewma_alpha
+        self.max_failures = max_failures
+        self.health_check_interval = health_check_interval
+        self.lock = Lock()
+        self.write_endpoint = self.endpoints[0]
+        self.stop_event = Event()
+        self.health_thread = None
+
+    @property
+    def endpoint_uri(self):
+        """URI of the endpoint writes are currently pinned to."""
+        return self.write_endpoint.uri
+
+    def start(self):
+        """Start the background health checks that readmit ejected endpoints."""
+        if self.health_thread is None:
+            self.stop_event.clear()
+            self.health_thread = Thread(target=self._check_health, name="rpc-health", daemon=True)
+            self.health_thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.health_thread is not None:
+            self.health_thread.join()
+            self.health_thread = None
+
+    def make_request(self, method, params):
+        """Send one JSON-RPC request, failing over to the next endpoint on errors."""
+        data = self.encode_rpc_request(method, params)
+        return self._send(data, method in WRITE_METHODS)
+
+    def make_batch_request(self, calls):
+        """Send (method, params) calls as one JSON-RPC batch; ids are the call positions."""
+        payload = [
+            {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+            for request_id, (method, params) in enumerate(calls)
+        ]
+        is_write = any(method in WRITE_METHODS for method, _ in calls)
+        return self._send(json.dumps(payload), is_write)
+
+    def _send(self, data, is_write):
+        last_error = None
+        for endpoint in self._candidates(is_write):
+            start = time.monotonic()
+            try:
+                response = endpoint.post(data, self.timeout)
+            except (requests.RequestException, ValueError) as e:
+                self._record_failure(endpoint, e)
+                last_error = e
+                continue
+            self._record_success(endpoint, time.monotonic() - start)
+            return response
+        raise ConnectionError(f"All RPC endpoints failed: {last_error}")
+
+    def _candidates(self, is_write):
+        """Endpoints to try in order: pinned writer first for writes, fastest first for reads."""
+        with self.lock:
+            healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+            if is_write:
+                if self.write_endpoint in healthy:
+                    healthy.remove(self.write_endpoint)
+                    healthy.insert(0, self.write_endpoint)
+            else:
+                # Endpoints without a measurement yet are tried first so they get one
+                healthy.sort(key=lambda endpoint: -1 if endpoint.latency is None else endpoint.latency)
+            # Fall back to ejected endpoints rather than failing outright
+            return healthy + [endpoint for endpoint in self.endpoints if not endpoint.healthy]
+
+    def _record_success(self, endpoint, latency):
+        with self.lock:
+            if endpoint.latency is None:
+                endpoint.latency = latency
+            else:
+                endpoint.latency += self.ewma_alpha * (latency - endpoint.latency)
+            endpoint.failures = 0
+            endpoint.healthy = True
+            if not self.write_endpoint.healthy:
+                self.write_endpoint = endpoint
+
+    def _record_failure(self, endpoint, error):
+        with self.lock:
+            endpoint.failures += 1
+            if endpoint.healthy and endpoint.failures >= self.max_failures:
+                endpoint.healthy = False
+                logger.warning(f"Ejecting RPC endpoint {endpoint.uri}: {error}")
+                if endpoint is self.write_endpoint:
+                    replacement = next((candidate for candidate in self.endpoints if candidate.healthy), None)
+                    if replacement is not None:
+                        self.write_endpoint = replacement
+
+    def _check_health(self):
+        while not self.stop_event.wait(self.health_check_interval):
+            for endpoint in self.endpoints:
+                if endpoint.healthy:
+                    continue
+                start = time.monotonic()
+                try:
+                    endpoint.post(self.encode_rpc_request("eth_blockNumber", []), self.timeout)
+                except (requests.RequestException, ValueError):
+                    continue
+                self._record_success(endpoint, time.monotonic() - start)
+                logger.info(f"Readmitted RPC endpoint {endpoint.uri}.")
+
+_shared_provider = None
+_shared_provider_lock = Lock()
+
+def get_shared_provider(endpoint_uris, **kwargs):
+    """Return the process-wide provider, creating and starting it on first use."""
+    global _shared_provider
+    with _shared_provider_lock:
+        if _shared_provider is None:
+            _shared_provider = PooledHTTPProvider(endpoint_uris, **kwargs)
+            _shared_provider.start()
+        return _shared_provider
@@ -1,13 +1,27 @@
+import asyncio
+import multiprocessing
+import random
+import tempfile
 import unittest
-from threading import Thread
+from threading import Event, Thread
 import time
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
 from src.agents.autonomous_agent import AutonomousAgent
-from src.agents.inbox import Inbox
+from src.agents.async_agent import AsyncAutonomousAgent
+from src.agents.dispatcher import MessageDispatcher
+from src.agents.handler_pool import HandlerPool
+from src.agents.inbox import AsyncInbox, Inbox, RingBufferInbox
+from src.agents.message import Message
 from src.agents.outbox import Outbox
+from src.agents.transport import InProcessTransport, SharedMemoryTransport, SocketTransport, Transport
+from src.agents.supervisor import Supervisor, expand_topology, plan_shards
+from src.agents.timer_wheel import TimerWheel
+from src.agents.trace import TraceRecorder, TraceReplayer, read_trace
 from src.erc20.erc20_handler import ERC20Handler
 from src.erc20.nonce_manager import NonceManager
 from src.utils.logging_utils import setup_logger
+from src.utils.metrics import MetricsRegistry
+from src.utils.rate_limit import TokenBucket
 from src.utils.env_loader import load_env
 import os
 
@@ -138,10 +152,715 @@ class TestAgent(unittest.TestCase):
             self.logger.error(f"{self._testMethodName}: Failed - {e}")
             raise
 
+    def test_inbox_concurrent_senders_lose_nothing(self):
+        """Test that concurrent senders and a draining consumer never lose messages"""
+        try:
+            received = []
+            senders = [self._start_thread(self._send_many, 500) for _ in range(4)]
+            while any(sender.is_alive() for sender in senders) or self.inbox.depth:
+                received.extend(self.inbox.wait_for_messages(timeout=0.05, max_batch=64))
+            for sender in senders:
+                sender.join()
+            received.extend(self.inbox.get_messages())
+
+            self.assertEqual(len(received), 2000)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_run_dispatches_without_polling_delay(self):
+        """Test that a running agent dispatches a message as soon as it arrives"""
+        try:
+            handled = Event()
+            self.agent.register_message_handler("sky", lambda msg: handled.set())
+            self.agent.start()
+
+            start = time.monotonic()
+            self.outbox.send_message("sky ocean")
+            self.assertTrue(handled.wait(1))
+            self.assertLess(time.monotonic() - start, 0.5)
+
+            self.agent.stop()
+            self.agent.join(1)
+            self.assertFalse(self.agent.is_alive())
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_dispatch_matches_substring_semantics(self):
+        """Test that the compiled dispatcher matches the same handlers as a substring scan"""
+        try:
+            dispatcher = MessageDispatcher()
+            patterns = ["he", "she", "hers", "his", "hello", "lo w", "o", "crypto", "moon"]
+            for pattern in patterns:
+                dispatcher.register(pattern, pattern)
+
+            for message in ["ushers", "hello world", "crypto moon", "sky ocean", "", "hishers"]:
+                expected = [pattern for pattern in patterns if pattern in message]
+                self.assertEqual([handler for _, handler in dispatcher.match(message)], expected)
+
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_dispatch_token_mode(self):
+        """Test that token mode only matches whole words"""
+        try:
+            dispatcher = MessageDispatcher(MessageDispatcher.TOKEN)
+            dispatcher.register("hello", "hello")
+            dispatcher.register("moon", "moon")
+
+            self.assertEqual(dispatcher.match("hello moon"), [("hello", "hello"), ("moon", "moon")])
+            self.assertEqual(dispatcher.match("hellohello"), [])
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_match_cache_bypassed_for_unique_payloads(self):
+        """Test that the match cache serves repeated payloads and is bypassed when payloads never repeat"""
+        try:
+            dispatcher = MessageDispatcher(MessageDispatcher.TOKEN)
+            dispatcher.CACHE_SIZE, dispatcher.CACHE_BYPASS = 8, 20
+            dispatcher.register("hello", "hello")
+            for _ in range(100):
+                self.assertEqual(dispatcher.match("hello sun"), [("hello", "hello")])
+            self.assertEqual((len(dispatcher._index[2]), dispatcher._bypass), (1, 0))
+
+            # The first fill still counts the repeated hits; the second has none
+            for index in range(16):
+                self.assertEqual(dispatcher.match(f"hello {index}"), [("hello", "hello")])
+            self.assertEqual(dispatcher._bypass, 20)
+            for index in range(20):
+                self.assertEqual(dispatcher.match(f"moon {index}"), [])
+            self.assertEqual((len(dispatcher._index[2]), dispatcher._bypass), (1, 0))
+
+            dispatcher.register("moon", "moon")
+            self.assertEqual(dispatcher.match("moon 1"), [("moon", "moon")])
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_handler_timings_and_inbox_depth_recorded(self):
+        """Test that an agent with a metrics registry times handlers and reports inbox depth"""
+        try:
+            metrics = MetricsRegistry()
+            agent = AutonomousAgent("Timed", self.inbox, self.outbox, self.erc20_handler, self.logger, metrics=metrics)
+            agent.register_message_handler("crypto", lambda msg: self.erc20_handler.execute_transfer(1))
+            self.inbox.add_message("crypto moon")
+            self.inbox.add_message("crypto sky")
+            self.assertIn('agent_inbox_depth{agent="Timed"} 2', metrics.render_prometheus())
+
+            agent.process_messages()
+
+            self.assertEqual(metrics.histogram("handler_seconds", agent="Timed", handler="crypto").count, 2)
+            self.assertIn('agent_inbox_depth{agent="Timed"} 0', metrics.render_prometheus())
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_message_records_are_slotted_and_dispatched(self):
+        """Test that Message records have no instance dict and dispatch on their payload"""
+        try:
+            message = Message.create("crypto moon", "crypto", "Agent1")
+            self.assertFalse(hasattr(message, "__dict__"))
+            self.assertEqual(str(message), "crypto moon")
+            self.assertEqual((message.message_type, message.sender), ("crypto", "Agent1"))
+            self.assertIs(Message.create("crypto" + " moon", "crypto", "Agent1").payload, message.payload)
+
+            self.inbox.add_message(message)
+            self.agent.process_messages()
+            self.erc20_handler.execute_transfer.assert_called_once_with(1)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_ring_buffer_inbox_blocks_when_full_and_keeps_order(self):
+        """Test that the ring buffer inbox holds at most its capacity and drains in order"""
+        try:
+            inbox = RingBufferInbox(capacity=8)
+            outbox = Outbox(inbox)
+            sender = self._start_thread(lambda: [outbox.send_message(f"hello {i}") for i in range(100)])
+            time.sleep(0.1)
+            self.assertEqual(inbox.depth, 8)
+
+            received = []
+            while sender.is_alive() or inbox.depth:
+                batch = inbox.wait_for_messages(timeout=0.05, max_batch=5)
+                self.assertLessEqual(len(batch), 5)
+                received.extend(batch)
+            sender.join()
+
+            self.assertEqual(received, [f"hello {i}" for i in range(100)])
+            self.assertEqual(inbox.slots, [None] * 8)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_ring_batches_return_slots_however_they_end(self):
+        """Test that ring buffer batches free their slots when dropped unread or closed, and keep their length"""
+        try:
+            inbox = RingBufferInbox(capacity=4)
+            for i in range(4):
+                self.assertTrue(inbox.try_add_message(f"hello {i}"))
+            self.assertFalse(inbox.try_add_message("hello 4"))
+
+            batch = inbox.get_messages(max_batch=2)
+            self.assertEqual(len(batch), 2)
+            self.assertEqual(next(iter(batch)), "hello 0")
+            self.assertEqual(len(batch), 2)
+            del batch  # Dropped half read
+            inbox.wait_for_messages(timeout=0)  # Dropped unread
+            self.assertEqual((inbox.depth, inbox.slots), (0, [None] * 4))
+
+            for i in range(4):
+                self.assertTrue(inbox.try_add_message(f"moon {i}"))
+            batch = inbox.get_messages()
+            batch.close()
+            self.assertEqual(list(batch), [])
+            self.assertTrue(inbox.try_add_message("sky"))
+
+            agent = AutonomousAgent("Ring", inbox, None, None, self.logger)
+            for i in range(3):
+                inbox.add_message(f"sun {i}")
+            results = []
+            sender = self._start_thread(lambda: results.append(inbox.add_message("sun 3")))
+            time.sleep(0.1)
+            self.assertTrue(sender.is_alive())
+            agent.stop()
+            sender.join(1)
+            self.assertEqual(results, [False])
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_slow_handler_does_not_block_fast_handler(self):
+        """Test that pooled handlers keep hello fast behind slow ordered crypto handlers"""
+        try:
+            agent = AutonomousAgent("Pooled", self.inbox, self.outbox, self.erc20_handler, self.logger, handler_workers=2)
+            crypto_calls = []
+            active = []
+            hello_handled = Event()
+
+            def slow_crypto(msg):
+                active.append(msg)
+                self.assertEqual(len(active), 1)
+                time.sleep(0.2)
+                crypto_calls.append(str(msg))
+                active.remove(msg)
+
+            agent.register_message_handler("crypto", slow_crypto, priority=HandlerPool.LOW, ordered=True)
+            agent.register_message_handler("hello", lambda msg: hello_handled.set(), priority=HandlerPool.HIGH)
+            for word in ["sun", "moon", "sky"]:
+                self.inbox.add_message(f"crypto {word}")
+            self.inbox.add_message("hello world")
+
+            start = time.monotonic()
+            agent.process_messages()
+            self.assertTrue(hello_handled.wait(1))
+            self.assertLess(time.monotonic() - start, 0.15)
+
+            agent.handler_pool.shutdown()
+            self.assertEqual(crypto_calls, ["crypto sun", "crypto moon", "crypto sky"])
+            self.assertEqual(agent.handler_pool.error_count, 0)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_handler_pool_orders_by_priority_then_deadline(self):
+        """Test that waiting handler tasks start by priority class, then earliest deadline"""
+        try:
+            pool = HandlerPool(workers=1)
+            busy, release = Event(), Event()
+            started = []
+            pool.submit(lambda: busy.set() or release.wait())
+            self.assertTrue(busy.wait(1))
+            pool.submit(started.append, "low", priority=HandlerPool.LOW)
+            pool.submit(started.append, "normal-late", deadline=10)
+            pool.submit(started.append, "normal-no-deadline")
+            pool.submit(started.append, "normal-soon", deadline=1)
+            pool.submit(started.append, "high", priority=HandlerPool.HIGH)
+            self.assertEqual(pool.depth, 5)
+
+            release.set()
+            pool.shutdown()
+            self.assertEqual(started, ["high", "normal-soon", "normal-late", "normal-no-deadline", "low"])
+            self.assertEqual(pool.late_count, 0)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_bounded_inbox_overflow_policies(self):
+        """Test that a full bounded inbox drops, sheds or blocks according to its policy"""
+        try:
+            dropping = Inbox(max_depth=2, overflow=Inbox.DROP)
+            results = [Outbox(dropping).send_message(f"hello {i}") for i in range(3)]
+            self.assertEqual(results, [True, True, False])
+            self.assertEqual((dropping.get_messages(), dropping.dropped_count), (["hello 0", "hello 1"], 1))
+
+            shedding = Inbox(max_depth=2, overflow=Inbox.SHED)
+            for i in range(3):
+                shedding.add_message(f"hello {i}")
+            self.assertEqual((shedding.get_messages(), shedding.dropped_count), (["hello 1", "hello 2"], 1))
+
+            blocking = Inbox(max_depth=2)
+            sender = self._start_thread(lambda: [blocking.add_message(f"hello {i}") for i in range(3)])
+            time.sleep(0.1)
+            self.assertTrue(sender.is_alive())
+            self.assertEqual(blocking.get_messages(), ["hello 0", "hello 1"])
+            sender.join(1)
+            self.assertEqual(blocking.get_messages(), ["hello 2"])
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_stopping_agent_releases_senders_blocked_on_full_inbox(self):
+        """Test that a sender blocked on a full inbox gets False once the consuming agent stops"""
+        try:
+            inbox = Inbox(max_depth=1)
+            agent = AutonomousAgent("Receiver", inbox, None, None, self.logger)
+            self.assertTrue(Outbox(inbox).send_message("hello sun"))
+            results = []
+            sender = self._start_thread(lambda: results.append(Outbox(inbox).send_message("hello moon")))
+            time.sleep(0.1)
+            self.assertTrue(sender.is_alive())
+
+            agent.stop()
+            sender.join(1)
+            self.assertFalse(sender.is_alive())
+            self.assertEqual(results, [False])
+            self.assertFalse(Outbox(inbox).send_message("hello sky"))
+            self.assertEqual((inbox.get_messages(), inbox.dropped_count), (["hello sun"], 2))
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_timer_wheel_fires_across_levels_and_cancels(self):
+        """Test one-shot and periodic timer wheel jobs, cascading from upper levels and cancellation"""
+        try:
+            # Four slots per level, so a 0.5 s timer starts two levels up and is cascaded down
+            wheel = TimerWheel(tick=0.01, slots=4, levels=3, workers=2)
+            fired = {"late": [], "soon": [], "periodic": [], "cancelled": []}
+            late = Event()
+            start = time.monotonic()
+            wheel.schedule(0.5, lambda: fired["late"].append(time.monotonic() - start) or late.set())
+            wheel.schedule(0.03, fired["soon"].append, "soon")
+            wheel.schedule_periodic(0.05, fired["periodic"].append, "tick", jitter=0.2)
+            wheel.schedule(0.1, fired["cancelled"].append, "too late").cancel()
+            wheel.start()
+
+            self.assertTrue(late.wait(2))
+            wheel.stop()
+            self.assertGreaterEqual(fired["late"][0], 0.49)
+            self.assertEqual(fired["soon"], ["soon"])
+            self.assertEqual(fired["cancelled"], [])
+            self.assertTrue(5 <= len(fired["periodic"]) <= 13)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_scheduled_tasks_stop_immediately(self):
+        """Test that agent jobs on a shared timer wheel stop with the agent"""
+        try:
+            wheel = TimerWheel(tick=0.01)
+            wheel.start()
+            agents = [AutonomousAgent(f"Agent{i}", self.inbox, self.outbox, self.erc20_handler, self.logger) for i in range(50)]
+            for agent in agents:
+                agent.schedule_tasks(wheel, self.agent.WORDS, message_interval=0.05, balance_interval=0.1)
+            time.sleep(0.5)
+            for agent in agents:
+                agent.stop()
+            time.sleep(0.05)  # Lets runs that had already started finish
+            sent = sum(agent.sent_count for agent in agents)
+            time.sleep(0.2)
+            wheel.stop()
+
+            self.assertTrue(all(agent.sent_count > 0 for agent in agents))
+            self.assertEqual(sum(agent.sent_count for agent in agents), sent)
+            self.assertEqual(len(self.inbox.get_messages()), sent)
+            self.erc20_handler.fetch_balance.assert_called()
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_scheduled_sends_never_block_timer_workers(self):
+        """Test that rate-limited and back-pressured agents cannot hold the shared timer worker"""
+        try:
+            wheel = TimerWheel(tick=0.01, workers=1)
+            wheel.start()
+            full = Inbox(max_depth=1)
+            full.add_message("hello sun")  # Nobody drains this inbox
+            stuck = AutonomousAgent("Stuck", Inbox(), Outbox(full), None, self.logger, send_limiter=TokenBucket(0.1, burst=1))
+            healthy = AutonomousAgent("Healthy", Inbox(), self.outbox, None, self.logger)
+            for agent in (stuck, healthy):
+                agent.schedule_tasks(wheel, self.agent.WORDS, message_interval=0.02)
+            time.sleep(0.4)
+
+            start = time.monotonic()
+            for agent in (stuck, healthy):
+                agent.stop()
+            wheel.stop()
+            self.assertLess(time.monotonic() - start, 0.5)
+            self.assertEqual((stuck.sent_count, stuck.rejected_count), (0, 1))
+            self.assertGreater(healthy.sent_count, 5)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_trace_records_deliveries_and_survives_torn_tail(self):
+        """Test that recorded messages read back in order and a torn last record is ignored"""
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "trace.bin")
+                clock = iter([0.0, 0.5, 1.25, 2.0]).__next__
+                recorder = TraceRecorder(path, clock=clock)
+                outbox = Outbox(recorder.wrap("Agent2", self.inbox))
+                outbox.send_message(Message.create("hello sun", "hello", "Agent1"))
+                outbox.send_message("crypto moon")
+                outbox.send_message(Message.create("hello sky", "hello", "Agent1"))
+                recorder.close()
+                self.assertEqual([str(message) for message in self.inbox.get_messages()], ["hello sun", "crypto moon", "hello sky"])
+
+                events = [(event.offset, event.agent, event.sender, event.message_type, event.payload) for event in read_trace(path)]
+                self.assertEqual(events, [
+                    (0.5, "Agent2", "Agent1", "hello", "hello sun"),
+                    (1.25, "Agent2", "", "", "crypto moon"),
+                    (2.0, "Agent2", "Agent1", "hello", "hello sky"),
+                ])
+                # Magic, four 5-byte name records with their names, then 19 bytes plus the payload per message
+                self.assertEqual(os.path.getsize(path), 8 + 4 * 5 + len("Agent2Agent1hello") + 3 * 19 + len("hello suncrypto moonhello sky"))
+
+                with open(path, "r+b") as file:
+                    file.truncate(os.path.getsize(path) - 3)
+                self.assertEqual([event.payload for event in read_trace(path)], ["hello sun", "crypto moon"])
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_trace_replay_scales_time_and_reports_drops(self):
+        """Test replay pacing, deterministic seeding, dispatch latency and dropped-message counts"""
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "trace.bin")
+                offsets = iter([0.0] + [index * 0.05 for index in range(20)] + [1.0]).__next__
+                recorder = TraceRecorder(path, clock=offsets)
+                for index in range(20):
+                    recorder.record("Agent1", Message.create(f"hello {index}", "hello", "Agent2"))
+                recorder.record("Nobody", "hello")
+                recorder.close()
+
+                # Ten times faster: 20 messages recorded over 0.95 s take about 0.1 s
+                agent = AutonomousAgent("Agent1", Inbox(), None, None, self.logger)
+                replayer = TraceReplayer(path, {"Agent1": agent.inbox}, speed=10, seed=7)
+                choices = []
+                agent.register_message_handler("hello", lambda message: replayer.observe(message) or choices.append(random.random()))
+                agent.start()
+                replayer.run()
+                deadline = time.monotonic() + 2
+                while len(replayer.latencies) < 20 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                agent.stop()
+                agent.join()
+                report = replayer.report()
+                self.assertTrue(0.09 <= report["duration_s"] < 0.5)
+                self.assertEqual((report["replayed"], report["unroutable"], report["dropped"]), (20, 1, 0))
+                self.assertEqual(report["dispatch_latency"]["count"], 20)
+                random.seed(7)
+                self.assertEqual(choices, [random.random() for _ in range(20)])
+
+                # As fast as possible into a bounded inbox nobody drains
+                inbox = Inbox(max_depth=5, overflow=Inbox.DROP)
+                replayer = TraceReplayer(path, {"Agent1": inbox}, speed=None)
+                replayer.run()
+                report = replayer.report()
+                self.assertLess(report["duration_s"], 0.1)
+                self.assertEqual((report["replayed"], report["rejected"], report["dropped"]), (20, 15, 15))
+                self.assertEqual([str(message) for message in inbox.get_messages()], [f"hello {index}" for index in range(5)])
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def _send_many(self, count):
+        for i in range(count):
+            self.outbox.send_message(f"hello {i}")
+
+    def _start_thread(self, target, *args):
+        thread = Thread(target=target, args=args)
+        thread.start()
+        return thread
+
+class TestAsyncAgent(unittest.TestCase):
+
+    def setUp(self):
+        self.inbox = AsyncInbox()
+        self.outbox = Outbox(self.inbox)
+        self.erc20_handler = MagicMock()
+        self.erc20_handler.execute_transfer = AsyncMock(return_value="0xhash")
+        self.logger = setup_logger()
+        self.agent = AsyncAutonomousAgent("AsyncTestAgent", self.inbox, self.outbox, self.erc20_handler, self.logger)
+
+    def tearDown(self):
+        """Called after every test"""
+        self.logger.info(f"{self._testMethodName}: Test completed")
+
+    def test_async_handlers_run_on_event_loop(self):
+        """Test that coroutine and plain handlers are both dispatched by the async agent"""
+        try:
+            handled = []
+            self.agent.register_message_handler("crypto", lambda msg: self.erc20_handler.execute_transfer(1))
+            self.agent.register_message_handler("hello", handled.append)
+
+            async def scenario():
+                runner = asyncio.create_task(self.agent.run())
+                self.outbox.send_message("crypto moon")
+                self.outbox.send_message("hello sky")
+                await asyncio.sleep(0.05)
+                self.agent.stop()
+                await asyncio.wait_for(runner, 1)
+
+            asyncio.run(scenario())
+
+            self.erc20_handler.execute_transfer.assert_awaited_once_with(1)
+            self.assertEqual(handled, ["hello sky"])
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+class TestSupervisor(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = setup_logger()
+        self.topology = {
+            "count": 4,
+            "key_pairs": [],
+            "handler_sets": {"default": {"hello": "log"}},
+            "links": "pairs",
+            "message_interval": 0.05,
+        }
+
+    def tearDown(self):
+        """Called after every test"""
+        self.logger.info(f"{self._testMethodName}: Test completed")
+
+    def test_topology_and_shard_plan(self):
+        """Test that a topology expands into linked agents and keys stay within one shard"""
+        try:
+            self.topology["key_pairs"] = [{"private_key": "0x01", "address": "0xA"}, {"private_key": "0x02", "address": "0xB"}]
+            self.topology["agents"] = [{"name": "Agent4", "peer": None}]
+            specs = expand_topology(self.topology)
+
+            self.assertEqual([spec["peer"] for spec in specs], ["Agent2", "Agent1", "Agent4", None])
+            self.assertEqual(specs[0]["peer_address"], "0xB")
+            shards = plan_shards(specs, 4)
+            self.assertEqual(len(shards), 2)
+            for shard in shards:
+                self.assertEqual(len({spec["address"] for spec in shard}), 1)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_supervisor_delivers_across_shards(self):
+        """Test that agents in different worker processes exchange messages"""
+        try:
+            # Agent2 reads from a ring buffer inbox, the others from the default one
+            self.topology["agents"] = [{"name": "Agent2", "ring_buffer_inbox": 64}]
+            supervisor = Supervisor(expand_topology(self.topology), workers=2, stats_interval=0.2)
+            self.assertNotEqual(supervisor.routes["Agent1"], supervisor.routes["Agent2"])
+
+            supervisor.start()
+            supervisor.monitor(duration=1)
+            results = supervisor.stop()
+
+            self.assertEqual(results["restarts"], 0)
+            self.assertGreater(results["totals"]["sent"], 0)
+            self.assertGreater(results["agents"]["Agent2"]["processed"], 0)
+            self.assertLessEqual(results["totals"]["processed"], results["totals"]["sent"])
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_declined_handler_kind_leaves_shard_running(self):
+        """Test that a handler kind returning None registers nothing and does not crash the shard"""
+        try:
+            self.topology["handler_sets"] = {"default": {"hello": "log", "crypto": "transfer"}}
+            supervisor = Supervisor(expand_topology(self.topology), workers=2, shard_setup=_keyless_shard_setup, stats_interval=0.2)
+            supervisor.start()
+            supervisor.monitor(duration=1)
+            results = supervisor.stop()
+
+            self.assertEqual((results["restarts"], results["failed_shards"]), (0, []))
+            self.assertGreater(results["totals"]["processed"], 0)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_supervisor_backs_off_and_gives_up_on_failing_shard(self):
+        """Test that a worker crashing on startup is restarted with backoff, then given up"""
+        try:
+            supervisor = Supervisor(expand_topology(self.topology), workers=1, shard_setup=_failing_shard_setup, restart_backoff=0.2, max_fast_failures=3)
+            start = time.monotonic()
+            supervisor.start()
+            supervisor.monitor(duration=10)
+            elapsed = time.monotonic() - start
+            results = supervisor.stop()
+
+            # Two restarts, 0.2 s then 0.4 s apart, and the third failure ends monitoring
+            self.assertEqual((results["restarts"], results["failed_shards"]), (2, [0]))
+            self.assertTrue(0.6 <= elapsed < 5)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+def _failing_shard_setup(specs):
+    """Shard setup that fails on every start, e.g. on an unreachable node."""
+    raise ConnectionError("node unreachable")
+
+def _keyless_shard_setup(specs):
+    """Shard setup whose transfer kind declines every agent, as it does for agents without a key."""
+    return {"handler_kinds": {"transfer": lambda agent, spec, resources: None}}
+
+def _produce(transport, start, count):
+    """Worker process body for the shared memory test."""
+    Outbox(transport).send_messages([f"hello {i}" for i in range(start, start + count)])
+
+class TestTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = setup_logger()
+
+    def tearDown(self):
+        """Called after every test"""
+        self.logger.info(f"{self._testMethodName}: Test completed")
+
     def _start_thread(self, target, *args):
         thread = Thread(target=target, args=args)
         thread.start()
         return thread
 
+    def test_shared_memory_ring_across_processes(self):
+        """Test that messages from several processes arrive through a small, wrapping ring buffer"""
+        try:
+            transport = SharedMemoryTransport(capacity=256, context=multiprocessing.get_context("fork"))
+            producers = [multiprocessing.get_context("fork").Process(target=_produce, args=(transport, start, 200)) for start in (0, 200)]
+            for producer in producers:
+                producer.start()
+            received = []
+            while len(received) < 400:
+                received.extend(transport.receive(timeout=1, max_batch=16))
+            for producer in producers:
+                producer.join()
+
+            self.assertEqual(sorted(received), sorted(f"hello {i}" for i in range(400)))
+            self.assertEqual(transport.depth, 0)
+            self.assertEqual(transport.get_messages(), [])
+            transport.close()
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_transport_requires_the_full_api(self):
+        """Test that a transport missing part of the send/receive API cannot be created"""
+        try:
+            class SendOnly(Transport):
+                def send_batch(self, messages):
+                    pass
+
+            with self.assertRaises(TypeError):
+                SendOnly()
+            self.assertEqual(InProcessTransport().depth, 0)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_stopping_agent_closes_wrapped_inboxes_and_transports(self):
+        """Test that stopping an agent releases senders blocked on a transport or a recording inbox"""
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                recorder = TraceRecorder(os.path.join(directory, "trace.bin"))
+                for inbox in (InProcessTransport(Inbox(max_depth=1)), recorder.wrap("Receiver", Inbox(max_depth=1)), SharedMemoryTransport(capacity=64)):
+                    agent = AutonomousAgent("Receiver", inbox, None, None, self.logger)
+                    # More than any of them holds, so the sender ends up blocked
+                    results = []
+                    sender = self._start_thread(lambda: results.extend(Outbox(inbox).send_message(f"hello {i}") for i in range(10)))
+                    time.sleep(0.1)
+                    self.assertTrue(sender.is_alive())
+
+                    agent.stop()
+                    sender.join(1)
+                    self.assertFalse(sender.is_alive())
+                    self.assertEqual((results[0], results[-1]), (True, False))
+                    self.assertFalse(Outbox(inbox).send_message("hello sky"))
+                recorder.close()
+
+            # Closing while the agent is receiving detaches once the receive has returned
+            transport = SharedMemoryTransport(capacity=64)
+            agent = AutonomousAgent("Receiver", transport, None, None, self.logger)
+            agent.start()
+            time.sleep(0.1)
+            agent.stop()
+            agent.join(2)
+            self.assertFalse(agent.is_alive())
+            self.assertTrue(transport.detached)
+            self.assertEqual(transport.receive(timeout=0), [])
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_socket_transport_frames_batches(self):
+        """Test msgpack framing over a Unix socket and an agent reading from the transport"""
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                receiver = SocketTransport(os.path.join(directory, "agent.sock"), listen=True)
+                sender = SocketTransport(receiver.address)
+                Outbox(sender).send_messages(["hello sky", {"type": "crypto", "amount": 1}, "x" * 100000])
+
+                received = []
+                while len(received) < 3:
+                    received.extend(receiver.receive(timeout=1))
+                self.assertEqual(received, ["hello sky", {"type": "crypto", "amount": 1}, "x" * 100000])
+                with self.assertRaises(RuntimeError):
+                    receiver.send("hello sun")
+                self.assertEqual(len(receiver.pending), 0)
+
+                handled = []
+                agent = AutonomousAgent("Agent1", receiver, Outbox(InProcessTransport()), MagicMock(), self.logger)
+                agent.register_message_handler("moon", handled.append)
+                sender.send("moon light")
+                while not handled:
+                    agent.process_messages(timeout=1)
+                self.assertEqual(handled, ["moon light"])
+
+                sender.close()
+                receiver.close()
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
 if __name__ == "__main__":
     unittest.main()
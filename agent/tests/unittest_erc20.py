@@ -0,0 +1,664 @@
+import os
+import tempfile
+import time
+import unittest
+from collections import Counter
+from concurrent.futures import Future
+from types import SimpleNamespace
+from threading import Thread
+from unittest.mock import MagicMock
+from eth_abi import encode
+from web3 import Web3
+from web3.providers import BaseProvider
+from src.erc20.balance_reader import BalanceReader, DECIMALS_SELECTOR
+from src.erc20.erc20_handler import ERC20Handler
+from src.erc20.gas_oracle import GasEstimateCache, GasPriceOracle
+from src.erc20.ledger import TokenLedger, TRANSFER_TOPIC, ZERO_ADDRESS
+from src.erc20.nonce_manager import NonceManager
+from src.erc20.rpc_batch import BatchRequestError
+from src.erc20.settlement import SettlementEngine
+from src.erc20.signer import ProcessPoolSigner
+from src.erc20.tx_journal import TxJournal
+from src.erc20.tx_pipeline import TransactionPipeline
+from src.utils.logging_utils import setup_logger
+
+ADDRESS = "0x2c7536E3605D9C16a7a3D7b1898e529396a65c23"
+TOKEN = "0x2222222222222222222222222222222222222222"
+TARGET = "0x1111111111111111111111111111111111111111"
+PRIVATE_KEY = "0x4c0883a69102937d6231471b5dbb6204fe5129617082792ae468d01a3f362318"
+CHAIN_ID = 123456
+
+class CountingProvider(BaseProvider):
+    """Minimal in-memory provider that answers the calls a transfer makes and counts them."""
+    def __init__(self):
+        super().__init__()
+        self.calls = Counter()
+
+    def make_request(self, method, params):
+        self.calls[method] += 1
+        results = {
+            "eth_chainId": hex(CHAIN_ID),
+            "eth_gasPrice": hex(10 ** 9),
+            "eth_blockNumber": hex(1),
+            "eth_estimateGas": hex(35000),
+            "eth_getTransactionCount": hex(0),
+        }
+        if method == "eth_sendRawTransaction":
+            return {"jsonrpc": "2.0", "id": 1, "result": Web3.to_hex(Web3.keccak(hexstr=params[0]))}
+        return {"jsonrpc": "2.0", "id": 1, "result": results[method]}
+
+    def make_batch_request(self, calls):
+        self.calls["batch"] += 1
+        responses = []
+        for request_id, (method, params) in enumerate(calls):
+            self.calls[method] += 1
+            receipt = {"transactionHash": params[0], "status": "0x1", "blockNumber": "0x2", "gasUsed": hex(35000)}
+            responses.append({"jsonrpc": "2.0", "id": request_id, "result": receipt})
+        return responses
+
+    def is_connected(self):
+        return True
+
+# -------------------------------------------
+# ERC20 UnitTest Test Cases
+# -------------------------------------------
+
+class TestNonceManager(unittest.TestCase):
+
+    def setUp(self):
+        self.web3_instance = MagicMock()
+        self.web3_instance.eth.get_transaction_count.return_value = 7
+        self.nonce_manager = NonceManager(ADDRESS, self.web3_instance)
+        self.logger = setup_logger()
+
+    def tearDown(self):
+        """Called after every test"""
+        self.logger.info(f"{self._testMethodName}: Test completed")
+
+    def test_nonces_allocated_locally(self):
+        """Test that the node is queried once and nonces are handed out from memory"""
+        try:
+            nonces = [self.nonce_manager.get_nonce() for _ in range(5)]
+
+            self.assertEqual(nonces, [7, 8, 9, 10, 11])
+            self.web3_instance.eth.get_transaction_count.assert_called_once_with(ADDRESS, 'pending')
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_concurrent_allocation_is_unique(self):
+        """Test that concurrent callers never receive the same nonce"""
+        try:
+            nonces = []
+
+            def allocate():
+                for _ in range(100):
+                    nonces.append(self.nonce_manager.get_nonce())
+
+            threads = [Thread(target=allocate) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(len(set(nonces)), 800)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_release_and_resync(self):
+        """Test that unused nonces are reused and rejected nonces trigger a resync"""
+        try:
+            nonce = self.nonce_manager.get_nonce()
+            self.nonce_manager.release(nonce)
+            self.assertEqual(self.nonce_manager.get_nonce(), nonce)
+
+            self.web3_instance.eth.get_transaction_count.return_value = 3
+            self.nonce_manager.resync()
+            self.assertEqual(self.nonce_manager.get_nonce(), 3)
+            self.assertEqual(self.nonce_manager.resync_count, 2)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+class TestBalanceReader(unittest.TestCase):
+
+    def setUp(self):
+        self.web3_instance = MagicMock()
+        self.web3_instance.provider.make_batch_request.side_effect = self._answer_batch
+        self.holders = [f"0x{i:040x}" for i in range(1, 51)]
+        self.reader = BalanceReader(self.web3_instance, max_age=60)
+        self.logger = setup_logger()
+
+    def tearDown(self):
+        """Called after every test"""
+        self.logger.info(f"{self._testMethodName}: Test completed")
+
+    @staticmethod
+    def _answer_batch(calls):
+        responses = []
+        for request_id, (_, params) in enumerate(calls):
+            data = params[0]["data"]
+            value = 18 if data == "0x" + DECIMALS_SELECTOR else int(data[-40:], 16) * 10
+            responses.append({"jsonrpc": "2.0", "id": request_id, "result": hex(value)})
+        return responses
+
+    def test_balances_fetched_in_one_batch(self):
+        """Test that every watched balance is read with a single batch request"""
+        try:
+            for holder in self.holders:
+                self.reader.watch(TOKEN, holder)
+
+            balances = [self.reader.balance_of(TOKEN, holder) for holder in self.holders]
+
+            self.assertEqual(balances, [int(holder, 16) * 10 for holder in self.holders])
+            self.assertEqual(self.reader.decimals(TOKEN), 18)
+            self.web3_instance.provider.make_batch_request.assert_called_once()
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_multicall_mode(self):
+        """Test that multicall mode decodes every result from one eth_call"""
+        try:
+            reader = BalanceReader(self.web3_instance, use_multicall=True)
+            returned = [(True, (5).to_bytes(32, "big")), (True, (18).to_bytes(32, "big"))]
+            self.web3_instance.eth.call.return_value = encode(["(bool,bytes)[]"], [returned])
+
+            values = reader.read([("balanceOf", TOKEN, ADDRESS), ("decimals", TOKEN, None)])
+
+            self.assertEqual(values, [5, 18])
+            self.web3_instance.eth.call.assert_called_once()
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_failed_query_keeps_last_known_value(self):
+        """Test that a failed query keeps its last balance and does not fail the refresh for other holders"""
+        try:
+            for holder in self.holders[:3]:
+                self.reader.watch(TOKEN, holder)
+            self.reader.refresh()
+            failing = {self.holders[0][2:], self.holders[3][2:]}
+
+            def answer_batch(calls):
+                responses = self._answer_batch(calls)
+                for response, (_, params) in zip(responses, calls):
+                    if params[0]["data"][-40:] in failing:
+                        response.pop("result")
+                        response["error"] = {"code": -32000, "message": "execution reverted"}
+                return responses
+
+            self.web3_instance.provider.make_batch_request.side_effect = answer_batch
+            self.reader.watch(TOKEN, self.holders[3])
+            self.reader.refresh()
+
+            self.assertEqual(self.reader.balance_of(TOKEN, self.holders[0]), int(self.holders[0], 16) * 10)
+            self.assertEqual(self.reader.balance_of(TOKEN, self.holders[1]), int(self.holders[1], 16) * 10)
+            self.assertIn((TOKEN, Web3.to_checksum_address(self.holders[0])), self.reader.errors)
+            with self.assertRaises(BatchRequestError):
+                self.reader.balance_of(TOKEN, self.holders[3])
+
+            failing.clear()
+            self.reader.refresh()
+            self.assertEqual(self.reader.balance_of(TOKEN, self.holders[3]), int(self.holders[3], 16) * 10)
+            self.assertEqual(self.reader.errors, {})
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+class TestTransferGas(unittest.TestCase):
+
+    def setUp(self):
+        self.provider = CountingProvider()
+        self.web3_instance = Web3(self.provider)
+        self.logger = setup_logger()
+
+    def tearDown(self):
+        """Called after every test"""
+        self.logger.info(f"{self._testMethodName}: Test completed")
+
+    def _create_handler(self, **kwargs):
+        nonce_manager = NonceManager(ADDRESS, self.web3_instance)
+        return ERC20Handler(TOKEN, PRIVATE_KEY, ADDRESS, TARGET, nonce_manager, self.web3_instance, CHAIN_ID, **kwargs)
+
+    def test_cached_gas_skips_per_transfer_rpcs(self):
+        """Test that the gas oracle and estimate cache remove per-transfer gas RPCs"""
+        try:
+            handler = self._create_handler(gas_oracle=GasPriceOracle(self.web3_instance), gas_cache=GasEstimateCache())
+            for amount in range(1, 11):
+                handler.execute_transfer(amount)
+
+            self.assertEqual(self.provider.calls["eth_sendRawTransaction"], 10)
+            self.assertEqual(self.provider.calls["eth_gasPrice"], 1)
+            # One estimate while the recipient may be new, one once it is known to hold tokens
+            self.assertEqual(self.provider.calls["eth_estimateGas"], 2)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_pipeline_resolves_receipts(self):
+        """Test that pipelined transfers resolve to receipts polled in batches"""
+        try:
+            handler = self._create_handler(gas_oracle=GasPriceOracle(self.web3_instance), gas_cache=GasEstimateCache())
+            pipeline = TransactionPipeline(self.web3_instance, poll_interval=0.05)
+            pipeline.start()
+
+            futures = [pipeline.submit_transfer(handler, amount) for amount in range(1, 51)]
+            receipts = [future.result(timeout=5) for future in futures]
+            pipeline.stop()
+
+            self.assertTrue(all(receipt.status == 1 for receipt in receipts))
+            self.assertEqual(len({receipt.transactionHash for receipt in receipts}), 50)
+            self.assertEqual(self.provider.calls["eth_sendRawTransaction"], 50)
+            self.assertLess(self.provider.calls["batch"], 50)
+            self.assertEqual(pipeline.in_flight, 0)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_failed_signature_fails_intents_built_behind_it(self):
+        """Test that intents built behind a released nonce are not broadcast into the gap"""
+        try:
+            handler = self._create_handler(gas_oracle=GasPriceOracle(self.web3_instance), gas_cache=GasEstimateCache())
+            blocked = Future()
+            sign = handler.sign_transaction_async
+            handler.sign_transaction_async = lambda tx: blocked if tx["nonce"] == 2 else sign(tx)
+            pipeline = TransactionPipeline(self.web3_instance, poll_interval=0.05)
+            pipeline.start()
+
+            futures = [pipeline.submit_transfer(handler, amount) for amount in range(1, 6)]
+            while handler.nonce_manager.next_nonce != 5:
+                time.sleep(0.01)
+            blocked.set_exception(RuntimeError("signer crashed"))
+            for future in futures[2:]:
+                with self.assertRaises(RuntimeError):
+                    future.result(timeout=5)
+            self.assertTrue(all(future.result(timeout=5).status == 1 for future in futures[:2]))
+            self.assertEqual(self.provider.calls["eth_sendRawTransaction"], 2)
+
+            # The allocator resyncs and later transfers are sent again
+            self.assertEqual(pipeline.submit_transfer(handler, 6).result(timeout=5).status, 1)
+            pipeline.stop()
+            self.assertEqual(self.provider.calls["eth_sendRawTransaction"], 3)
+            self.assertEqual(pipeline.gaps, {})
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_fast_build_matches_web3_encoding(self):
+        """Test that the direct transfer builder signs to the same bytes as web3's build_transaction"""
+        try:
+            handler = self._create_handler(gas_oracle=GasPriceOracle(self.web3_instance), gas_cache=GasEstimateCache())
+            tx = handler.build_transfer(10 ** 18, 7)
+            expected = handler.contract.functions.transfer(TARGET, 10 ** 18).build_transaction(
+                {"from": ADDRESS, "nonce": 7, "gasPrice": tx["gasPrice"], "gas": tx["gas"], "chainId": CHAIN_ID}
+            )
+            self.assertEqual(handler.account.sign_transaction(tx).raw_transaction, handler.account.sign_transaction(expected).raw_transaction)
+
+            handler.priority_fee = 2 * 10 ** 9
+            tx = handler.build_transfer(10 ** 18, 7)
+            self.assertEqual((tx["type"], tx["maxPriorityFeePerGas"], tx["maxFeePerGas"]), (2, 2 * 10 ** 9, 3 * 10 ** 9))
+            self.assertNotIn("gasPrice", tx)
+            self.assertEqual(handler.account.sign_transaction(tx).raw_transaction[0], 2)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_process_pool_signer_matches_local_signing(self):
+        """Test that the process pool signer produces the same signed transaction"""
+        try:
+            signer = ProcessPoolSigner([PRIVATE_KEY], max_workers=2)
+            handler = self._create_handler(gas_oracle=GasPriceOracle(self.web3_instance), gas_cache=GasEstimateCache(), signer=signer)
+            try:
+                tx = handler.build_transfer(5, 0)
+                signed = handler.sign_transaction_async(tx).result(timeout=30)
+            finally:
+                signer.shutdown()
+
+            expected = handler.account.sign_transaction(tx)
+            self.assertEqual(signed.raw_transaction, bytes(expected.raw_transaction))
+            self.assertEqual(signed.hash, bytes(expected.hash))
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_estimate_cache_margin_and_invalidation(self):
+        """Test that cached estimates carry the safety margin and can be invalidated"""
+        try:
+            cache = GasEstimateCache(margin=1.5)
+            estimate = MagicMock(return_value=40000)
+
+            self.assertEqual(cache.get("key", estimate), 60000)
+            self.assertEqual(cache.get("key", estimate), 60000)
+            cache.invalidate("key")
+            cache.get("key", estimate)
+
+            self.assertEqual(estimate.call_count, 2)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+class FakeChain:
+    """Blocks of Transfer logs that can be reorganized, exposed through a mocked web3 `eth`."""
+    def __init__(self):
+        self.blocks = {}
+        self.web3_instance = MagicMock()
+        self.web3_instance.eth.get_logs.side_effect = self.get_logs
+        self.web3_instance.eth.get_block.side_effect = lambda number: {"hash": self.blocks[number][0]}
+
+    def mine(self, number, transfers, fork=0):
+        block_hash = bytes([fork]) + number.to_bytes(31, "big")
+        self.blocks[number] = (block_hash, transfers)
+        self.web3_instance.eth.block_number = max(self.blocks)
+
+    def get_logs(self, filter_params):
+        logs = []
+        for number in range(filter_params["fromBlock"], filter_params["toBlock"] + 1):
+            block_hash, transfers = self.blocks[number]
+            for sender, recipient, value in transfers:
+                logs.append({
+                    "blockNumber": number,
+                    "blockHash": block_hash,
+                    "topics": [bytes.fromhex(TRANSFER_TOPIC[2:]), bytes.fromhex(sender[2:].rjust(64, "0")), bytes.fromhex(recipient[2:].rjust(64, "0"))],
+                    "data": value.to_bytes(32, "big"),
+                })
+        return logs
+
+class TestTokenLedger(unittest.TestCase):
+
+    def setUp(self):
+        self.chain = FakeChain()
+        self.chain.mine(0, [(ZERO_ADDRESS, ADDRESS, 1000)])
+        for number in range(1, 6):
+            self.chain.mine(number, [(ADDRESS, TARGET, 10)])
+        self.logger = setup_logger()
+
+    def tearDown(self):
+        """Called after every test"""
+        self.logger.info(f"{self._testMethodName}: Test completed")
+
+    def test_balances_follow_transfer_logs_and_reorgs(self):
+        """Test that balances are indexed from logs and unconfirmed blocks are rolled back on a reorg"""
+        try:
+            ledger = TokenLedger(self.chain.web3_instance, TOKEN, confirmations=3, batch_size=2)
+            ledger.sync()
+            self.assertEqual(ledger.balance_of(ADDRESS), 950)
+            self.assertEqual(ledger.balance_of(TARGET), 50)
+
+            # Blocks 4 and 5 are replaced by a fork with different transfers
+            self.chain.mine(4, [(ADDRESS, TARGET, 100)], fork=1)
+            self.chain.mine(5, [], fork=1)
+            ledger.sync()
+            self.assertEqual(ledger.balance_of(ADDRESS), 870)
+            self.assertEqual(ledger.balance_of(TARGET), 130)
+            self.assertEqual(ledger.balance_of(TARGET, confirmed=True), 20)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_snapshot_restores_confirmed_state(self):
+        """Test that a restart resumes from the snapshot instead of rescanning from genesis"""
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                snapshot_path = os.path.join(directory, "ledger.json")
+                ledger = TokenLedger(self.chain.web3_instance, TOKEN, confirmations=2, snapshot_path=snapshot_path)
+                ledger.sync()
+                ledger.stop()
+
+                self.chain.web3_instance.eth.get_logs.reset_mock()
+                restored = TokenLedger(self.chain.web3_instance, TOKEN, confirmations=2, snapshot_path=snapshot_path)
+                self.assertEqual(restored.last_block, 3)
+                restored.sync()
+
+            self.assertEqual(restored.balance_of(ADDRESS), 950)
+            self.assertEqual(self.chain.web3_instance.eth.get_logs.call_args[0][0]["fromBlock"], 4)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+class RecordingPipeline:
+    """Pipeline stand-in that records net transfers and resolves them on demand."""
+    def __init__(self):
+        self.transfers = []
+
+    def submit_transfer(self, erc20_handler, amount):
+        future = Future()
+        self.transfers.append((erc20_handler, amount, future))
+        return future
+
+class TestSettlement(unittest.TestCase):
+
+    def setUp(self):
+        self.pipeline = RecordingPipeline()
+        self.settlement = SettlementEngine(self.pipeline, window=60)
+        self.forward = SimpleNamespace(contract_address=TOKEN, source_address=ADDRESS, target_address=TARGET)
+        self.backward = SimpleNamespace(contract_address=TOKEN, source_address=TARGET, target_address=ADDRESS)
+        self.logger = setup_logger()
+
+    def tearDown(self):
+        """Called after every test"""
+        self.logger.info(f"{self._testMethodName}: Test completed")
+
+    def test_opposing_intents_settle_as_one_net_transfer(self):
+        """Test that opposing intents are netted into one transfer and every intent resolves"""
+        try:
+            futures = [self.settlement.submit_transfer(self.forward, 1) for _ in range(7)]
+            futures += [self.settlement.submit_transfer(self.backward, 1) for _ in range(4)]
+            self.settlement.flush()
+
+            self.assertEqual(len(self.pipeline.transfers), 1)
+            handler, amount, transfer = self.pipeline.transfers[0]
+            self.assertEqual((handler, amount), (self.forward, 3))
+            self.assertFalse(any(future.done() for future in futures))
+
+            transfer.set_result({"status": 1})
+            self.assertTrue(all(future.result(timeout=1) == {"status": 1} for future in futures))
+            self.assertEqual((self.settlement.intent_count, self.settlement.transfer_count), (11, 1))
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_cancelled_flows_send_nothing_and_failures_propagate(self):
+        """Test that flows that cancel out send nothing and a failed net transfer fails its intents"""
+        try:
+            cancelled = [self.settlement.submit_transfer(handler, 5) for handler in (self.forward, self.backward)]
+            self.settlement.flush()
+            self.assertEqual(self.pipeline.transfers, [])
+            self.assertEqual([future.result(timeout=1) for future in cancelled], [None, None])
+
+            failing = [self.settlement.submit_transfer(self.backward, 2) for _ in range(3)]
+            self.settlement.flush()
+            handler, amount, transfer = self.pipeline.transfers[0]
+            self.assertEqual((handler, amount), (self.backward, 6))
+            transfer.set_exception(ValueError("reverted"))
+            for future in failing:
+                self.assertIsInstance(future.exception(timeout=1), ValueError)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+class RestartProvider(CountingProvider):
+    """Provider whose receipt batch only knows the `mined` hashes and which rejects `rejected` raw transactions."""
+    def __init__(self, mined=(), rejected=()):
+        super().__init__()
+        self.mined = set(mined)
+        self.rejected = set(rejected)
+        self.broadcast = []
+
+    def make_request(self, method, params):
+        if method == "eth_sendRawTransaction":
+            self.broadcast.append(params[0])
+            if params[0] in self.rejected:
+                self.calls[method] += 1
+                return {"jsonrpc": "2.0", "id": 1, "error": {"code": -32000, "message": "nonce too low"}}
+        return super().make_request(method, params)
+
+    def make_batch_request(self, calls):
+        responses = super().make_batch_request(calls)
+        for response, (_, params) in zip(responses, calls):
+            if params[0] not in self.mined:
+                response["result"] = None
+        return responses
+
+class TestTxJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "transactions.journal")
+        self.logger = setup_logger()
+
+    def tearDown(self):
+        """Called after every test"""
+        self.directory.cleanup()
+        self.logger.info(f"{self._testMethodName}: Test completed")
+
+    def _signed(self, journal, nonce):
+        raw = bytes([nonce]) * 100
+        tx_hash = Web3.keccak(raw)
+        journal.record_signed(ADDRESS, nonce, tx_hash, raw)
+        return Web3.to_hex(tx_hash), Web3.to_hex(raw)
+
+    def test_replay_survives_torn_write_and_compaction(self):
+        """Test that a reopened journal drops a torn record, keeps pending state and compacts"""
+        try:
+            journal = TxJournal(self.path)
+            hashes = [self._signed(journal, nonce)[0] for nonce in range(5)]
+            journal.record_sent(hashes[3])
+            for tx_hash in hashes[:3]:
+                journal.record_mined(tx_hash)
+            journal.stop()
+            size = os.path.getsize(self.path)
+            with open(self.path, "ab") as file:
+                file.write(b"\x00\x00\x01\x00torn")
+
+            for use_mmap in (False, True):
+                journal = TxJournal(self.path, use_mmap=use_mmap)
+                self.assertEqual(os.path.getsize(self.path), size)
+                self.assertEqual([(entry.nonce, entry.state) for entry in journal.pending_transactions()], [(3, TxJournal.SENT), (4, TxJournal.SIGNED)])
+                journal.stop()
+
+            journal = TxJournal(self.path)
+            journal.compact()
+            journal.record_mined(hashes[3])
+            journal.record_mined(hashes[4])
+            journal.compact()
+            journal.stop()
+            self.assertLess(os.path.getsize(self.path), size)
+            journal = TxJournal(self.path)
+            self.assertEqual((journal.pending, journal.next_nonces), ({}, {bytes.fromhex(ADDRESS[2:]): 5}))
+            journal.stop()
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_released_nonce_is_reused_after_restart(self):
+        """Test that a transaction the node never accepted hands its nonce back, also across compaction"""
+        try:
+            journal = TxJournal(self.path)
+            transactions = [self._signed(journal, nonce) for nonce in range(3)]
+            journal.record_mined(transactions[0][0])
+            journal.record_released(transactions[1][0])
+            journal.stop()
+
+            address = bytes.fromhex(ADDRESS[2:])
+            journal = TxJournal(self.path)
+            self.assertEqual(journal.next_nonces, {address: 1})
+            self.assertEqual([entry.nonce for entry in journal.pending_transactions()], [2])
+            journal.compact()
+            journal.stop()
+            journal = TxJournal(self.path)
+            self.assertEqual(journal.next_nonces, {address: 1})
+
+            nonce_manager = NonceManager(ADDRESS, Web3(RestartProvider()))
+            journal.recover(nonce_manager.web3_instance, {ADDRESS: nonce_manager})
+            self.assertEqual(nonce_manager.get_nonce(), 1)
+            journal.stop()
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_write_error_fails_every_later_sync(self):
+        """Test that a failed journal write is raised to the writer and every later sync, and loses no durable record"""
+        try:
+            journal = TxJournal(self.path)
+            durable = self._signed(journal, 0)[0]
+            file = journal.file
+
+            class FailingFile:
+                def write(self, data):
+                    raise OSError(5, "Input/output error")
+
+                def __getattr__(self, name):
+                    return getattr(file, name)
+
+            journal.file = FailingFile()
+            with self.assertRaises(OSError):
+                self._signed(journal, 1)
+            journal.file = file
+            with self.assertRaises(OSError):
+                self._signed(journal, 2)
+            with self.assertRaises(OSError):
+                journal.sync()
+            journal.stop()
+            self.assertTrue(file.closed)
+
+            journal = TxJournal(self.path)
+            self.assertEqual([Web3.to_hex(entry.tx_hash) for entry in journal.pending_transactions()], [durable])
+            journal.stop()
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_recover_restores_nonces_and_resolves_pending(self):
+        """Test that recovery seeds the nonce allocator and closes, rebroadcasts or drops pending transactions"""
+        try:
+            journal = TxJournal(self.path)
+            transactions = [self._signed(journal, nonce) for nonce in range(3)]
+            journal.stop()
+
+            provider = RestartProvider(mined=[transactions[0][0]], rejected=[transactions[2][1]])
+            web3_instance = Web3(provider)
+            nonce_manager = NonceManager(ADDRESS, web3_instance)
+            journal = TxJournal(self.path)
+            pending = journal.recover(web3_instance, {ADDRESS: nonce_manager})
+
+            self.assertEqual([Web3.to_hex(entry.tx_hash) for entry in pending], [transactions[1][0]])
+            self.assertEqual(provider.broadcast, [transactions[1][1], transactions[2][1]])
+            self.assertEqual(provider.calls["batch"], 1)
+            self.assertEqual(nonce_manager.next_nonce, None)  # Rejected nonce forces a resync
+
+            journal.record_mined(transactions[1][0])
+            journal.stop()
+            journal = TxJournal(self.path)
+            restored = NonceManager(ADDRESS, web3_instance)
+            self.assertEqual(journal.recover(web3_instance, {ADDRESS: restored}), [])
+            self.assertEqual(restored.get_nonce(), 3)
+            self.assertEqual(provider.calls["eth_getTransactionCount"], 0)
+            journal.stop()
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+if __name__ == "__main__":
+    unittest.main()
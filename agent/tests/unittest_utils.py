@@ -0,0 +1,271 @@
+import json
+import logging
+import os
+import queue
+import tempfile
+import time
+import unittest
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from src.utils.logging_utils import CategoryFilter, DroppingQueueHandler, JsonFormatter, setup_logger
+from src.utils.metrics import Histogram, MetricsRegistry, rpc_timing_middleware
+from src.utils.rate_limit import AdaptiveRateLimiter, TokenBucket
+from src.utils.rpc_provider import PooledHTTPProvider
+from web3 import Web3
+
+class StubRPCServer:
+    """Local JSON-RPC endpoint that answers eth_blockNumber after a fixed delay."""
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                time.sleep(stub.delay)
+                calls = payload if isinstance(payload, list) else [payload]
+                stub.requests.extend(call["method"] for call in calls)
+                responses = [{"jsonrpc": "2.0", "id": call["id"], "result": "0x10"} for call in calls]
+                body = json.dumps(responses if isinstance(payload, list) else responses[0]).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.uri = f"http://127.0.0.1:{self.server.server_address[1]}"
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+# -------------------------------------------
+# Utils UnitTest Test Cases
+# -------------------------------------------
+
+class TestPooledHTTPProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.fast = StubRPCServer()
+        self.slow = StubRPCServer(delay=0.05)
+        self.logger = setup_logger()
+
+    def tearDown(self):
+        """Called after every test"""
+        self.fast.close()
+        self.slow.close()
+        self.logger.info(f"{self._testMethodName}: Test completed")
+
+    def test_reads_prefer_fastest_and_writes_stay_pinned(self):
+        """Test latency-aware read routing and pinned writes"""
+        try:
+            provider = PooledHTTPProvider([self.slow.uri, self.fast.uri])
+            for _ in range(20):
+                provider.make_request("eth_blockNumber", [])
+            for _ in range(5):
+                provider.make_request("eth_getTransactionCount", [])
+
+            self.assertGreater(self.fast.requests.count("eth_blockNumber"), 15)
+            self.assertEqual(self.slow.requests.count("eth_getTransactionCount"), 5)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_failover_ejects_dead_endpoint(self):
+        """Test that a dead endpoint is ejected and writes move to a healthy one"""
+        try:
+            dead = StubRPCServer()
+            dead.close()
+            provider = PooledHTTPProvider([dead.uri, self.fast.uri], max_failures=1)
+
+            response = provider.make_request("eth_sendRawTransaction", ["0x00"])
+            batch = provider.make_batch_request([("eth_blockNumber", []), ("eth_chainId", [])])
+
+            self.assertEqual(response["result"], "0x10")
+            self.assertEqual([item["id"] for item in batch], [0, 1])
+            self.assertEqual(provider.endpoint_uri, self.fast.uri)
+            self.assertFalse(provider.endpoints[0].healthy)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.rpc = StubRPCServer()
+        self.metrics = MetricsRegistry()
+        self.logger = setup_logger()
+
+    def tearDown(self):
+        """Called after every test"""
+        self.metrics.stop()
+        self.rpc.close()
+        self.logger.info(f"{self._testMethodName}: Test completed")
+
+    def test_histogram_percentiles_within_bucket_precision(self):
+        """Test that log-linear buckets keep percentiles within the relative precision"""
+        try:
+            histogram = Histogram()
+            for micros in range(1, 100001):
+                histogram.observe(micros / 1e6)
+
+            for fraction in (0.5, 0.9, 0.99):
+                self.assertAlmostEqual(histogram.percentile(fraction), fraction * 0.1, delta=fraction * 0.1 * 0.07)
+            self.assertEqual(histogram.count, 100000)
+            self.assertLess(len(histogram.buckets), 300)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_rpc_timings_exported_and_snapshotted(self):
+        """Test per-method RPC timings on the Prometheus endpoint and in the snapshot file"""
+        try:
+            web3_instance = Web3(PooledHTTPProvider([self.rpc.uri]))
+            web3_instance.middleware_onion.add(rpc_timing_middleware(self.metrics), "rpc_timing")
+            self.metrics.gauge("inbox_depth", lambda: 3, agent="Agent1")
+            web3_instance.eth.block_number
+            web3_instance.eth.block_number
+
+            port = self.metrics.serve(0)
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+                body = response.read().decode()
+            self.assertIn('agent_rpc_request_seconds_count{method="eth_blockNumber"} 2', body)
+            self.assertIn('agent_inbox_depth{agent="Agent1"} 3', body)
+
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "metrics.json")
+                self.metrics.write_snapshot(path)
+                with open(path) as file:
+                    snapshot = json.load(file)
+            self.assertEqual(snapshot["histograms"][0]["labels"], {"method": "eth_blockNumber"})
+            self.assertEqual(snapshot["histograms"][0]["count"], 2)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+class TestLogging(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = setup_logger()
+
+    def tearDown(self):
+        """Called after every test"""
+        self.logger.info(f"{self._testMethodName}: Test completed")
+
+    def test_setup_logger_is_idempotent(self):
+        """Test that repeated setup returns the same logger with a single queue handler"""
+        try:
+            first = setup_logger("idempotent")
+            second = setup_logger("idempotent")
+
+            self.assertIs(first, second)
+            self.assertEqual(len(second.handlers), 1)
+            self.assertIsInstance(second.handlers[0], DroppingQueueHandler)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_category_rate_limit_and_sampling(self):
+        """Test per-category rate limiting, sampling and the suppressed count"""
+        try:
+            category_filter = CategoryFilter(rate_limits={"message.sent": 5}, sample_rates={"message.handled": 0.1})
+            passed = lambda category: sum(category_filter.filter(self._record(category)) for _ in range(100))
+
+            self.assertEqual(passed("message.sent"), 5)
+            self.assertEqual(passed("message.handled"), 10)
+            self.assertEqual(passed(None), 100)
+
+            time.sleep(0.3)
+            record = self._record("message.sent")
+            self.assertTrue(category_filter.filter(record))
+            self.assertIn("[95 similar suppressed]", record.getMessage())
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_full_queue_drops_and_json_format(self):
+        """Test that a full log queue drops records instead of blocking, and JSON output"""
+        try:
+            log_queue = queue.Queue(1)
+            handler = DroppingQueueHandler(log_queue)
+            for _ in range(3):
+                handler.handle(self._record("message.sent"))
+
+            self.assertEqual(handler.dropped, 2)
+            entry = json.loads(JsonFormatter().format(log_queue.get()))
+            self.assertEqual((entry["message"], entry["category"]), ("hello sky", "message.sent"))
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    @staticmethod
+    def _record(category):
+        record = logging.LogRecord("agent", logging.INFO, __file__, 0, "hello sky", None, None)
+        if category is not None:
+            record.category = category
+        return record
+
+class TestRateLimit(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = setup_logger()
+
+    def tearDown(self):
+        """Called after every test"""
+        self.logger.info(f"{self._testMethodName}: Test completed")
+
+    def test_token_bucket_allows_burst_then_paces(self):
+        """Test that a token bucket allows its burst at once and then paces to its rate"""
+        try:
+            bucket = TokenBucket(rate=50, burst=5)
+            self.assertTrue(all(bucket.try_acquire() for _ in range(5)))
+            self.assertFalse(bucket.try_acquire())
+            self.assertFalse(bucket.acquire(timeout=0.001))
+
+            start = time.monotonic()
+            for _ in range(10):
+                bucket.acquire()
+            self.assertAlmostEqual(time.monotonic() - start, 0.2, delta=0.1)
+            with self.assertRaises(ValueError):
+                bucket.acquire(6)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_adaptive_limiter_backs_off_and_recovers(self):
+        """Test that errors and slow calls cut the rate once per cooldown and successes raise it again"""
+        try:
+            limiter = AdaptiveRateLimiter(max_rate=100, min_rate=10, target_latency=0.5, increase=1000, cooldown=0.05)
+            limiter.record(0.1, error=True)
+            limiter.record(0.1, error=True)
+            self.assertEqual(limiter.rate, 50)
+            time.sleep(0.05)
+            limiter.record(2.0)
+            self.assertEqual(limiter.rate, 25)
+            self.assertEqual((limiter.errors, limiter.slow), (2, 1))
+
+            time.sleep(0.1)
+            limiter.record(0.1)
+            self.assertEqual(limiter.rate, 100)
+            self.logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            self.logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+if __name__ == "__main__":
+    unittest.main()
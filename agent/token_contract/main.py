@@ -1,4 +1,5 @@
 import os
+import json
 import logging
 from src.manager import DeploymentManager
 
@@ -20,8 +21,18 @@ def main():
         # Define the contract path
         contract_path = os.path.join("contracts", "AgentToken.sol")
 
-        # Instantiate DeploymentManager to handle contract deployment
-        deployment_manager = DeploymentManager(contract_path, rpc_url, deployer_private_key)
+        # Instantiate DeploymentManager to handle contract deployment; SOLC_VERSION pins the compiler
+        deployment_manager = DeploymentManager(contract_path, rpc_url, deployer_private_key, solc_version=os.environ.get("SOLC_VERSION"))
+
+        # DEPLOY_BATCH points to a JSON list of {"contract", "args", "name"} entries to deploy together
+        batch_path = os.environ.get("DEPLOY_BATCH")
+        if batch_path:
+            with open(batch_path, "r") as batch_file:
+                deployments = json.load(batch_file)
+            manifest_path = os.environ.get("DEPLOY_MANIFEST", "deployments.json")
+            contract_addresses = deployment_manager.execute_batch_deployment(deployments, manifest_path)
+            logger.info(f"{len(contract_addresses)} smart contracts deployed; see {manifest_path}")
+            return
 
         # Execute the deployment process
         contract_address = deployment_manager.execute_deployment()
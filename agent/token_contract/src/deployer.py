@@ -1,17 +1,49 @@
 import os
+import json
+import time
+import hashlib
 import logging
 from web3 import Web3
 import solcx
-from web3.exceptions import ContractLogicError
+import requests
+from requests.adapters import HTTPAdapter
+from web3.exceptions import ContractLogicError, TimeExhausted, TransactionNotFound
 
 logger = logging.getLogger(__name__)
 
+# Compiler settings; part of the compile cache key
+COMPILER_SETTINGS = {
+    "outputSelection": {
+        "*": {
+            "*": ["abi", "evm.bytecode"]
+        }
+    }
+}
+
+# Records which source, solc version and settings produced the files in artifacts/
+CACHE_MANIFEST = "compile_cache.json"
+
+class BatchDeploymentError(Exception):
+    """A batch deployment that did not fully succeed.
+
+    `tx_hashes` are the transactions that were broadcast, in input order; deployments
+    after a failed send have none. `receipts` holds the receipt of each broadcast
+    transaction, or None where it was not mined in time.
+    """
+    def __init__(self, message, tx_hashes, receipts):
+        super().__init__(message)
+        self.tx_hashes = tx_hashes
+        self.receipts = receipts
+
 class EthereumDeployer:
     """Class to handle Ethereum contract deployment using Web3."""
 
-    def __init__(self, rpc_url, private_key):
+    def __init__(self, rpc_url, private_key, provider=None, pool_size=20, solc_version=None):
         self.rpc_url = rpc_url
         self.private_key = private_key
+        self.provider = provider
+        self.pool_size = pool_size
+        self.solc_version = solc_version
         self.web3_instance = None
         self.account = None
         self.contract_abi = None
@@ -19,32 +51,83 @@ class EthereumDeployer:
         self.contract_address = None
 
     def connect_to_network(self):
-        """Establish a connection to the Ethereum network."""
-        self.web3_instance = Web3(Web3.HTTPProvider(self.rpc_url))
+        """Establish a connection to the Ethereum network.
+
+        Uses the injected provider if there is one (e.g. a pooled multi-endpoint provider
+        shared with other components), otherwise an HTTPProvider with a keep-alive pool.
+        """
+        if self.provider is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self.provider = Web3.HTTPProvider(self.rpc_url, session=session)
+        self.web3_instance = Web3(self.provider)
         if not self.web3_instance.is_connected():
             logger.error("Failed to connect to the Ethereum network.")
             raise ConnectionError("Could not establish a connection to the Ethereum network.")
         logger.info("Successfully connected to Ethereum network.")
 
-    def install_solidity_compiler(self):
-        """Install the latest version of the Solidity compiler (solc)."""
+    def install_solidity_compiler(self, version=None):
+        """Make sure a solc version is installed and return it.
+
+        A given version is installed only if it is missing. Without one, the newest
+        installed compiler is reused and 'latest' is downloaded only when none exists.
+        """
         try:
-            solcx.install_solc('latest')
-            logger.info("Solidity compiler (solc) installed successfully.")
+            installed = solcx.get_installed_solc_versions()
+            if version is None and installed:
+                version = max(installed)
+            elif version is None:
+                version = solcx.install_solc('latest')
+                logger.info(f"Solidity compiler (solc) {version} installed successfully.")
+            elif str(version) not in [str(installed_version) for installed_version in installed]:
+                version = solcx.install_solc(version)
+                logger.info(f"Solidity compiler (solc) {version} installed successfully.")
+            return str(version)
         except Exception as e:
             logger.error(f"Failed to install Solidity compiler: {e}")
             raise e
 
+    @staticmethod
+    def compile_cache_key(source_code, solc_version):
+        """Content address of a compilation: source, compiler version and settings."""
+        digest = hashlib.sha256()
+        for part in (source_code, str(solc_version), json.dumps(COMPILER_SETTINGS, sort_keys=True)):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
     def compile_contract(self, contract_path):
-        """Compile the Solidity smart contract and save ABI and bytecode to artifacts folder."""
+        """Compile the Solidity smart contract and save ABI and bytecode to artifacts folder.
+
+        If the artifacts folder already holds output for the same source, solc version and
+        settings, it is loaded instead and solc is not touched, so this works offline. The
+        version is `solc_version` if given, else the one pinned in the cache manifest.
+        """
         try:
             with open(contract_path, 'r') as file:
                 contract_source_code = file.read()
 
-            self.install_solidity_compiler()
-
             # Extract contract name dynamically from the Solidity file name
             contract_name = os.path.splitext(os.path.basename(contract_path))[0]
+            artifacts_folder = os.path.join(os.path.dirname(contract_path), 'artifacts')
+            abi_path = os.path.join(artifacts_folder, f'{contract_name}_abi.json')
+            bytecode_path = os.path.join(artifacts_folder, f'{contract_name}_bytecode.json')
+
+            manifest = self._load_cache_manifest(artifacts_folder)
+            entry = manifest.get(contract_name, {})
+            solc_version = self.solc_version or entry.get("solc_version")
+            if (solc_version is not None and entry.get("key") == self.compile_cache_key(contract_source_code, solc_version)
+                    and os.path.exists(abi_path) and os.path.exists(bytecode_path)):
+                with open(abi_path, 'r') as abi_file:
+                    self.contract_abi = json.load(abi_file)
+                with open(bytecode_path, 'r') as bytecode_file:
+                    self.contract_bytecode = json.load(bytecode_file)["bytecode"]
+                logger.info(f"Source unchanged; using cached artifacts compiled with solc {solc_version}.")
+                return
+
+            solc_version = self.install_solidity_compiler(solc_version)
 
             compiled_contract = solcx.compile_standard({
                 "language": "Solidity",
@@ -53,38 +136,44 @@ class EthereumDeployer:
                         "content": contract_source_code
                     }
                 },
-                "settings": {
-                    "outputSelection": {
-                        "*": {
-                            "*": ["abi", "evm.bytecode"]
-                        }
-                    }
-                }
-            })
+                "settings": COMPILER_SETTINGS
+            }, solc_version=solc_version)
 
             # Get ABI and Bytecode dynamically based on the contract name
             self.contract_abi = compiled_contract['contracts'][contract_name + ".sol"][contract_name]['abi']
             self.contract_bytecode = compiled_contract['contracts'][contract_name + ".sol"][contract_name]['evm']['bytecode']['object']
-            logger.info("Contract compiled successfully.")
+            logger.info(f"Contract compiled successfully with solc {solc_version}.")
 
             # Save ABI and Bytecode in the artifacts folder
-            artifacts_folder = os.path.join(os.path.dirname(contract_path), 'artifacts')
             if not os.path.exists(artifacts_folder):
                 os.makedirs(artifacts_folder)
 
-            abi_path = os.path.join(artifacts_folder, f'{contract_name}_abi.json')
-            bytecode_path = os.path.join(artifacts_folder, f'{contract_name}_bytecode.json')
-
             with open(abi_path, 'w') as abi_file:
                 abi_file.write(Web3.to_json(self.contract_abi))
             with open(bytecode_path, 'w') as bytecode_file:
                 bytecode_file.write(Web3.to_json({"bytecode": self.contract_bytecode}))
 
+            # Pin the compiler version so later runs reuse it
+            manifest[contract_name] = {
+                "key": self.compile_cache_key(contract_source_code, solc_version),
+                "solc_version": solc_version,
+            }
+            with open(os.path.join(artifacts_folder, CACHE_MANIFEST), 'w') as manifest_file:
+                json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+
             logger.info(f"ABI and bytecode saved to {artifacts_folder}.")
         except Exception as e:
             logger.error(f"Error during contract compilation: {e}")
             raise e
 
+    @staticmethod
+    def _load_cache_manifest(artifacts_folder):
+        manifest_path = os.path.join(artifacts_folder, CACHE_MANIFEST)
+        if not os.path.exists(manifest_path):
+            return {}
+        with open(manifest_path, 'r') as manifest_file:
+            return json.load(manifest_file)
+
     def prepare_account(self):
         """Prepare account object from private key."""
         if not self.private_key.startswith('0x'):
@@ -125,6 +214,80 @@ class EthereumDeployer:
             logger.error(f"Error during contract deployment: {e}")
             raise e
 
+    def build_deployment(self, constructor_args, nonce, contract_abi=None, contract_bytecode=None, chain_id=None):
+        """Build and sign a deployment transaction for the given nonce without sending it."""
+        contract = self.web3_instance.eth.contract(
+            abi=contract_abi or self.contract_abi, bytecode=contract_bytecode or self.contract_bytecode
+        )
+        tx_params = {
+            'gas': 2000000,
+            'gasPrice': self.web3_instance.to_wei('10', 'gwei'),
+            'nonce': nonce,
+        }
+        if chain_id is not None:
+            tx_params['chainId'] = chain_id
+        transaction = contract.constructor(*constructor_args).build_transaction(tx_params)
+        return self.web3_instance.eth.account.sign_transaction(transaction, self.private_key)
+
+    def deploy_contracts(self, deployments, timeout=120, poll_interval=1):
+        """Deploy several contracts in one batch and return their receipts in input order.
+
+        `deployments` is a list of (abi, bytecode, constructor_args). The pending nonce is
+        read once and then assigned locally, every transaction is broadcast back-to-back,
+        and the receipts are awaited together, so the batch takes about one block.
+        Raises `BatchDeploymentError`, carrying what was broadcast and mined, if a send
+        fails, a receipt does not arrive in time or a deployment reverts.
+        """
+        nonce = self.web3_instance.eth.get_transaction_count(self.account.address, 'pending')
+        chain_id = self.web3_instance.eth.chain_id
+        signed_transactions = [
+            self.build_deployment(constructor_args, nonce + index, contract_abi, contract_bytecode, chain_id)
+            for index, (contract_abi, contract_bytecode, constructor_args) in enumerate(deployments)
+        ]
+
+        tx_hashes = []
+        for signed_transaction in signed_transactions:
+            try:
+                tx_hashes.append(self.web3_instance.eth.send_raw_transaction(signed_transaction.raw_transaction))
+            except Exception as e:
+                message = f"Deployment {len(tx_hashes) + 1} of {len(deployments)} could not be sent: {e}"
+                logger.error(message)
+                # The deployments already broadcast will still be mined; report them too
+                try:
+                    receipts = self.wait_for_receipts(tx_hashes, timeout, poll_interval)
+                except TimeExhausted:
+                    receipts = [None] * len(tx_hashes)
+                raise BatchDeploymentError(message, tx_hashes, receipts) from e
+        logger.info(f"Sent {len(tx_hashes)} deployment transactions starting at nonce {nonce}.")
+        try:
+            receipts = self.wait_for_receipts(tx_hashes, timeout, poll_interval)
+        except TimeExhausted as e:
+            raise BatchDeploymentError(str(e), tx_hashes, [None] * len(tx_hashes)) from e
+        reverted = [index + 1 for index, receipt in enumerate(receipts) if receipt["status"] == 0]
+        if reverted:
+            message = f"Deployments {reverted} of {len(deployments)} reverted."
+            logger.error(message)
+            raise BatchDeploymentError(message, tx_hashes, receipts)
+        return receipts
+
+    def wait_for_receipts(self, tx_hashes, timeout=120, poll_interval=1):
+        """Wait for the receipts of transactions sent with consecutive nonces."""
+        receipts = {}
+        deadline = time.monotonic() + timeout
+        while True:
+            for tx_hash in tx_hashes:
+                if tx_hash in receipts:
+                    continue
+                try:
+                    receipts[tx_hash] = self.web3_instance.eth.get_transaction_receipt(tx_hash)
+                except TransactionNotFound:
+                    break  # Later nonces cannot be mined before this one
+            if len(receipts) == len(tx_hashes):
+                return [receipts[tx_hash] for tx_hash in tx_hashes]
+            if time.monotonic() >= deadline:
+                raise TimeExhausted(f"{len(tx_hashes) - len(receipts)} deployments were not mined within {timeout} seconds.")
+            time.sleep(poll_interval)
+
     def get_contract_address(self):
         """Return the deployed contract address."""
         return self.contract_address
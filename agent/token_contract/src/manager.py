@@ -1,16 +1,18 @@
+import json
 import logging
-from src.deployer import EthereumDeployer
+from web3 import Web3
+from src.deployer import BatchDeploymentError, EthereumDeployer
 
 logger = logging.getLogger(__name__)
 
 class DeploymentManager:
     """Class to manage the deployment of a contract."""
     
-    def __init__(self, contract_path, rpc_url, private_key):
+    def __init__(self, contract_path, rpc_url, private_key, provider=None, solc_version=None):
         self.contract_path = contract_path
         self.rpc_url = rpc_url
         self.private_key = private_key
-        self.deploy = EthereumDeployer(self.rpc_url, self.private_key)
+        self.deploy = EthereumDeployer(self.rpc_url, self.private_key, provider, solc_version=solc_version)
 
     def execute_deployment(self):
         """Execute the full contract deployment process."""
@@ -34,3 +36,64 @@ class DeploymentManager:
         except Exception as e:
             logger.error(f"Deployment process failed: {e}")
             raise e
+
+    def execute_batch_deployment(self, deployments, manifest_path="deployments.json"):
+        """Deploy a list of contracts in one batch and write a deployment manifest.
+
+        Each entry is {"contract": <path to .sol>, "args": [constructor args], "name": <optional label>}.
+        Returns the deployed contract addresses in input order. If the batch fails part
+        way, the manifest is still written, marked incomplete, with every deployment
+        that was broadcast, and the `BatchDeploymentError` is raised.
+        """
+        try:
+            self.deploy.connect_to_network()
+            self.deploy.prepare_account()
+
+            # Compile each distinct contract once; unchanged sources come from the compile cache
+            artifacts = {}
+            for deployment in deployments:
+                if deployment["contract"] not in artifacts:
+                    self.deploy.compile_contract(deployment["contract"])
+                    artifacts[deployment["contract"]] = (self.deploy.contract_abi, self.deploy.contract_bytecode)
+
+            try:
+                receipts = self.deploy.deploy_contracts([
+                    (*artifacts[deployment["contract"]], deployment.get("args", [])) for deployment in deployments
+                ])
+            except BatchDeploymentError as e:
+                self._write_manifest(manifest_path, deployments, e.tx_hashes, e.receipts, complete=False)
+                logger.error(f"Batch deployment incomplete; partial manifest written to {manifest_path}.")
+                raise e
+
+            self._write_manifest(manifest_path, deployments, [receipt["transactionHash"] for receipt in receipts], receipts, complete=True)
+            logger.info(f"Deployed {len(receipts)} contracts; manifest written to {manifest_path}.")
+            return [receipt["contractAddress"] for receipt in receipts]
+
+        except Exception as e:
+            logger.error(f"Batch deployment failed: {e}")
+            raise e
+
+    def _write_manifest(self, manifest_path, deployments, tx_hashes, receipts, complete):
+        """Write one manifest entry per deployment; unsent or unmined ones have no address."""
+        entries = []
+        for index, deployment in enumerate(deployments):
+            tx_hash = tx_hashes[index] if index < len(tx_hashes) else None
+            receipt = receipts[index] if index < len(receipts) else None
+            entries.append({
+                "name": deployment.get("name", f"contract-{index + 1}"),
+                "contract": deployment["contract"],
+                "args": deployment.get("args", []),
+                "address": receipt["contractAddress"] if receipt is not None and receipt["status"] == 1 else None,
+                "transaction_hash": Web3.to_hex(tx_hash) if tx_hash is not None else None,
+                "block_number": receipt["blockNumber"] if receipt is not None else None,
+                "status": receipt["status"] if receipt is not None else None,
+                "gas_used": receipt["gasUsed"] if receipt is not None else None,
+            })
+        manifest = {
+            "chain_id": self.deploy.web3_instance.eth.chain_id,
+            "deployer": self.deploy.account.address,
+            "complete": complete,
+            "deployments": entries,
+        }
+        with open(manifest_path, "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
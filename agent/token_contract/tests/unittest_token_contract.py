@@ -0,0 +1,237 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import rlp
+from eth_account import Account
+from web3 import Web3
+from web3.providers import BaseProvider
+from src import deployer
+from src.deployer import BatchDeploymentError, EthereumDeployer
+from src.manager import DeploymentManager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CONTRACTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "contracts")
+PRIVATE_KEY = "0x4c0883a69102937d6231471b5dbb6204fe5129617082792ae468d01a3f362318"
+CHAIN_ID = 1337
+
+class DeployChainProvider(BaseProvider):
+    """In-memory chain that mines every deployment at once.
+
+    Deployments whose last constructor word is zero revert, and the `fail_send`-th
+    raw transaction is refused.
+    """
+    def __init__(self, fail_send=None):
+        super().__init__()
+        self.fail_send = fail_send
+        self.sent_count = 0
+        self.nonce = 0
+        self.receipts = {}
+
+    def make_request(self, method, params):
+        if method == "eth_sendRawTransaction":
+            self.sent_count += 1
+            if self.sent_count == self.fail_send:
+                return {"jsonrpc": "2.0", "id": 1, "error": {"code": -32000, "message": "insufficient funds for gas * price + value"}}
+            return {"jsonrpc": "2.0", "id": 1, "result": self._mine(params[0])}
+        results = {
+            "eth_chainId": hex(CHAIN_ID),
+            "eth_getTransactionCount": hex(self.nonce),
+            "eth_getTransactionReceipt": self.receipts.get(params[0]) if params else None,
+        }
+        return {"jsonrpc": "2.0", "id": 1, "result": results[method]}
+
+    def _mine(self, raw_hex):
+        raw = bytes.fromhex(raw_hex[2:])
+        sender = Account.recover_transaction(raw)
+        nonce, data = int.from_bytes(rlp.decode(raw)[0], "big"), rlp.decode(raw)[5]
+        status = 1 if int.from_bytes(data[-32:], "big") else 0
+        address = Web3.to_checksum_address(Web3.keccak(rlp.encode([bytes.fromhex(sender[2:]), nonce]))[12:])
+        tx_hash = Web3.to_hex(Web3.keccak(raw))
+        self.nonce += 1
+        self.receipts[tx_hash] = {
+            "transactionHash": tx_hash,
+            "transactionIndex": "0x0",
+            "blockNumber": hex(self.nonce),
+            "blockHash": Web3.to_hex(Web3.keccak(self.nonce.to_bytes(32, "big"))),
+            "from": sender,
+            "to": None,
+            "contractAddress": address if status else None,
+            "gasUsed": hex(500000),
+            "cumulativeGasUsed": hex(500000),
+            "effectiveGasPrice": hex(10 ** 10),
+            "status": hex(status),
+            "logs": [],
+            "logsBloom": "0x" + "00" * 256,
+            "type": "0x0",
+        }
+        return tx_hash
+
+    def is_connected(self):
+        return True
+
+# -------------------------------------------
+# Token Contract UnitTest Test Cases
+# -------------------------------------------
+
+class TestCompileCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.contract_path = os.path.join(self.directory.name, "Token.sol")
+        self._write_source("contract Token {}")
+        # Stand-in for solcx so compilation runs offline
+        self.solcx = MagicMock()
+        self.solcx.get_installed_solc_versions.return_value = []
+        self.solcx.install_solc.side_effect = lambda version: version
+        self.solcx.compile_standard.return_value = {
+            "contracts": {"Token.sol": {"Token": {"abi": [{"type": "constructor", "inputs": []}], "evm": {"bytecode": {"object": "6080"}}}}}
+        }
+        self.patcher = patch.object(deployer, "solcx", self.solcx)
+        self.patcher.start()
+
+    def tearDown(self):
+        """Called after every test"""
+        self.patcher.stop()
+        self.directory.cleanup()
+        logger.info(f"{self._testMethodName}: Test completed")
+
+    def _write_source(self, source):
+        with open(self.contract_path, "w") as file:
+            file.write(source)
+
+    def _compile(self, solc_version=None):
+        self.solcx.reset_mock()
+        contract_deployer = EthereumDeployer("http://127.0.0.1:8545", PRIVATE_KEY, solc_version=solc_version)
+        contract_deployer.compile_contract(self.contract_path)
+        return contract_deployer
+
+    def _compiled_with(self):
+        """solc version of the last compilation, or None if solc was not run."""
+        if not self.solcx.compile_standard.called:
+            return None
+        return self.solcx.compile_standard.call_args.kwargs["solc_version"]
+
+    def test_unchanged_source_never_touches_solc(self):
+        """Test that a cache hit loads the artifacts without calling solcx"""
+        try:
+            self._compile("0.8.20")
+            self.assertEqual(self._compiled_with(), "0.8.20")
+            self.solcx.install_solc.assert_called_once_with("0.8.20")
+
+            contract_deployer = self._compile()
+            self.assertEqual(self.solcx.mock_calls, [])
+            self.assertEqual((contract_deployer.contract_abi[0]["type"], contract_deployer.contract_bytecode), ("constructor", "6080"))
+            with open(os.path.join(self.directory.name, "artifacts", deployer.CACHE_MANIFEST)) as file:
+                self.assertEqual(json.load(file)["Token"]["solc_version"], "0.8.20")
+            logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_changed_source_version_or_settings_recompile(self):
+        """Test that source, version and settings changes miss the cache and the pinned version is reused"""
+        try:
+            self._compile("0.8.20")
+            self.solcx.get_installed_solc_versions.return_value = ["0.8.20"]
+
+            self._write_source("contract Token { uint256 public supply; }")
+            self._compile()
+            self.assertEqual(self._compiled_with(), "0.8.20")
+            self.solcx.install_solc.assert_not_called()
+
+            self._compile("0.8.21")
+            self.assertEqual(self._compiled_with(), "0.8.21")
+            self.solcx.install_solc.assert_called_once_with("0.8.21")
+
+            with patch.dict(deployer.COMPILER_SETTINGS, {"optimizer": {"enabled": True, "runs": 200}}):
+                self._compile()
+            self.assertEqual(self._compiled_with(), "0.8.21")
+            self._compile()
+            self.assertEqual(self._compiled_with(), "0.8.21")  # Settings restored: the key changed again
+            self._compile()
+            self.assertIsNone(self._compiled_with())
+            logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+class TestBatchDeployment(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.manifest_path = os.path.join(self.directory.name, "deployments.json")
+        # Cached artifacts of AgentToken, so the contract is never recompiled
+        self.contract = os.path.join(self.directory.name, "AgentToken.sol")
+        shutil.copy(os.path.join(CONTRACTS_DIR, "AgentToken.sol"), self.contract)
+        shutil.copytree(os.path.join(CONTRACTS_DIR, "artifacts"), os.path.join(self.directory.name, "artifacts"))
+
+    def tearDown(self):
+        """Called after every test"""
+        self.directory.cleanup()
+        logger.info(f"{self._testMethodName}: Test completed")
+
+    def _deploy(self, provider, supplies):
+        manager = DeploymentManager(self.contract, None, PRIVATE_KEY, provider=provider)
+        deployments = [{"contract": self.contract, "args": [supply], "name": f"token-{supply}"} for supply in supplies]
+        return manager.execute_batch_deployment(deployments, self.manifest_path)
+
+    def _manifest(self):
+        with open(self.manifest_path) as file:
+            return json.load(file)
+
+    def test_batch_writes_complete_manifest(self):
+        """Test that a successful batch returns every address and writes a complete manifest"""
+        try:
+            addresses = self._deploy(DeployChainProvider(), [1000, 2000])
+            manifest = self._manifest()
+            self.assertTrue(manifest["complete"])
+            self.assertEqual(manifest["chain_id"], CHAIN_ID)
+            self.assertEqual([entry["address"] for entry in manifest["deployments"]], addresses)
+            self.assertEqual(len(set(addresses)), 2)
+            logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_reverted_deployment_is_raised_and_recorded(self):
+        """Test that a receipt with status 0 fails the batch and is written without an address"""
+        try:
+            with self.assertRaises(BatchDeploymentError):
+                self._deploy(DeployChainProvider(), [1000, 0, 5])
+            manifest = self._manifest()
+            self.assertFalse(manifest["complete"])
+            self.assertEqual([entry["status"] for entry in manifest["deployments"]], [1, 0, 1])
+            addresses = [entry["address"] for entry in manifest["deployments"]]
+            self.assertIsNone(addresses[1])
+            self.assertTrue(addresses[0] and addresses[2])
+            self.assertTrue(all(entry["transaction_hash"] for entry in manifest["deployments"]))
+            logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+    def test_failed_send_writes_partial_manifest(self):
+        """Test that deployments broadcast before a failed send are still written to the manifest"""
+        try:
+            with self.assertRaises(BatchDeploymentError):
+                self._deploy(DeployChainProvider(fail_send=2), [1000, 2000, 3000])
+            manifest = self._manifest()
+            self.assertFalse(manifest["complete"])
+            first, failed, unsent = manifest["deployments"]
+            self.assertEqual((first["name"], first["status"]), ("token-1000", 1))
+            self.assertTrue(first["address"] and first["transaction_hash"])
+            for entry in (failed, unsent):
+                self.assertEqual((entry["address"], entry["transaction_hash"], entry["status"]), (None, None, None))
+            logger.info(f"{self._testMethodName}: Passed")
+        except AssertionError as e:
+            logger.error(f"{self._testMethodName}: Failed - {e}")
+            raise
+
+if __name__ == "__main__":
+    unittest.main()